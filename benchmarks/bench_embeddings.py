@@ -0,0 +1,123 @@
+# benchmarks/bench_embeddings.py
+"""
+职位向量阶段的微基准测试：向量化吞吐、向量库的重复运行命中率，以及内存映射矩阵上的分块 top-k 查询。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_embeddings
+    python -m benchmarks.bench_embeddings --jobs 5000 --rows 500000 --dim 256
+
+1. 用本地特征哈希为合成职位（GiveMeOC首页的职位行）向量化两遍：第一遍全部计算并写入向量库，
+   第二遍应全部命中、不再计算；
+2. 向向量库追加 --rows 行随机向量，比较 cosine_top_k 与一次性算出全部相似度再整体排序的耗时，
+   并校验两者的前 k 名一致；结果不一致或第二遍仍有计算时以非0状态码退出。
+"""
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.stub_services import SyntheticJobs
+from nlp.embeddings import HashingEmbeddingProvider, JobEmbedder, cosine_top_k
+from nlp.profiles import parse_profiles
+from nlp.standardize import process_jobs_dataframe
+from scraping.givemeoc_scraper import GiveMeOcScraper
+from storage.embedding_store import EmbeddingStore
+
+PROFILES = "a:本科:计算机科学与技术:后端,Python;b:硕士:市场营销:品牌,运营;c:本科:电子信息工程:嵌入式,硬件"
+
+
+def synthetic_jobs(count):
+    """按GiveMeOC首页模板合成约 count 个职位，返回清洗后的DataFrame。"""
+    dataset = SyntheticJobs(int(count / 0.3) + 1, seed=42)
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = GiveMeOcScraper.parse_rows(dataset.givemeoc_page())
+    return process_jobs_dataframe([job for _, _, job in rows])
+
+
+def bench_embedding_passes(df_jobs, profiles, directory, dim, batch_size):
+    """向量化两遍，返回第二遍新计算的职位数。"""
+    embedder = JobEmbedder(HashingEmbeddingProvider(dim), EmbeddingStore(directory, 'bench', dim), batch_size)
+    try:
+        for label in ("第一遍", "第二遍"):
+            computed = embedder.stats["computed"]
+            start = time.perf_counter()
+            scores = embedder.score(df_jobs, profiles)
+            elapsed = time.perf_counter() - start
+            computed = embedder.stats["computed"] - computed
+            print(f"  {label}: {len(df_jobs)} 个职位, 新计算 {computed} 个, 用时 {elapsed:.3f}s "
+                  f"({len(df_jobs) / elapsed:,.0f} 个/秒), 平均最高相似度 {scores.max(axis=1).mean():.3f}")
+        return computed
+    finally:
+        embedder.close()
+
+
+def bench_top_k(directory, dim, rows, k, queries, block_size, repeat):
+    """在内存映射的向量库上比较分块 top-k 与整体排序，返回结果是否一致。"""
+    store = EmbeddingStore(directory, 'bench-top-k', dim)
+    rng = np.random.default_rng(42)
+    try:
+        for start in range(0, rows, 100000):
+            count = min(100000, rows - start)
+            vectors = rng.standard_normal((count, dim)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            store.add([f"r{start + i}" for i in range(count)], vectors)
+        query_vectors = rng.standard_normal((queries, dim)).astype(np.float32)
+        query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+        matrix = store.matrix
+
+        def naive():
+            scores = query_vectors @ np.asarray(matrix).T
+            order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+            return order, np.take_along_axis(scores, order, axis=1)
+
+        timings = {}
+        results = {}
+        for name, func in (("整体排序", naive), ("分块top-k", lambda: cosine_top_k(query_vectors, matrix, k, block_size))):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results[name] = func()
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+        print(f"  {rows:,} 行 x {dim} 维 ({rows * dim * 4 / 1024 / 1024:.0f} MB), {queries} 个查询, k={k}")
+        print(f"  整体排序:  {timings['整体排序']:.3f}s")
+        print(f"  分块top-k: {timings['分块top-k']:.3f}s (加速 {timings['整体排序'] / timings['分块top-k']:.2f}x)")
+        # 同分时两种方法的行号可能不同，只比较相似度
+        return np.allclose(results["整体排序"][1], results["分块top-k"][1], atol=1e-6)
+    finally:
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="职位向量阶段基准测试")
+    parser.add_argument('--jobs', type=int, default=3000, help="合成职位数")
+    parser.add_argument('--dim', type=int, default=512, help="特征哈希的向量维度")
+    parser.add_argument('--batch-size', type=int, default=64, help="每次向量化的职位数")
+    parser.add_argument('--rows', type=int, default=300000, help="top-k 测试中向量库的行数")
+    parser.add_argument('--k', type=int, default=50, help="每个查询返回的行数")
+    parser.add_argument('--queries', type=int, default=5, help="top-k 测试的查询向量个数（画像数）")
+    parser.add_argument('--block-size', type=int, default=65536, help="分块 top-k 每块的行数")
+    parser.add_argument('--repeat', type=int, default=3, help="top-k 测试的重复次数，取最短耗时")
+    args = parser.parse_args(argv)
+
+    df_jobs = synthetic_jobs(args.jobs)
+    profiles = parse_profiles(PROFILES)
+    ok = True
+    with tempfile.TemporaryDirectory(prefix='job-agent-embeddings-') as directory:
+        print(f"\n[向量化与向量库] 特征哈希 {args.dim} 维, 每批 {args.batch_size} 个, {len(profiles)} 个画像")
+        if bench_embedding_passes(df_jobs, profiles, directory, args.dim, args.batch_size):
+            print("  [失败] 第二遍仍有职位被重新计算！")
+            ok = False
+        print("\n[余弦相似度 top-k]")
+        if not bench_top_k(directory, args.dim, args.rows, args.k, args.queries, args.block_size, args.repeat):
+            print("  [失败] 分块 top-k 与整体排序的结果不一致！")
+            ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# benchmarks/bench_html_extract.py
+"""
+GiveMeOC首页与公众号文章HTML提取的微基准测试：BeautifulSoup整页解析 vs lxml定向解析。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_html_extract
+    python -m benchmarks.bench_html_extract --capture data/captures/20250101-080000.sqlite3
+    python -m benchmarks.bench_html_extract --article data/article.html --givemeoc data/givemeoc.html
+
+默认使用按 fixtures/pipeline 模板合成的页面（公众号文章按真实页面补齐内联样式和尾部脚本）；
+指定 --capture 时改用抓取存档中记录的真实页面。输出两种实现的耗时和峰值内存，
+并校验提取结果一致；结果不一致时以非0状态码退出。
+
+峰值内存在独立的子进程中按常驻内存(RSS)的增量测量，lxml等C扩展的分配也计算在内；
+不支持 resource 模块的平台（如Windows）只比较耗时。
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bs4 import BeautifulSoup
+
+from benchmarks.stub_services import SyntheticJobs
+from scraping.capture import CaptureArchive
+from scraping.givemeoc_scraper import GiveMeOcScraper
+from scraping.wechat_rss_scraper import WechatRssScraper
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RSS_MARKER = 'PEAK_RSS_KB '
+
+
+def legacy_extract_article_text(article_html):
+    """重构前 WechatRssScraper.extract_article_text 的实现，作为对照组。"""
+    soup = BeautifulSoup(article_html, 'html.parser')
+    content_div = soup.find('div', id='js_content')
+    return content_div.get_text('\n', strip=True) if content_div else ""
+
+
+def legacy_parse_givemeoc(page_html):
+    """重构前 GiveMeOcScraper.scrape 的解析逻辑（去掉了打印），作为对照组。"""
+    jobs = []
+    soup = BeautifulSoup(page_html, 'html.parser')
+    crt_container = soup.find('div', class_='crt-container')
+    if not crt_container:
+        return jobs
+    half_month_ago = datetime.now() - timedelta(days=15)
+    for row in crt_container.select('table tbody tr[data-id]'):
+        try:
+            update_time_element = row.select_one('td.crt-col-update-time')
+            if not update_time_element:
+                continue
+            update_time_str = update_time_element.get_text(strip=True)
+            if update_time_str == "招满为止":
+                continue
+            if datetime.strptime(update_time_str, '%Y-%m-%d') < half_month_ago:
+                continue
+            company = row.select_one('td.crt-col-company').get_text(strip=True)
+            location = row.select_one('td.crt-col-location').get_text(strip=True)
+            position_element = row.select_one('td.crt-col-position .crt-position-tag')
+            position = position_element.get_text(strip=True) if position_element else 'N/A'
+            apply_link_element = row.select_one('td.crt-col-links a.crt-link')
+            notice_link_element = row.select_one('td.crt-col-notice a.crt-notice-link')
+            url = apply_link_element['href'] if apply_link_element else \
+                  (notice_link_element['href'] if notice_link_element else 'N/A')
+            title = f"{company} - {position}" if position != 'N/A' else company
+            recruitment_type_element = row.select_one('td.crt-col-recruitment-type .crt-badge')
+            recruitment_type = recruitment_type_element.get_text(strip=True) if recruitment_type_element else 'N/A'
+            jobs.append({
+                'title': title,
+                'company': company,
+                'location': location,
+                'description': f"招聘类型: {recruitment_type} | 工作地点: {location} | 更新时间: {update_time_str}",
+                'url': url,
+                'source': 'givemeoc.com'
+            })
+        except Exception:
+            continue
+    return jobs
+
+
+def new_parse_givemeoc(page_html):
+    # 解析函数会打印统计信息，测量时丢弃
+    with contextlib.redirect_stdout(io.StringIO()):
+        return GiveMeOcScraper.parse_page(page_html)
+
+
+def realistic_article(dataset, article_id, script_kb):
+    """
+    在合成文章的基础上补齐真实公众号页面的特征：每段包裹带内联样式的 section/span，
+    正文前后有大段内联样式和脚本（真实页面中正文通常只占整页的一小部分）。
+    """
+    rng = random.Random(article_id)
+    page = dataset.article(article_id)
+    style = '<style>' + ''.join(
+        f".rich_media_{i}{{margin:0 {i % 7}px;font-size:{14 + i % 4}px;color:#{rng.randrange(16 ** 6):06x};}}"
+        for i in range(script_kb * 8)
+    ) + '</style>'
+    script = '<script>' + ''.join(
+        f"window.__wx_{i} = {{\"id\": {i}, \"t\": \"{rng.random():.12f}\"}};" for i in range(script_kb * 20)
+    ) + '</script>'
+    page = page.replace('</head>', f"{style}{script}</head>", 1)
+    page = page.replace('<p>', '<section style="margin:0 8px;line-height:1.75em;"><p style="text-align:justify;">'
+                               '<span style="font-size:15px;color:rgb(62,62,62);letter-spacing:1px;">')
+    page = page.replace('</p>', '</span></p></section>')
+    # 正文之后的推荐、评论、工具栏和各类初始化脚本
+    return page.replace('</body>', f"{script * 3}</body>", 1)
+
+
+def load_capture_pages(path):
+    """从抓取存档中读出记录的公众号文章和GiveMeOC页面。"""
+    archive = CaptureArchive(path, 'replay')
+    try:
+        pages = {}
+        for kind in ('article', 'page'):
+            pages[kind] = []
+            for key in archive.keys(kind):
+                response = archive.load_response(kind, key, key)
+                response.encoding = response.apparent_encoding
+                pages[kind].append(response.text)
+        return pages['article'], pages['page']
+    finally:
+        archive.close()
+
+
+IMPLEMENTATIONS = {
+    'article-legacy': legacy_extract_article_text,
+    'article-lxml': WechatRssScraper.extract_article_text,
+    'givemeoc-legacy': legacy_parse_givemeoc,
+    'givemeoc-lxml': new_parse_givemeoc,
+}
+
+
+def _peak_rss_kb():
+    """本进程的峰值常驻内存(KB)；不支持的平台返回None。"""
+    # Linux上 ru_maxrss 会继承父进程在fork时的峰值，优先读取只统计本进程的 VmHWM
+    try:
+        with open('/proc/self/status', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux上单位为KB，macOS上为字节
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def memory_worker(name, page_dir):
+    """子进程入口：逐页读入并解析目录中的页面，打印解析期间峰值RSS的增量(KB)。"""
+    func = IMPLEMENTATIONS[name]
+    before = _peak_rss_kb()
+    if before is None:
+        return
+    for filename in sorted(os.listdir(page_dir)):
+        with open(os.path.join(page_dir, filename), 'r', encoding='utf-8') as f:
+            func(f.read())
+    print(RSS_MARKER + str(_peak_rss_kb() - before))
+
+
+def measure_peak_rss(name, page_dir):
+    """在子进程中运行一种实现，返回峰值RSS增量(字节)；不支持或失败时返回None。"""
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_html_extract', '--memory-worker', name, page_dir],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, encoding='utf-8'
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith(RSS_MARKER):
+            return int(line[len(RSS_MARKER):]) * 1024
+    return None
+
+
+def measure(func, pages, repeat):
+    """返回 (最短总耗时, 结果列表)。"""
+    best = float('inf')
+    results = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(page) for page in pages]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def _format_peak(peak):
+    return f"{peak / 1024 / 1024:.1f} MB" if peak is not None else "-"
+
+
+def compare(name, kind, pages, repeat):
+    """比较两种实现，打印结果；提取结果一致时返回True。"""
+    if not pages:
+        print(f"\n[{name}] 没有可用的页面，跳过。")
+        return True
+    size_mb = sum(len(page) for page in pages) / 1024 / 1024
+    legacy_time, legacy_results = measure(IMPLEMENTATIONS[f'{kind}-legacy'], pages, repeat)
+    new_time, new_results = measure(IMPLEMENTATIONS[f'{kind}-lxml'], pages, repeat)
+    with tempfile.TemporaryDirectory(prefix='job-agent-html-') as page_dir:
+        for i, page in enumerate(pages):
+            with open(os.path.join(page_dir, f"{i:06d}.html"), 'w', encoding='utf-8') as f:
+                f.write(page)
+        legacy_peak = measure_peak_rss(f'{kind}-legacy', page_dir)
+        new_peak = measure_peak_rss(f'{kind}-lxml', page_dir)
+    ratio = f", 内存 {new_peak / legacy_peak:.0%}" if legacy_peak and new_peak is not None else ""
+    print(f"\n[{name}] {len(pages)} 个页面, {size_mb:.2f} MB")
+    print(f"  BeautifulSoup: {legacy_time:.3f}s, 峰值RSS增量 {_format_peak(legacy_peak)}")
+    print(f"  lxml定向解析:  {new_time:.3f}s, 峰值RSS增量 {_format_peak(new_peak)} "
+          f"(加速 {legacy_time / new_time:.2f}x{ratio})")
+    mismatched = sum(1 for old, fresh in zip(legacy_results, new_results) if old != fresh)
+    if mismatched:
+        print(f"  [失败] {mismatched} 个页面的提取结果不一致！")
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GiveMeOC/公众号文章HTML提取基准测试")
+    parser.add_argument('--capture', help="抓取存档路径，使用其中记录的页面")
+    parser.add_argument('--article', action='append', help="录制的公众号文章HTML文件，可指定多次")
+    parser.add_argument('--givemeoc', action='append', help="录制的GiveMeOC首页HTML文件，可指定多次")
+    parser.add_argument('--articles', type=int, default=50, help="合成公众号文章的数量")
+    parser.add_argument('--script-kb', type=int, default=40, help="合成文章中每段内联脚本/样式的规模(约KB)")
+    parser.add_argument('--givemeoc-rows', type=int, default=3000, help="合成GiveMeOC首页的职位行数")
+    parser.add_argument('--repeat', type=int, default=3, help="每项测试重复次数，取最短耗时")
+    # 内部使用：测量峰值内存的子进程
+    parser.add_argument('--memory-worker', nargs=2, metavar=('IMPL', 'DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.memory_worker:
+        memory_worker(*args.memory_worker)
+        return 0
+
+    if args.capture:
+        articles, givemeoc_pages = load_capture_pages(args.capture)
+    else:
+        articles, givemeoc_pages = [], []
+    for paths, pages in ((args.article, articles), (args.givemeoc, givemeoc_pages)):
+        for path in paths or []:
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append(f.read())
+    if not (args.capture or args.article or args.givemeoc):
+        dataset = SyntheticJobs(args.articles * 10, seed=42)
+        articles = [realistic_article(dataset, i, args.script_kb) for i in range(args.articles)]
+        givemeoc_pages = [SyntheticJobs(int(args.givemeoc_rows / 0.3) + 1, seed=42).givemeoc_page()]
+
+    ok = compare("公众号文章", 'article', articles, args.repeat)
+    ok = compare("GiveMeOC首页", 'givemeoc', givemeoc_pages, args.repeat) and ok
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+# benchmarks/bench_pipeline.py
+"""
+完整流水线的离线端到端基准测试。
+
+在本地启动替身服务（见 stub_services.py），以不同的数据规模端到端运行 run_job_agent_pipeline：
+智联招聘经Firecrawl替身、GiveMeOC首页、OPML中的公众号RSS及文章、OpenAI兼容的模型接口全部指向本地，
+不访问任何外部网站，也不消耗模型额度。
+
+每个(模式, 规模)组合在独立的子进程中运行，使用全新的临时目录存放状态、缓存和结果，
+互不影响，峰值内存也只统计该次运行。输出吞吐量 (jobs/s)、各步骤耗时（来自运行指标）和峰值内存，
+并与保存的基线比较，超出容差时以非0状态码退出。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --sizes 100,1000,10000,100000 --modes streaming
+    python -m benchmarks.bench_pipeline --llm-latency 0.5 --http-latency 0.05
+    python -m benchmarks.bench_pipeline --update-baseline
+
+礼貌性限流（每主机间隔、文章令牌桶等）在基准测试中被放开，测量的是流水线自身的处理能力；
+需要观察限流影响时可用 --env KEY=VALUE 覆盖任意配置项。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stub_services import StubServer, SyntheticJobs, ZHAOPIN_JOBS_PER_PAGE
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baselines', 'pipeline.json')
+RESULT_MARKER = 'BENCH_RESULT '
+
+
+def _peak_rss_mb():
+    """本进程的峰值常驻内存(MB)；不支持的平台返回None。"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux上单位为KB，macOS上为字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_worker(size, metrics_path):
+    """子进程入口：环境变量已由父进程设置好，导入并运行一次完整流水线。"""
+    import main
+
+    started = time.perf_counter()
+    main.run_job_agent_pipeline()
+    seconds = time.perf_counter() - started
+
+    with open(metrics_path, 'r', encoding='utf-8') as f:
+        record = json.load(f)
+    llm_by_kind = record["llm"]["by_kind"]
+    result = {
+        "jobs": size,
+        "status": record["status"],
+        "seconds": round(seconds, 3),
+        "jobs_per_second": round(size / seconds, 1) if seconds else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": record["stages"],
+        "counts": record["counts"],
+        "llm_calls": sum(entry["calls"] for entry in llm_by_kind.values()),
+        "http_requests": sum(entry["count"] for entry in record["requests"].values()),
+    }
+    print(RESULT_MARKER + json.dumps(result, ensure_ascii=False))
+
+
+def _write_opml(path, dataset, base_url):
+    outlines = ''.join(
+        f'<outline text="校招信息速递{feed:04d}" type="rss" xmlUrl="{base_url}/n/{dataset.size}/rss/{feed}.xml"/>'
+        for feed in range(dataset.rss_feeds)
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?><opml version="2.0"><body>{outlines}</body></opml>')
+
+
+def worker_env(size, mode, state_dir, server, overrides):
+    """子进程的环境变量：所有外部服务指向替身服务，所有状态文件放在临时目录。"""
+    dataset = SyntheticJobs(size, seed=server.seed)
+    opml_path = os.path.join(state_dir, 'feeds.opml')
+    _write_opml(opml_path, dataset, server.base_url)
+    env = dict(os.environ)
+    env.update({
+        "PYTHONIOENCODING": "utf-8",
+        "JOB_SOURCES": "zhaopin,givemeoc,opml",
+        "SOURCE_TIMEOUT_SECONDS": "0",
+        "SOURCE_TIMEOUTS": "",
+        "PIPELINE_STREAMING": "true" if mode == 'streaming' else "false",
+        "FIRECRAWL_API_KEY": "bench",
+        "FIRECRAWL_API_URL": f"{server.base_url}/firecrawl/v1",
+        "ZHAOPIN_SEARCH_URL": f"{server.base_url}/n/{size}/zhaopin?p={{page}}",
+        "ZHAOPIN_MAX_PAGES": str(dataset.zhaopin_pages + 1),
+        "GIVE_ME_OC_URL": f"{server.base_url}/n/{size}/givemeoc/",
+        "OPML_FILE_PATH": opml_path,
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{server.base_url}/llm/v1",
+        "USER_EDUCATION": "本科",
+        "USER_MAJOR": "计算机科学与技术",
+        "PREFILTER_KEYWORDS": "软件开发,后端,Python",
+        # 流式模式只按阈值过滤（阈值为0时会改用批处理流程），两种模式使用同一阈值以便比较
+        "PREFILTER_MIN_SCORE": "1",
+        # 放开礼貌性限流，只测量流水线本身
+        "RSS_PER_HOST_CONCURRENCY": "64",
+        "RSS_PER_HOST_INTERVAL": "0",
+        "ARTICLE_RATE_PER_SECOND": "100000",
+        "ARTICLE_RATE_BURST": "100000",
+        "ARTICLE_RATE_OVERRIDES": "",
+        "LLM_MAX_CONCURRENCY": "8",
+        "LLM_INITIAL_CONCURRENCY": "8",
+        "SCRAPER_STATE_PATH": os.path.join(state_dir, 'scraper_state.json'),
+        "ARTICLE_CACHE_PATH": os.path.join(state_dir, 'article_cache.sqlite3'),
+        "SEEN_JOBS_DB_PATH": os.path.join(state_dir, 'seen_jobs.sqlite3'),
+        "LLM_CACHE_PATH": os.path.join(state_dir, 'llm_cache.sqlite3'),
+        # 合成职位不能写进真实的职位库，否则会被当作最近一次成功运行发送邮件
+        "JOB_STORE_PATH": os.path.join(state_dir, 'jobs.sqlite3'),
+        "EMBEDDING_STORE_DIR": os.path.join(state_dir, 'embeddings'),
+        "MATCHED_JOBS_SUMMARY_PATH": os.path.join(state_dir, 'matched_jobs_summary.json'),
+        "METRICS_ENABLED": "true",
+        "METRICS_JSON_PATH": os.path.join(state_dir, 'run_metrics.json'),
+        "METRICS_PROMETHEUS_PATH": "",
+    })
+    env.update(overrides)
+    return env
+
+
+def run_case(size, mode, server, overrides, timeout, verbose):
+    """在子进程中运行一次(模式, 规模)组合，返回结果字典；失败时返回None。"""
+    with tempfile.TemporaryDirectory(prefix='job-agent-bench-') as state_dir:
+        env = worker_env(size, mode, state_dir, server, overrides)
+        command = [sys.executable, '-m', 'benchmarks.bench_pipeline', '--worker',
+                   '--jobs', str(size), '--metrics-path', env["METRICS_JSON_PATH"]]
+        try:
+            completed = subprocess.run(
+                command, cwd=PROJECT_ROOT, env=env, timeout=timeout,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace'
+            )
+        except subprocess.TimeoutExpired:
+            print(f"  [失败] {mode}/{size} 超过 {timeout} 秒仍未完成。")
+            return None
+
+    output = completed.stdout
+    if verbose:
+        print(output)
+    for line in reversed(output.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            result = json.loads(line[len(RESULT_MARKER):])
+            result["mode"] = mode
+            return result
+    print(f"  [失败] {mode}/{size} 没有输出结果 (退出码 {completed.returncode})，最后的输出:")
+    print('\n'.join(output.splitlines()[-20:]))
+    return None
+
+
+def print_result(result):
+    stages = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in result["stages"].items())
+    counts = result["counts"]
+    memory = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "未知"
+    print(f"  {result['mode']:<9} {result['jobs']:>7} 个职位: {result['seconds']:.2f}s, "
+          f"{result['jobs_per_second']:,.0f} jobs/s, 峰值内存 {memory}, "
+          f"模型调用 {result['llm_calls']} 次, HTTP请求 {result['http_requests']} 次")
+    print(f"    原始 {counts.get('raw', 0)} 条, 送去匹配 {counts.get('sent', 0)} 条 | {stages}")
+
+
+def _case_key(result):
+    return f"{result['mode']}/{result['jobs']}"
+
+
+def compare_with_baseline(results, baseline, time_tolerance, memory_tolerance, time_slack):
+    """
+    与基线比较，返回回归描述列表。
+    耗时允许 基线*(1+time_tolerance)+time_slack（小规模下绝对抖动占比大），内存允许 基线*(1+memory_tolerance)。
+    """
+    regressions = []
+    cases = baseline.get("cases", {})
+    for result in results:
+        base = cases.get(_case_key(result))
+        if not base:
+            print(f"  {_case_key(result)}: 基线中没有该组合，跳过比较。")
+            continue
+        time_limit = base["seconds"] * (1 + time_tolerance) + time_slack
+        line = f"  {_case_key(result)}: 耗时 {result['seconds']:.2f}s (基线 {base['seconds']:.2f}s, 上限 {time_limit:.2f}s)"
+        if result["seconds"] > time_limit:
+            regressions.append(f"{_case_key(result)} 耗时 {result['seconds']:.2f}s 超过上限 {time_limit:.2f}s")
+        if result["peak_rss_mb"] is not None and base.get("peak_rss_mb"):
+            memory_limit = base["peak_rss_mb"] * (1 + memory_tolerance)
+            line += f", 峰值内存 {result['peak_rss_mb']:.0f} MB (基线 {base['peak_rss_mb']:.0f} MB, 上限 {memory_limit:.0f} MB)"
+            if result["peak_rss_mb"] > memory_limit:
+                regressions.append(
+                    f"{_case_key(result)} 峰值内存 {result['peak_rss_mb']:.0f} MB 超过上限 {memory_limit:.0f} MB"
+                )
+        print(line)
+    return regressions
+
+
+def save_baseline(path, results, args):
+    baseline = {"cases": {}}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    baseline["environment"] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "llm_latency": args.llm_latency,
+        "http_latency": args.http_latency,
+        "recorded_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    for result in results:
+        baseline.setdefault("cases", {})[_case_key(result)] = {
+            "seconds": result["seconds"],
+            "jobs_per_second": result["jobs_per_second"],
+            "peak_rss_mb": result["peak_rss_mb"],
+            "stages": result["stages"],
+        }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"\n基线已更新: {path}")
+
+
+def _parse_overrides(items):
+    overrides = {}
+    for item in items or []:
+        key, _, value = item.partition('=')
+        overrides[key.strip()] = value
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="完整流水线的离线端到端基准测试")
+    parser.add_argument('--sizes', default='100,1000,10000', help="逗号分隔的数据规模（职位数），最大可到100000")
+    parser.add_argument('--modes', default='streaming,batch', help="逗号分隔的流水线模式: streaming, batch")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="模型接口每次调用的模拟延迟(秒)")
+    parser.add_argument('--http-latency', type=float, default=0.0, help="每次抓取请求的模拟延迟(秒)")
+    parser.add_argument('--seed', type=int, default=42, help="合成数据的随机种子")
+    parser.add_argument('--timeout', type=float, default=1800, help="单次运行的超时(秒)")
+    parser.add_argument('--env', action='append', metavar='KEY=VALUE', help="覆盖子进程的配置项，可指定多次")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument('--update-baseline', action='store_true', help="用本次结果更新基线，不做比较")
+    parser.add_argument('--time-tolerance', type=float, default=0.5, help="允许的耗时增幅（相对基线）")
+    parser.add_argument('--time-slack', type=float, default=1.0, help="允许的耗时绝对抖动(秒)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help="允许的峰值内存增幅（相对基线）")
+    parser.add_argument('--verbose', action='store_true', help="打印子进程的完整输出")
+    # 以下参数仅供子进程使用
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--jobs', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--metrics-path', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.jobs, args.metrics_path)
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    server = StubServer(llm_latency=args.llm_latency, http_latency=args.http_latency, seed=args.seed).start()
+    print(f"替身服务已启动: {server.base_url} (模型延迟 {args.llm_latency}s, 抓取延迟 {args.http_latency}s, "
+          f"智联每页 {ZHAOPIN_JOBS_PER_PAGE} 个职位)")
+
+    results = []
+    failed = False
+    try:
+        for size in sizes:
+            for mode in modes:
+                result = run_case(size, mode, server, _parse_overrides(args.env), args.timeout, args.verbose)
+                if result is None or result["status"] != "ok":
+                    failed = True
+                    continue
+                results.append(result)
+                print_result(result)
+    finally:
+        server.shutdown()
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results, args)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n与基线比较 ({args.baseline}):")
+        regressions = compare_with_baseline(
+            results, baseline, args.time_tolerance, args.memory_tolerance, args.time_slack
+        )
+        if regressions:
+            print("\n[失败] 检测到性能回归:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            failed = True
+    else:
+        print(f"\n未找到基线文件 {args.baseline}，可使用 --update-baseline 生成。")
+
+    if failed:
+        return 1
+    print("\n全部检查通过。")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
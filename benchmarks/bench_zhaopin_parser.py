@@ -0,0 +1,131 @@
+# benchmarks/bench_zhaopin_parser.py
+"""
+智联招聘Markdown解析器的微基准测试。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_zhaopin_parser
+    python -m benchmarks.bench_zhaopin_parser --fixture data/captured_page.md --scale 500
+
+会输出新旧两种实现的吞吐量 (jobs/s)，校验两者在正常输入上的解析结果一致，
+并用若干构造的畸形输入检查是否存在灾难性回溯；任一检查失败时以非0状态码退出。
+正常页面上两种实现都由少量C实现的正则扫描主导，新实现只快约一成；它的主要收益在畸形输入上，
+旧实现在那里会多项式回溯，新实现的耗时与输入长度成线性关系。
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+from scraping.zhaopin_parser import iter_zhaopin_jobs
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+DEFAULT_FIXTURE = os.path.join(FIXTURE_DIR, 'zhaopin_page.md')
+
+
+def legacy_parse_zhaopin_markdown(markdown_content):
+    """重构前 main.parse_zhaopin_markdown 的解析逻辑（去掉了打印），作为对照组。"""
+    jobs = []
+    if not markdown_content:
+        return jobs
+    for block in markdown_content.split("收藏"):
+        if not block.strip() or "jobdetail" not in block:
+            continue
+        title_url_match = re.search(r'\[([^\]]+)\]\((https?://www\.zhaopin\.com/jobdetail/[^\)]+)\)', block)
+        title = title_url_match.group(1).strip() if title_url_match else 'N/A'
+        url = title_url_match.group(2).strip() if title_url_match else 'N/A'
+        if url == 'N/A':
+            continue
+        salary_match = re.search(r'\n\s*((?:[\d.-]+(?:万|元))|面议)(?:·\d+薪)?\s*\n?', block)
+        salary = salary_match.group(1).strip() if salary_match else '面议'
+        company_match = re.search(r'\[([^\]]+)\]\(https?://www\.zhaopin\.com/companydetail/[^\)]+\)', block)
+        company = company_match.group(1).strip() if company_match else 'N/A'
+        location, experience, education = 'N/A', 'N/A', 'N/A'
+        details_match = re.search(r'location\.png\)\s*([^\n]+)\s+([^\n]+)\s+([^\n]+)', block)
+        if details_match:
+            location = details_match.group(1).strip().replace('·', ' ')
+            experience = details_match.group(2).strip()
+            education = details_match.group(3).strip()
+        jobs.append({
+            'title': title,
+            'company': company,
+            'location': location,
+            'description': f"薪资: {salary} | 地点: {location} | 经验: {experience} | 学历: {education}",
+            'url': url,
+            'source': '智联招聘 (Firecrawl)'
+        })
+    return jobs
+
+
+def new_parse_zhaopin_markdown(markdown_content):
+    return list(iter_zhaopin_jobs(markdown_content))
+
+
+def scale_fixture(markdown_content, copies):
+    """将录制的页面复制多份（替换职位ID保证URL各不相同），模拟多页/多站点的大体量输入。"""
+    parts = []
+    for i in range(copies):
+        parts.append(markdown_content.replace('/jobdetail/CC', f'/jobdetail/CC{i:05d}'))
+    return '\n'.join(parts)
+
+
+def pathological_inputs(size):
+    """构造会让朴素正则产生大量回溯的畸形输入。"""
+    return {
+        '未闭合的方括号': 'jobdetail ' + '[' * size,
+        '超长空白段': '[t](https://www.zhaopin.com/jobdetail/x)\n' + ' \n' * size + 'x',
+        'location后空白': '[t](https://www.zhaopin.com/jobdetail/x)\nlocation.png) a\n' + ' ' * size,
+        '单行超长字段': '[t](https://www.zhaopin.com/jobdetail/x)\nlocation.png) ' + 'a ' * size,
+        '字段间长空白': '[t](https://www.zhaopin.com/jobdetail/x)\nlocation.png) a' + ' ' * size + 'b' + ' ' * size,
+        '重复的location标记': '[t](https://www.zhaopin.com/jobdetail/x)\n' + 'location.png) a ' * size,
+    }
+
+
+def time_call(func, *args, repeat=3):
+    """返回多次运行中的最短耗时和最后一次的结果。"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="智联招聘Markdown解析器基准测试")
+    parser.add_argument('--fixture', action='append', help="录制的Firecrawl Markdown文件，可指定多次")
+    parser.add_argument('--scale', type=int, default=200, help="每个fixture复制的份数")
+    parser.add_argument('--repeat', type=int, default=3, help="每项测试重复次数，取最短耗时")
+    parser.add_argument('--pathological-size', type=int, default=20000, help="畸形输入的规模")
+    parser.add_argument('--pathological-limit', type=float, default=0.5, help="畸形输入允许的最长解析时间(秒)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for fixture_path in args.fixture or [DEFAULT_FIXTURE]:
+        with open(fixture_path, 'r', encoding='utf-8') as f:
+            markdown = scale_fixture(f.read(), args.scale)
+
+        legacy_time, legacy_jobs = time_call(legacy_parse_zhaopin_markdown, markdown, repeat=args.repeat)
+        new_time, new_jobs = time_call(new_parse_zhaopin_markdown, markdown, repeat=args.repeat)
+
+        print(f"\n[{os.path.basename(fixture_path)} x{args.scale}] {len(markdown) / 1024 / 1024:.2f} MB, {len(new_jobs)} 个职位")
+        print(f"  旧实现: {legacy_time:.3f}s, {len(legacy_jobs) / legacy_time:,.0f} jobs/s")
+        print(f"  新实现: {new_time:.3f}s, {len(new_jobs) / new_time:,.0f} jobs/s (加速 {legacy_time / new_time:.2f}x)")
+        if new_jobs != legacy_jobs:
+            print("  [失败] 新旧实现的解析结果不一致！")
+            failed = True
+
+    print(f"\n畸形输入检查 (规模 {args.pathological_size}, 上限 {args.pathological_limit}s):")
+    for name, markdown in pathological_inputs(args.pathological_size).items():
+        elapsed, _ = time_call(new_parse_zhaopin_markdown, markdown, repeat=1)
+        status = "OK" if elapsed <= args.pathological_limit else "超时"
+        print(f"  {name}: {elapsed:.4f}s [{status}]")
+        if elapsed > args.pathological_limit:
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,389 @@
+# benchmarks/stub_services.py
+"""
+端到端基准测试使用的本地替身服务。
+
+用一个本地HTTP服务同时模拟流水线依赖的所有外部服务，数据由固定种子合成、套用 fixtures/pipeline
+中按真实页面结构整理的模板渲染，任意规模的数据集都可以复现：
+    POST /firecrawl/v1/scrape            Firecrawl抓取接口，返回智联招聘搜索结果页的Markdown
+    POST /firecrawl/v1/batch/scrape      Firecrawl批量抓取接口，返回任务ID
+    GET  /firecrawl/v1/batch/scrape/<ID> 批量抓取任务状态：第一次查询时仍在进行，之后完成并分页返回结果
+    GET  /n/<规模>/givemeoc/             GiveMeOC校招首页HTML（带 ?page=<页码> 时为分页列表）
+    GET  /n/<规模>/rss/<编号>.xml        公众号RSS源
+    GET  /n/<规模>/article/<编号>        公众号文章HTML
+    POST /llm/v1/chat/completions        OpenAI兼容的模型接口（延迟可配置）
+    POST /llm/v1/embeddings              OpenAI兼容的向量接口（用本地特征哈希生成向量，延迟同模型接口）
+"""
+import html
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from functools import lru_cache
+from string import Template
+from urllib.parse import urlsplit, parse_qs
+
+from nlp.embeddings import HashingEmbeddingProvider
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'pipeline')
+
+# 数据集在三个数据源之间的分配比例：智联招聘、GiveMeOC，其余为公众号文章
+ZHAOPIN_SHARE = 0.5
+GIVEMEOC_SHARE = 0.3
+ZHAOPIN_JOBS_PER_PAGE = 50
+# Firecrawl批量抓取状态接口每次返回的结果数，超出时通过 next 分页
+FIRECRAWL_BATCH_PAGE_SIZE = 2
+GIVEMEOC_ROWS_PER_PAGE = 50
+# 与 OpmlRssSource 中每个源最多保留的文章数一致
+RSS_ITEMS_PER_FEED = 10
+# 每隔多少篇文章转载一次上一个公众号的文章（跨公众号的重复职位，用于覆盖去重）
+RSS_REPOST_EVERY = 10
+
+_ROLES = [
+    '后端开发工程师', '前端开发工程师', 'Java开发工程师', 'Python开发工程师', '算法工程师', '数据分析师',
+    '测试开发工程师', '运维工程师', '产品经理', '嵌入式软件工程师', '机器学习工程师', '大数据开发工程师',
+    '销售代表', '人力资源专员', '财务会计', '行政专员', '市场营销专员', 'UI设计师', '客服专员', '电气工程师',
+]
+_LEVELS = ['', '初级', '高级', '资深', '']
+_DOMAINS = ['支付', '电商', '云计算', '智能驾驶', '游戏', '金融科技', '医疗', '教育', '物流', '社交', '芯片', '新能源']
+_CITIES = ['北京', '上海', '广州', '深圳', '杭州', '成都', '武汉', '南京', '西安', '苏州']
+_DISTRICTS = ['朝阳', '浦东', '天河', '南山', '余杭', '高新', '洪山', '江宁', '雁塔', '工业园']
+_COMPANY_WORDS = ['华', '腾', '云', '智', '数', '联', '创', '科', '星', '海', '远', '新', '达', '信', '通', '恒', '明', '博']
+_COMPANY_TYPES = ['科技', '网络', '信息技术', '软件', '电子', '智能', '数据']
+_EXPERIENCE = ['不限', '1-3年', '3-5年', '5-10年', '无经验']
+_EDUCATION = ['本科', '硕士', '大专', '不限']
+_SKILLS = ['Python', 'Java', 'Go', 'MySQL', 'Redis', 'Kafka', 'Linux', 'Docker', 'Kubernetes', 'Spring', 'React',
+           'Vue', 'PyTorch', 'Spark', 'Hadoop', 'Excel', 'SAP', 'PLC']
+_SENTENCES = [
+    '负责{domain}业务相关系统的设计、开发与维护，保障系统的稳定性和可扩展性。',
+    '参与需求分析和技术方案评审，与产品、测试团队紧密协作推进项目落地。',
+    '熟悉{skill}等技术，有{domain}行业经验者优先。',
+    '具备良好的沟通能力和团队合作精神，责任心强，能承受一定的工作压力。',
+    '{education}及以上学历，计算机、软件工程、电子信息等相关专业优先。',
+    '公司提供六险一金、带薪年假、年度体检、餐补交通补贴及完善的培训体系。',
+    '工作地点位于{city}{district}，交通便利，周末双休，弹性工作制。',
+    '有大型互联网公司或{domain}头部企业实习经历者优先考虑。',
+    '本次校园招聘面向2026届毕业生，提供有竞争力的薪酬和明确的晋升通道。',
+    '对技术有热情，持续关注行业动态，有开源项目或技术博客者加分。',
+]
+
+
+@lru_cache(maxsize=None)
+def _load_template(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'r', encoding='utf-8') as f:
+        return Template(f.read())
+
+
+class SyntheticJobs:
+    """
+    固定种子的合成职位数据集。第 i 个职位的内容只由 (种子, i) 决定，
+    各数据源的页面按需渲染，不需要在内存中预先生成全部职位。
+    """
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.seed = seed
+        self.zhaopin_count = int(size * ZHAOPIN_SHARE)
+        self.givemeoc_count = int(size * GIVEMEOC_SHARE)
+        self.rss_count = size - self.zhaopin_count - self.givemeoc_count
+        self.zhaopin_pages = math.ceil(self.zhaopin_count / ZHAOPIN_JOBS_PER_PAGE)
+        self.rss_feeds = math.ceil(self.rss_count / RSS_ITEMS_PER_FEED)
+        # 公司数量约为职位数的五分之一，同一公司会发布多个职位
+        self.company_count = max(1, size // 5)
+
+    def company(self, index):
+        rng = random.Random(f"{self.seed}-company-{index}")
+        name = ''.join(rng.choice(_COMPANY_WORDS) for _ in range(2))
+        return f"{rng.choice(_CITIES)}{name}{rng.choice(_COMPANY_TYPES)}有限公司"
+
+    def job(self, index):
+        """第 index 个职位的各字段。"""
+        rng = random.Random(f"{self.seed}-job-{index}")
+        city_index = rng.randrange(len(_CITIES))
+        fields = {
+            'domain': rng.choice(_DOMAINS),
+            'skill': rng.choice(_SKILLS),
+            'education': rng.choice(_EDUCATION),
+            'city': _CITIES[city_index],
+            'district': _DISTRICTS[city_index],
+        }
+        low = rng.randrange(4, 30)
+        return {
+            'title': f"{rng.choice(_LEVELS)}{rng.choice(_ROLES)}（{fields['domain']}方向）",
+            'role': rng.choice(_ROLES),
+            'company': self.company(rng.randrange(self.company_count)),
+            'salary': f"{low / 10:.1f}-{(low + rng.randrange(3, 15)) / 10:.1f}万" if low > 9 else f"{low * 1000}-{(low + 4) * 1000}元",
+            'location': f"{fields['city']}·{fields['district']}",
+            'experience': rng.choice(_EXPERIENCE),
+            'education': fields['education'],
+            'skills': ' '.join(rng.sample(_SKILLS, 4)),
+            'paragraphs': [rng.choice(_SENTENCES).format(**fields) for _ in range(rng.randrange(4, 9))],
+        }
+
+    def zhaopin_page(self, page):
+        """第 page 页（从1开始）智联招聘搜索结果的Markdown，超出末页时返回不含职位的页面。"""
+        job_template = _load_template('zhaopin_job.md')
+        start = (page - 1) * ZHAOPIN_JOBS_PER_PAGE
+        end = min(self.zhaopin_count, start + ZHAOPIN_JOBS_PER_PAGE) if page >= 1 else start
+        blocks = []
+        for index in range(start, end):
+            job = self.job(index)
+            blocks.append(job_template.substitute(
+                title=job['title'], job_id=f"{index:012d}J{self.seed:08d}", salary=job['salary'],
+                company=job['company'], company_id=f"{index % self.company_count:08d}",
+                location=job['location'], experience=job['experience'], education=job['education'],
+                skills=job['skills'],
+            ))
+        return _load_template('zhaopin_page.md').substitute(
+            total=self.zhaopin_count, page=page, next_page=page + 1, jobs=''.join(blocks)
+        )
+
+    def givemeoc_page(self, page=None):
+        """GiveMeOC首页（全部职位行）；指定 page（从1开始）时只返回该页的 GIVEMEOC_ROWS_PER_PAGE 行。"""
+        row_template = _load_template('givemeoc_row.html')
+        today = datetime.now().strftime('%Y-%m-%d')
+        rows = []
+        offset = self.zhaopin_count
+        if page is None:
+            indexes = range(self.givemeoc_count)
+        else:
+            start = (page - 1) * GIVEMEOC_ROWS_PER_PAGE
+            indexes = range(max(0, start), min(self.givemeoc_count, start + GIVEMEOC_ROWS_PER_PAGE))
+        for k in indexes:
+            # 每20行转载一个智联招聘上的职位（同一公司同一岗位），用于覆盖跨来源去重
+            job = self.job(k if k % 20 == 0 and k < self.zhaopin_count else offset + k)
+            rows.append(row_template.substitute(
+                row_id=offset + k, company=html.escape(job['company']),
+                recruitment_type='校招' if k % 3 else '实习', location=job['location'].split('·')[0],
+                position=html.escape(job['role']), url=f"https://campus.example.com/apply/{offset + k}",
+                update_date=today,
+            ))
+        return _load_template('givemeoc_page.html').substitute(rows='\n'.join(rows))
+
+    def _article_job(self, article_id):
+        """公众号文章对应的职位；每隔 RSS_REPOST_EVERY 篇转载上一个公众号同一位置的文章。"""
+        if article_id % RSS_REPOST_EVERY == RSS_REPOST_EVERY - 1 and article_id >= RSS_ITEMS_PER_FEED:
+            article_id -= RSS_ITEMS_PER_FEED
+        return self.job(self.zhaopin_count + self.givemeoc_count + article_id)
+
+    def rss_feed(self, feed, base_url):
+        item_template = _load_template('rss_item.xml')
+        account = f"校招信息速递{feed:04d}"
+        # 发布时间为UTC+8的当前时间，保证通过爬虫的24小时过滤
+        now = datetime.now(timezone(timedelta(hours=8)))
+        items = []
+        first = feed * RSS_ITEMS_PER_FEED
+        for k, article_id in enumerate(range(first, min(self.rss_count, first + RSS_ITEMS_PER_FEED))):
+            job = self._article_job(article_id)
+            items.append(item_template.substitute(
+                title=html.escape(f"{job['company']}2026届{job['role']}招聘"),
+                url=f"{base_url}/n/{self.size}/article/{article_id}",
+                account=account,
+                pub_date=(now - timedelta(minutes=k)).strftime('%a, %d %b %Y %H:%M:%S'),
+                summary=html.escape(job['paragraphs'][0]),
+            ))
+        return _load_template('rss_feed.xml').substitute(account=account, items='\n'.join(items))
+
+    def article(self, article_id):
+        job = self._article_job(article_id)
+        paragraphs = [f"<p>{html.escape(job['company'])}招聘{html.escape(job['title'])}</p>"]
+        paragraphs += [f"<p>{html.escape(text)}</p>" for text in job['paragraphs']]
+        paragraphs.append(f"<p>投递邮箱: hr{article_id}@example.com，工作地点: {job['location']}</p>")
+        return _load_template('wechat_article.html').substitute(
+            title=html.escape(f"{job['company']}2026届{job['role']}招聘"), article_id=article_id,
+            account="校招信息速递", paragraphs='\n'.join(paragraphs),
+        )
+
+
+_JOB_ID_RE = re.compile(r'"id":"(J\d+)"')
+_PROFILE_ID_RE = re.compile(r'^\s*(P\d+): 用户学历', re.MULTILINE)
+
+
+def fake_chat_completion(request):
+    """
+    模拟OpenAI兼容接口的响应：JSON模式（职位匹配）从Prompt中取出职位编号，
+    挑出前3个作为核心匹配、随后3个作为其他关注（多画像Prompt中每位用户依次错开一个职位）；
+    普通模式（市场总结）返回固定文本。
+    """
+    messages = request.get('messages') or []
+    prompt = ''.join(message.get('content') or '' for message in messages)
+    if (request.get('response_format') or {}).get('type') == 'json_object':
+        ids = _JOB_ID_RE.findall(prompt)
+
+        def picks(offset):
+            return {
+                "matched": [{"id": job_id, "reason": "专业与岗位要求匹配"} for job_id in ids[offset:offset + 3]],
+                "other": [{"id": job_id, "reason": "可作为备选关注"} for job_id in ids[offset + 3:offset + 6]],
+            }
+        profile_ids = _PROFILE_ID_RE.findall(prompt)
+        if profile_ids:
+            content = json.dumps({profile_id: picks(i) for i, profile_id in enumerate(profile_ids)}, ensure_ascii=False)
+        else:
+            content = json.dumps(picks(0), ensure_ascii=False)
+    else:
+        content = "基准测试替身服务生成的市场总结：后端与数据方向需求最旺盛。"
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get('model') or 'bench',
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        # 与启发式估算一致的粗略token数，只用于指标展示
+        "usage": {
+            "prompt_tokens": len(prompt) // 2,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": len(prompt) // 2 + len(content) // 4,
+        },
+    }
+
+
+_EMBEDDER = HashingEmbeddingProvider(256)
+
+
+def fake_embeddings(request):
+    """模拟OpenAI兼容的 /embeddings 接口：用256维特征哈希为每段输入生成向量。"""
+    texts = request.get('input') or []
+    if isinstance(texts, str):
+        texts = [texts]
+    vectors = _EMBEDDER.embed(texts)
+    tokens = sum(len(text) for text in texts) // 2
+    return {
+        "object": "list",
+        "model": request.get('model') or 'bench',
+        "data": [{"object": "embedding", "index": i, "embedding": vector.tolist()} for i, vector in enumerate(vectors)],
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _dataset(self, size):
+        return self.server.dataset(int(size))
+
+    def _firecrawl_document(self, url):
+        """Firecrawl对一个智联招聘搜索页URL的抓取结果。"""
+        target = urlsplit(url)
+        size = target.path.strip('/').split('/')[1]
+        page = int(parse_qs(target.query).get('p', ['1'])[0])
+        return {"markdown": self._dataset(size).zhaopin_page(page), "metadata": {"sourceURL": url}}
+
+    def _batch_status(self, job_id, skip):
+        """批量抓取任务的状态；完成后按完成顺序（与提交顺序相反）每次返回 FIRECRAWL_BATCH_PAGE_SIZE 条。"""
+        urls, polls = self.server.batch_poll(job_id)
+        if urls is None:
+            return self._send(404, 'not found', 'text/plain')
+        if polls == 1:
+            body = {"status": "scraping", "completed": 0, "total": len(urls), "data": []}
+        else:
+            documents = [self._firecrawl_document(url) for url in reversed(urls)]
+            body = {"status": "completed", "completed": len(urls), "total": len(urls),
+                    "data": documents[skip:skip + FIRECRAWL_BATCH_PAGE_SIZE]}
+            if skip + FIRECRAWL_BATCH_PAGE_SIZE < len(documents):
+                body["next"] = (f"{self.server.base_url}/firecrawl/v1/batch/scrape/{job_id}"
+                                f"?skip={skip + FIRECRAWL_BATCH_PAGE_SIZE}")
+        self._send(200, json.dumps(body, ensure_ascii=False), 'application/json')
+
+    def do_GET(self):
+        time.sleep(self.server.http_latency)
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if parts[:3] == ['firecrawl', 'v1', 'batch'] and len(parts) == 5:
+            skip = int(parse_qs(urlsplit(self.path).query).get('skip', ['0'])[0])
+            return self._batch_status(parts[4], skip)
+        if len(parts) >= 3 and parts[0] == 'n':
+            dataset = self._dataset(parts[1])
+            kind = parts[2]
+            if kind == 'givemeoc':
+                page = parse_qs(urlsplit(self.path).query).get('page')
+                return self._send(200, dataset.givemeoc_page(int(page[0]) if page else None), 'text/html; charset=utf-8')
+            if kind == 'rss' and len(parts) == 4:
+                feed = int(parts[3].split('.')[0])
+                return self._send(200, dataset.rss_feed(feed, self.server.base_url), 'application/rss+xml; charset=utf-8')
+            if kind == 'article' and len(parts) == 4:
+                return self._send(200, dataset.article(int(parts[3])), 'text/html; charset=utf-8')
+        self._send(404, 'not found', 'text/plain')
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        request = self._read_json()
+        if path == '/firecrawl/v1/scrape':
+            time.sleep(self.server.http_latency)
+            markdown = self._firecrawl_document(request.get('url', ''))['markdown']
+            return self._send(200, json.dumps({"success": True, "data": {"markdown": markdown}}, ensure_ascii=False),
+                              'application/json')
+        if path == '/firecrawl/v1/batch/scrape':
+            time.sleep(self.server.http_latency)
+            job_id = self.server.submit_batch(request.get('urls') or [])
+            return self._send(200, json.dumps({"success": True, "id": job_id}), 'application/json')
+        if path == '/llm/v1/chat/completions':
+            time.sleep(self.server.llm_latency)
+            return self._send(200, json.dumps(fake_chat_completion(request), ensure_ascii=False), 'application/json')
+        if path == '/llm/v1/embeddings':
+            time.sleep(self.server.llm_latency)
+            return self._send(200, json.dumps(fake_embeddings(request)), 'application/json')
+        self._send(404, 'not found', 'text/plain')
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, llm_latency=0.05, http_latency=0.0, seed=42):
+        """
+        :param llm_latency: 每次模型调用的模拟延迟（秒）
+        :param http_latency: 每次抓取请求（Firecrawl、页面、RSS、文章）的模拟延迟（秒）
+        """
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.llm_latency = llm_latency
+        self.http_latency = http_latency
+        self.seed = seed
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+        self._datasets = {}
+        self._batches = {}
+        self.batch_submissions = []
+        self._lock = threading.Lock()
+
+    def dataset(self, size):
+        with self._lock:
+            if size not in self._datasets:
+                self._datasets[size] = SyntheticJobs(size, seed=self.seed)
+            return self._datasets[size]
+
+    def submit_batch(self, urls):
+        """登记一个批量抓取任务，返回任务ID。"""
+        with self._lock:
+            job_id = f"batch-{len(self.batch_submissions) + 1}"
+            self._batches[job_id] = [list(urls), 0]
+            self.batch_submissions.append(list(urls))
+            return job_id
+
+    def batch_poll(self, job_id):
+        """记一次状态查询，返回 (任务的URL列表, 已查询次数)；任务不存在时URL列表为None。"""
+        with self._lock:
+            batch = self._batches.get(job_id)
+            if batch is None:
+                return None, 0
+            batch[1] += 1
+            return batch[0], batch[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='bench-stub-server', daemon=True).start()
+        return self
@@ -7,6 +7,10 @@ load_dotenv()
 
 # --- 爬虫相关配置 ---
 GIVE_ME_OC_URL = os.getenv("GIVE_ME_OC_URL", "https://www.givemeoc.com/")
+# GiveMeOC 分页列表地址模板（按更新时间倒序，{page} 为页码）；留空则只抓取首页
+GIVE_ME_OC_PAGE_URL = os.getenv("GIVE_ME_OC_PAGE_URL", "")
+GIVE_ME_OC_MAX_PAGES = int(os.getenv("GIVE_ME_OC_MAX_PAGES", 50))  # 分页抓取时最多翻的页数
+GIVE_ME_OC_LOOKBACK_DAYS = int(os.getenv("GIVE_ME_OC_LOOKBACK_DAYS", 15))  # 只保留近N天更新的职位，<=0 表示不限
 
 # 模拟浏览器请求头，防止被识别为爬虫
 HEADERS = {
@@ -20,10 +24,59 @@ HEADERS = {
 # --- 数据存储 ---
 OPML_FILE_PATH = os.getenv("OPML_FILE_PATH", "data/rss_feed.opml")
 MATCHED_JOBS_SUMMARY_PATH = os.getenv("MATCHED_JOBS_SUMMARY_PATH", "data/matched_jobs_summary.json")
+# 运行指标：JSON运行记录默认与匹配结果放在同一目录；Prometheus textfile路径为空时不导出
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_JSON_PATH = os.getenv(
+    "METRICS_JSON_PATH", os.path.join(os.path.dirname(MATCHED_JOBS_SUMMARY_PATH), "run_metrics.json")
+)
+METRICS_PROMETHEUS_PATH = os.getenv("METRICS_PROMETHEUS_PATH", "data/job_agent.prom")
+# 抓取存档：record 保存本次运行抓到的全部原始响应，replay 用存档代替网络请求重跑流水线，off 关闭
+CAPTURE_MODE = os.getenv("CAPTURE_MODE", "off").lower()
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "data/captures")
+CAPTURE_RUN_ID = os.getenv("CAPTURE_RUN_ID", "")  # 回放的存档编号（文件名），留空则回放最新一次
+CAPTURE_KEEP_RUNS = int(os.getenv("CAPTURE_KEEP_RUNS", 10))  # 最多保留的存档个数，<=0 表示不清理
+# 爬虫增量抓取状态（RSS源的ETag/Last-Modified、最近处理过的文章等）
+SCRAPER_STATE_PATH = os.getenv("SCRAPER_STATE_PATH", "data/scraper_state.json")
+# 微信文章正文缓存（压缩存储已提取的正文，重复运行时跳过下载和解析）
+ARTICLE_CACHE_PATH = os.getenv("ARTICLE_CACHE_PATH", "data/article_cache.sqlite3")
+ARTICLE_CACHE_MAX_MB = float(os.getenv("ARTICLE_CACHE_MAX_MB", 200))  # 缓存总大小上限(MB)，超出后按最近访问时间淘汰
+ARTICLE_CACHE_TTL_DAYS = float(os.getenv("ARTICLE_CACHE_TTL_DAYS", 30))  # 缓存条目最长保留天数
+# 已处理职位记录：只把新出现或内容变化的职位送去AI匹配，其余沿用上次结果
+SEEN_JOBS_ENABLED = os.getenv("SEEN_JOBS_ENABLED", "true").lower() in ("1", "true", "yes")
+SEEN_JOBS_DB_PATH = os.getenv("SEEN_JOBS_DB_PATH", "data/seen_jobs.sqlite3")
+SEEN_JOBS_RETENTION_DAYS = float(os.getenv("SEEN_JOBS_RETENTION_DAYS", 30))  # 超过该天数未再出现的职位记录将被清理
+# 职位库：保存每次运行的原始职位、清洗后职位、匹配结果和运行记录，定时报告从这里查询；路径为空则不启用
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "data/jobs.sqlite3")
+JOB_STORE_KEEP_RUNS = int(os.getenv("JOB_STORE_KEEP_RUNS", 60))  # 最多保留最近多少次运行的数据，<=0 表示不清理
+# 跨来源近似去重（SimHash），最大汉明距离越大合并越激进
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", 6))
+# 启用的数据源（逗号分隔，按注册名或 "模块路径:类名"），内置: zhaopin, givemeoc, opml, zhaolian, boss
+JOB_SOURCES = os.getenv("JOB_SOURCES", "zhaopin,givemeoc,opml")
+JOB_SEARCH_KEYWORD = os.getenv("JOB_SEARCH_KEYWORD", "工程师")  # 按关键字搜索的数据源使用的关键字
+SOURCE_TIMEOUT_SECONDS = float(os.getenv("SOURCE_TIMEOUT_SECONDS", 600))  # 单个数据源的默认超时，<=0 表示不限制
+SOURCE_TIMEOUTS = os.getenv("SOURCE_TIMEOUTS", "")  # 按数据源覆盖超时，如: opml=900,zhaopin=300
+# 流式流水线：抓取、清洗和AI匹配重叠进行；队列大小（按批计）和同时在途的匹配块数上限共同提供背压
+# 流式模式无法做全局排名，需要配合 PREFILTER_MIN_SCORE 阈值使用，默认使用批处理流程
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "false").lower() in ("1", "true", "yes")
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 16))
+PIPELINE_MAX_INFLIGHT_CHUNKS = int(os.getenv("PIPELINE_MAX_INFLIGHT_CHUNKS", 8))
+# 本地BM25相关度预筛选：按用户专业和扩展关键词打分，只把前N个或超过阈值的职位送去AI匹配
+PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFILTER_KEYWORDS = os.getenv("PREFILTER_KEYWORDS", "")  # 逗号分隔的扩展关键词，如: 软件开发,后端,Python
+PREFILTER_TOP_N = int(os.getenv("PREFILTER_TOP_N", 300))  # 最多送去匹配的职位数，<=0 表示不限制
+PREFILTER_MIN_SCORE = float(os.getenv("PREFILTER_MIN_SCORE", 0))  # 相关度分数下限
+# 预筛选的打分方式：bm25（关键词匹配）或 embedding（职位与画像向量的余弦相似度，0~1）
+PREFILTER_SCORER = os.getenv("PREFILTER_SCORER", "bm25").lower()
 
 # --- 用户个人信息 ---
 USER_EDUCATION = os.getenv("USER_EDUCATION", "本科")  # 例如: 高中, 大专, 本科, 硕士, 博士
 USER_MAJOR = os.getenv("USER_MAJOR", "计算机科学与技术")  # 例如: 计算机科学与技术, 软件工程, 市场营销
+# 多用户画像：一次抓取、清洗后为多位用户分别匹配，格式为 "名称:学历:专业[:扩展关键词[:收件邮箱]]"，
+# 多个画像以分号分隔，扩展关键词以逗号分隔；留空时只使用上面的 USER_EDUCATION/USER_MAJOR
+USER_PROFILES = os.getenv("USER_PROFILES", "")
+# 每次模型请求中同时评估的画像数上限（画像更多时同一块职位分几次请求）
+MATCH_PROFILES_PER_REQUEST = int(os.getenv("MATCH_PROFILES_PER_REQUEST", 5))
 
 # --- OpenAI API (用于调用Gemini) ---
 # 如果使用Google Cloud Vertex AI或OpenAI兼容的Gemini代理，请填写相应的BASE_URL和API_KEY
@@ -32,6 +85,40 @@ OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")  # 
 # Gemini模型名称，例如 'gemini-1.5-flash-latest', 'gemini-1.5-pro-latest', 'gemini-2.0-flash-exp'
 # 确认你的API提供商支持的模型名称
 GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash-exp")
+# 并发匹配的最大并发数（AIMD自适应调整的上限）和初始并发数
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", 2))
+# 遇到429/5xx时的最大重试次数；响应没有Retry-After头时的初始退避秒数（每次重试翻倍）
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", 2))
+# 按token预算分块：分词器(heuristic 或 tiktoken[:编码名])、模型上下文窗口、输出预留、
+# 每块职位数据的输入token预算、单个职位的token上限（超出时截断描述）以及每块最多职位数
+# 每块最多职位数默认10：核心匹配和其他关注各最多选5个，一块中的每个职位都有机会被选中
+LLM_TOKENIZER = os.getenv("LLM_TOKENIZER", "heuristic")
+LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", 32000))
+LLM_OUTPUT_RESERVE_TOKENS = int(os.getenv("LLM_OUTPUT_RESERVE_TOKENS", 2048))
+LLM_CHUNK_TOKEN_BUDGET = int(os.getenv("LLM_CHUNK_TOKEN_BUDGET", 6000))
+LLM_MAX_JOB_TOKENS = int(os.getenv("LLM_MAX_JOB_TOKENS", 800))
+LLM_MAX_JOBS_PER_CHUNK = int(os.getenv("LLM_MAX_JOBS_PER_CHUNK", 10))
+# 模型响应缓存：相同模型、Prompt版本、用户画像和职位数据时直接复用上次结果
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3")
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", 72))  # 缓存条目最长保留小时数
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))  # 最多保留的条目数，超出后淘汰最久未访问的
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() in ("1", "true", "yes")  # 为true时跳过读取缓存，强制重新调用
+
+# --- 职位向量 (PREFILTER_SCORER=embedding 时使用) ---
+# 向量化方式：hashing[:维度]（本地特征哈希，无需模型服务）或 openai[:模型名]（OpenAI兼容的 /embeddings 接口）
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "hashing")
+# 向量接口的地址和密钥，默认与上面的模型接口相同；可指向本地部署的兼容服务
+EMBEDDING_BASE_URL = os.getenv("EMBEDDING_BASE_URL", OPENAI_BASE_URL)
+EMBEDDING_API_KEY = os.getenv("EMBEDDING_API_KEY", OPENAI_API_KEY)
+# 向量库目录（按内容指纹缓存职位向量，内容不变的职位不会重复计算）
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "data/embeddings")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))  # 每次向量化请求的职位数
+EMBEDDING_MAX_CHARS = int(os.getenv("EMBEDDING_MAX_CHARS", 2000))  # 参与向量化的职位文本长度上限（字符）
+# 向量打分的相似度下限（0~1），与BM25分数的量纲不同，不使用 PREFILTER_MIN_SCORE
+EMBEDDING_MIN_SCORE = float(os.getenv("EMBEDDING_MIN_SCORE", 0))
+EMBEDDING_RETENTION_DAYS = float(os.getenv("EMBEDDING_RETENTION_DAYS", 30))  # 超过该天数未再出现的职位向量将被清理，<=0 表示不清理
 
 # --- SMTP 邮件服务配置 ---
 SMTP_SERVER = os.getenv("SMTP_SERVER")  # 例如: smtp.gmail.com, smtp.qq.com
@@ -43,12 +130,54 @@ RECIPIENT_EMAIL = os.getenv("RECIPIENT_EMAIL")  # 收件人邮箱地址
 # --- 定时任务配置 ---
 # 邮件发送时间，格式为 "HH:MM"，24小时制
 EMAIL_SEND_TIME = os.getenv("EMAIL_SEND_TIME", "09:00")  # 例如: "09:00" 表示每天上午9点发送
+# 提前开始运行流水线，使报告在发送时间前已生成：提前量为最近几次成功运行耗时的P90乘以安全系数，
+# 没有历史记录时提前 SCHEDULE_DEFAULT_LEAD_MINUTES 分钟，并限制在 [最小, 最大] 提前量之间
+SCHEDULE_DEFAULT_LEAD_MINUTES = float(os.getenv("SCHEDULE_DEFAULT_LEAD_MINUTES", 30))
+SCHEDULE_SAFETY_FACTOR = float(os.getenv("SCHEDULE_SAFETY_FACTOR", 1.5))
+SCHEDULE_MIN_LEAD_MINUTES = float(os.getenv("SCHEDULE_MIN_LEAD_MINUTES", 5))
+SCHEDULE_MAX_LEAD_MINUTES = float(os.getenv("SCHEDULE_MAX_LEAD_MINUTES", 180))
+# 到发送时间流水线仍未完成时最多再等待的分钟数，超时后发送最近一次已完成运行的结果
+SCHEDULE_MAX_WAIT_MINUTES = float(os.getenv("SCHEDULE_MAX_WAIT_MINUTES", 60))
+# 调度器重启后补跑错过的报告的期限（发送时间之后的小时数），超过后等到下一天；<=0 表示不补跑
+SCHEDULE_CATCHUP_HOURS = float(os.getenv("SCHEDULE_CATCHUP_HOURS", 12))
+# 调度器状态（最近的运行耗时、已发送报告的日期），以及防止流水线重复运行的锁文件
+SCHEDULER_STATE_PATH = os.getenv("SCHEDULER_STATE_PATH", "data/scheduler_state.json")
+PIPELINE_LOCK_PATH = os.getenv("PIPELINE_LOCK_PATH", "data/pipeline.lock")
+PIPELINE_LOCK_STALE_HOURS = float(os.getenv("PIPELINE_LOCK_STALE_HOURS", 6))  # 没有系统文件锁(flock)时，超过该时长的锁视为异常退出遗留
 
 # --- Firecrawl API (用于抓取JS渲染的网站) ---
 FIRECRAWL_API_KEY = os.getenv("FIRECRAWL_API_KEY")
+# Firecrawl API根地址，可改为本地替身服务地址用于测试
+FIRECRAWL_API_URL = os.getenv("FIRECRAWL_API_URL", "https://api.firecrawl.dev/v1")
+FIRECRAWL_CONNECT_TIMEOUT = float(os.getenv("FIRECRAWL_CONNECT_TIMEOUT", 10))  # 连接超时(秒)
+FIRECRAWL_READ_TIMEOUT = float(os.getenv("FIRECRAWL_READ_TIMEOUT", 120))  # 读取超时(秒)，页面渲染较慢时可调大
+FIRECRAWL_MAX_RETRIES = int(os.getenv("FIRECRAWL_MAX_RETRIES", 3))  # 最大重试次数：GET在连接错误、429和5xx时重试，提交抓取的POST只在连接错误和429时重试
+FIRECRAWL_POOL_SIZE = int(os.getenv("FIRECRAWL_POOL_SIZE", 4))  # 长连接池大小
 
 # --- 智联招聘爬虫配置 ---
 # 请在.env文件中设置此URL，并用 {page} 作为页码的占位符
 # 例如: https://www.zhaopin.com/sou/jl489/kwpython/p{page}
 ZHAOPIN_SEARCH_URL = os.getenv("ZHAOPIN_SEARCH_URL")
-ZHAOPIN_MAX_PAGES = int(os.getenv("ZHAOPIN_MAX_PAGES", 3)) # 默认抓取3页
\ No newline at end of file
+ZHAOPIN_MAX_PAGES = int(os.getenv("ZHAOPIN_MAX_PAGES", 3)) # 默认抓取3页
+# 同时向Firecrawl提交渲染的页数（推测式预取），遇到末页后丢弃多余的页；设为1则逐页串行抓取
+ZHAOPIN_PREFETCH_PAGES = int(os.getenv("ZHAOPIN_PREFETCH_PAGES", 3))
+# 为 true 时每 ZHAOPIN_PREFETCH_PAGES 页用Firecrawl批量抓取接口提交一次并轮询结果，代替逐页并行请求
+ZHAOPIN_BATCH_SCRAPE = os.getenv("ZHAOPIN_BATCH_SCRAPE", "false").lower() in ("1", "true", "yes")
+
+# --- RSS 批量抓取配置 ---
+# 同时抓取的RSS源数量上限（全局并发）
+RSS_MAX_CONCURRENCY = int(os.getenv("RSS_MAX_CONCURRENCY", 8))
+# 同一主机同时进行中的请求数上限（礼貌性限流）
+RSS_PER_HOST_CONCURRENCY = int(os.getenv("RSS_PER_HOST_CONCURRENCY", 2))
+# 同一主机相邻两次请求之间的最小间隔（秒），替代原先固定的 sleep(1)
+RSS_PER_HOST_INTERVAL = float(os.getenv("RSS_PER_HOST_INTERVAL", 0.5))
+
+# --- 文章抓取并发与限速配置 ---
+# 单个RSS源内并行抓取文章的线程数
+ARTICLE_FETCH_WORKERS = int(os.getenv("ARTICLE_FETCH_WORKERS", 4))
+# 每个域名每秒允许的文章请求数（令牌桶，一次运行内所有RSS源共享），替代原先每篇文章固定的 sleep(2)
+ARTICLE_RATE_PER_SECOND = float(os.getenv("ARTICLE_RATE_PER_SECOND", 1.0))
+# 令牌桶容量，即同一域名允许的瞬时突发请求数
+ARTICLE_RATE_BURST = int(os.getenv("ARTICLE_RATE_BURST", 2))
+# 按域名单独设置限速，格式: "mp.weixin.qq.com=1,example.com=0.5"
+ARTICLE_RATE_OVERRIDES = os.getenv("ARTICLE_RATE_OVERRIDES", "")
@@ -2,210 +2,421 @@
 import pandas as pd
 import json
 import os
-import re
 import time
 
 # 导入配置
-from config import OPML_FILE_PATH, MATCHED_JOBS_SUMMARY_PATH, ZHAOPIN_SEARCH_URL, ZHAOPIN_MAX_PAGES
+from config import (
+    MATCHED_JOBS_SUMMARY_PATH, JOB_SOURCES, SOURCE_TIMEOUT_SECONDS, SOURCE_TIMEOUTS,
+    SEEN_JOBS_ENABLED, SEEN_JOBS_DB_PATH, SEEN_JOBS_RETENTION_DAYS, DEDUP_ENABLED, DEDUP_MAX_DISTANCE,
+    PREFILTER_ENABLED, PREFILTER_TOP_N, PREFILTER_MIN_SCORE, PREFILTER_SCORER,
+    PIPELINE_STREAMING, PIPELINE_QUEUE_SIZE, PIPELINE_MAX_INFLIGHT_CHUNKS, CAPTURE_MODE,
+    JOB_STORE_PATH, JOB_STORE_KEEP_RUNS, PIPELINE_LOCK_PATH, PIPELINE_LOCK_STALE_HOURS,
+    EMBEDDING_MIN_SCORE, EMBEDDING_RETENTION_DAYS
+)
 
 # 导入我们的模块
-from scraping.givemeoc_scraper import GiveMeOcScraper
-from scraping.opml_rss_scraper import OpmlRssScraper
-from scraping.firecrawl_scraper import FirecrawlScraper
-from nlp.standardize import process_jobs_dataframe, match_jobs_in_chunk, summarize_market_trends
+from scraping.registry import load_sources, parse_source_timeouts, SourceRunner
+from nlp.standardize import process_jobs_dataframe
+from nlp.dedup import deduplicate_jobs
+from nlp.chunk_planner import ChunkPlanner
+from nlp.profiles import ProfileSet, load_profiles, profile_path
+from nlp.embeddings import open_embedder
+from nlp.matching_engine import ConcurrentMatcher
+from nlp.streaming import StreamingMatchStage
+from nlp.llm_cache import get_llm_cache
+from storage.seen_jobs import SeenJobsStore
+from storage.job_store import JobStore
+from storage.run_lock import RunLock
+from metrics import start_run, get_metrics, export_run
+from scraping.capture import open_capture, close_capture, is_replaying
+from scraping.state_store import hold_state_stores, release_state_stores
 
-def parse_zhaopin_markdown(markdown_content):
+def pipeline_lock():
+    """流水线运行锁：定时任务和手动运行共用同一个锁文件，同一时间只有一个流水线在运行。"""
+    return RunLock(PIPELINE_LOCK_PATH, PIPELINE_LOCK_STALE_HOURS * 3600)
+
+def start_sources():
+    """按配置 JOB_SOURCES 加载并启动所有数据源，返回正在运行的 SourceRunner。"""
+    source_classes = load_sources(JOB_SOURCES)
+    runner = SourceRunner(
+        source_classes,
+        default_timeout=SOURCE_TIMEOUT_SECONDS,
+        timeouts=parse_source_timeouts(SOURCE_TIMEOUTS),
+        queue_size=PIPELINE_QUEUE_SIZE
+    )
+    print(f"  已启用 {len(source_classes)} 个数据源，并发抓取: "
+          f"{', '.join(SourceRunner.display_name(cls) for cls in source_classes) or '无'}")
+    runner.start()
+    return runner
+
+def _open_seen_stores(profiles):
     """
-    解析Firecrawl返回的智联招聘页面的Markdown内容。
-    :param markdown_content: Firecrawl返回的Markdown字符串
-    :return: 结构化的职位信息列表
+    打开各画像的已处理职位记录（多画像时每个画像一个文件），返回 {画像名称: SeenJobsStore}。
+    未启用时返回空字典；某个画像的记录打开失败时，该画像对全部职位进行匹配。
     """
-    print("  正在解析Firecrawl返回的Markdown内容...")
-    jobs = []
-    if not markdown_content:
-        return jobs
+    if not SEEN_JOBS_ENABLED:
+        return {}
+    if is_replaying():
+        # 回放的是已经处理过的数据，跳过去重记录，保证每次回放都完整重跑匹配
+        return {}
+    stores = {}
+    for profile in profiles:
+        try:
+            stores[profile.name] = SeenJobsStore(profile_path(SEEN_JOBS_DB_PATH, profile, len(profiles) > 1))
+        except Exception as e:
+            print(f"打开已处理职位记录失败，将为画像 {profile.name} 对全部职位进行匹配: {e}")
+    return stores
 
-    job_blocks = markdown_content.split("收藏")
-    print(f"  初步分割出 {len(job_blocks)} 个职位信息块，开始逐一解析...")
+def _close_seen_stores(seen_stores):
+    for seen_store in seen_stores.values():
+        removed = seen_store.prune(SEEN_JOBS_RETENTION_DAYS)
+        if removed:
+            print(f"清理了 {removed} 条超过 {SEEN_JOBS_RETENTION_DAYS} 天未再出现的职位记录。")
+        seen_store.close()
 
-    for block in job_blocks:
-        if not block.strip() or "jobdetail" not in block:
-            continue
+def _open_job_store():
+    """打开职位库；未配置或打开失败时返回None（此时结果只保存到JSON文件）。"""
+    if not JOB_STORE_PATH:
+        return None
+    if CAPTURE_MODE == "replay":
+        # 回放的是旧数据，不能作为最近一次成功运行被发送邮件，其耗时也不代表真实运行
+        print("回放模式下不写入职位库。")
+        return None
+    try:
+        return JobStore(JOB_STORE_PATH)
+    except Exception as e:
+        print(f"打开职位库失败，本次结果只保存到JSON文件: {e}")
+        return None
 
-        try:
-            title_url_match = re.search(r'\[([^\]]+)\]\((https?://www\.zhaopin\.com/jobdetail/[^\)]+)\)', block)
-            title = title_url_match.group(1).strip() if title_url_match else 'N/A'
-            url = title_url_match.group(2).strip() if title_url_match else 'N/A'
-
-            if url == 'N/A': continue
-
-            salary_match = re.search(r'\n\s*((?:[\d.-]+(?:万|元))|面议)(?:·\d+薪)?\s*\n?', block)
-            salary = salary_match.group(1).strip() if salary_match else '面议'
-
-            company_match = re.search(r'\[([^\]]+)\]\(https?://www\.zhaopin\.com/companydetail/[^\)]+\)', block)
-            company = company_match.group(1).strip() if company_match else 'N/A'
-
-            location, experience, education = 'N/A', 'N/A', 'N/A'
-            details_match = re.search(r'location\.png\)\s*([^\n]+)\s+([^\n]+)\s+([^\n]+)', block)
-            if details_match:
-                location = details_match.group(1).strip().replace('·', ' ')
-                experience = details_match.group(2).strip()
-                education = details_match.group(3).strip()
-
-            description = f"薪资: {salary} | 地点: {location} | 经验: {experience} | 学历: {education}"
-
-            job_data = {
-                'title': title,
-                'company': company,
-                'location': location,
-                'description': description,
-                'url': url,
-                'source': '智联招聘 (Firecrawl)'
-            }
-            jobs.append(job_data)
+def _close_job_store(job_store):
+    if not job_store:
+        return
+    try:
+        removed = job_store.prune(JOB_STORE_KEEP_RUNS)
+        if removed:
+            print(f"职位库清理了 {removed} 次较早运行的数据（保留最近 {JOB_STORE_KEEP_RUNS} 次）。")
+    except Exception as e:
+        print(f"清理职位库失败: {e}")
+    job_store.close()
 
-        except Exception as e:
-            print(f"  解析职位块时出错: {e}\n块内容: {block[:150]}...")
-            continue
+def _open_embedder():
+    """预筛选使用向量打分时打开职位向量库；未启用或打开失败时返回None（此时使用BM25打分）。"""
+    if not PREFILTER_ENABLED or PREFILTER_SCORER == "bm25":
+        return None
+    if PREFILTER_SCORER != "embedding":
+        print(f"未知的预筛选打分方式 '{PREFILTER_SCORER}'，改用BM25打分。")
+        return None
+    try:
+        return open_embedder()
+    except Exception as e:
+        print(f"打开职位向量库失败，预筛选改用BM25打分: {e}")
+        return None
+
+def _close_embedder(embedder):
+    if not embedder:
+        return
+    print(embedder.stats_line())
+    get_metrics().set_count("embedded", embedder.stats["computed"])
+    try:
+        removed = embedder.store.prune(EMBEDDING_RETENTION_DAYS)
+        if removed:
+            print(f"清理了 {removed} 个超过 {EMBEDDING_RETENTION_DAYS:g} 天未再出现的职位向量。")
+    except Exception as e:
+        print(f"清理职位向量库失败: {e}")
+    embedder.close()
 
-    print(f"  成功从Markdown中解析出 {len(jobs)} 个结构化职位信息。")
-    return jobs
+def _start_capture():
+    """按配置打开抓取存档。记录模式打开失败时只打印提示；回放模式失败则抛出，不能悄悄改成联网抓取。"""
+    try:
+        capture = open_capture()
+        if capture:
+            print(f"抓取存档: {'回放' if capture.replaying else '记录'} {capture.path}")
+    except Exception as e:
+        if CAPTURE_MODE == "replay":
+            raise
+        print(f"打开抓取存档失败，本次不记录: {e}")
 
 def run_job_agent_pipeline():
     """
     运行AI求职代理的核心流程：数据获取 -> NLP分析 -> 保存结果
+    无论成功与否，结束时都会导出本次运行的指标。
     """
     print("="*50)
     print("AI求职代理启动，开始今日职位信息处理流程...")
-    
-    all_raw_jobs = []
-
-    # --- 1. 数据获取 ---
-    print("\n[STEP 1/3] 开始获取职位数据...")
 
-    # 1.1 (新增) 从智联招聘 (通过Firecrawl) 获取数据
-    print("  正在从 智联招聘(Firecrawl) 获取数据...")
-    if not ZHAOPIN_SEARCH_URL:
-        print("  警告: 未在.env文件中设置ZHAOPIN_SEARCH_URL，跳过智联招聘抓取。")
-    else:
+    metrics = start_run()
+    # 水位线等增量抓取状态在流水线成功结束、全部职位块都匹配成功后才保存，
+    # 否则下次运行会重新抓取这些职位，而不是把抓到却没有匹配成功的职位永久跳过
+    hold_state_stores()
+    matched_all = False
+    job_store = _open_job_store()
+    recorder = None
+    if job_store:
         try:
-            firecrawl_scraper = FirecrawlScraper()
-            for page in range(1, ZHAOPIN_MAX_PAGES + 1):
-                zhaopin_url = ZHAOPIN_SEARCH_URL.format(page=page)
-                print(f"    正在抓取智联招聘第 {page}/{ZHAOPIN_MAX_PAGES} 页: {zhaopin_url}")
-                
-                scraped_data = firecrawl_scraper.scrape(zhaopin_url)
-                if scraped_data and scraped_data.get("data") and scraped_data["data"].get("markdown"):
-                    markdown = scraped_data["data"]["markdown"]
-                    zhaopin_jobs = parse_zhaopin_markdown(markdown)
-                    if zhaopin_jobs:
-                        all_raw_jobs.extend(zhaopin_jobs)
-                        print(f"    成功从该页解析出 {len(zhaopin_jobs)} 条数据。")
-                    else:
-                        print("    未能从该页解析出任何职位，可能已到达末页。")
-                        break
-                else:
-                    print("    未能从Firecrawl获取有效数据，停止抓取该渠道。")
-                    break
+            recorder = job_store.start_run()
         except Exception as e:
-            print(f"  从 智联招聘(Firecrawl) 获取数据时出错: {e}")
-
-    # 1.2 从GiveMeOC获取数据
-    print("  正在从 GiveMeOC 获取数据...")
+            print(f"登记运行记录失败，本次不写入职位库: {e}")
     try:
-        givemeoc_scraper = GiveMeOcScraper()
-        givemeoc_jobs = givemeoc_scraper.scrape(keyword="工程师") 
-        if givemeoc_jobs:
-            all_raw_jobs.extend(givemeoc_jobs)
-            print(f"  成功从 GiveMeOC 获取 {len(givemeoc_jobs)} 条数据。")
+        _start_capture()
+        min_score_name, min_score = ("EMBEDDING_MIN_SCORE", EMBEDDING_MIN_SCORE) if PREFILTER_SCORER == "embedding" \
+            else ("PREFILTER_MIN_SCORE", PREFILTER_MIN_SCORE)
+        if PIPELINE_STREAMING and PREFILTER_ENABLED and min_score <= 0:
+            # 流式模式只能按阈值过滤，阈值为0时几乎所有职位都会送去匹配，PREFILTER_TOP_N 形同虚设
+            print(f"流式模式需要设置大于0的 {min_score_name}，本次改用批处理流程以按 PREFILTER_TOP_N 全局排名。")
+            matched_all = run_batch_pipeline(recorder)
+        elif PIPELINE_STREAMING:
+            matched_all = run_streaming_pipeline(recorder)
         else:
-            print("  未能从 GiveMeOC 获取数据。")
-    except Exception as e:
-        print(f"  从 GiveMeOC 获取数据时出错: {e}")
+            matched_all = run_batch_pipeline(recorder)
+        metrics.status = "ok"
+        if not matched_all:
+            print("有职位块匹配失败，本次不保存增量抓取状态，下次运行会重新抓取这些职位。")
+    except BaseException:
+        metrics.status = "error"
+        raise
+    finally:
+        release_state_stores(commit=matched_all)
+        close_capture()
+        export_run(metrics)
+        if recorder:
+            recorder.finish(metrics.status, getattr(metrics, "counts", None))
+        _close_job_store(job_store)
 
-    # 1.3 从OPML RSS源获取数据
-    print(f"  正在从OPML文件 '{OPML_FILE_PATH}' 批量抓取RSS订阅...")
-    try:
-        if os.path.exists(OPML_FILE_PATH):
-            opml_scraper = OpmlRssScraper(opml_file_path=OPML_FILE_PATH)
-            rss_jobs = opml_scraper.scrape_all(max_items_per_feed=10) 
-            if rss_jobs:
-                all_raw_jobs.extend(rss_jobs)
-                print(f"  成功从RSS源获取 {len(rss_jobs)} 条数据。")
-            else:
-                print("  未能从RSS源获取数据。")
-        else:
-            print(f"  OPML文件未找到: {OPML_FILE_PATH}，跳过RSS抓取。")
-    except Exception as e:
-        print(f"  从RSS源获取数据时出错: {e}")
+def run_batch_pipeline(recorder=None):
+    """
+    批处理版本：所有数据源抓取完毕后再统一清洗、去重、筛选和匹配。
+    :param recorder: 职位库的 RunRecorder，为None时不写入职位库
+    :return: 是否全部职位块都匹配成功（没有需要匹配的职位时也为True）
+    """
+    metrics = get_metrics()
+    all_raw_jobs = []
+
+    # --- 1. 数据获取 ---
+    print("\n[STEP 1/3] 开始获取职位数据...")
+    with metrics.stage("fetch"):
+        runner = start_sources()
+        for batch in runner.iter_batches():
+            all_raw_jobs.extend(batch)
+            if recorder:
+                recorder.add_raw_jobs(batch)
+    runner.print_report()
+    metrics.set_sources(runner.report())
+    metrics.set_count("raw", len(all_raw_jobs))
 
     if not all_raw_jobs:
         print("\n所有数据源均未能获取任何职位信息。程序退出。")
-        return
+        return True
 
     print(f"\n总共获取到 {len(all_raw_jobs)} 条原始职位数据。")
 
     # --- 2. 数据处理与NLP分析 (分块处理) ---
     print("\n[STEP 2/3] 正在清洗数据并进行AI分块分析...")
     
-    df_jobs = process_jobs_dataframe(all_raw_jobs)
+    with metrics.stage("clean"):
+        df_jobs = process_jobs_dataframe(all_raw_jobs)
     if df_jobs.empty:
         print("数据清洗后无有效数据，程序退出。")
-        return
+        return True
 
-    # 初始化用于收集所有匹配结果的列表
-    all_matched_jobs = []
-    all_other_jobs = []
-    chunk_size = 10 # 每次处理10个职位
-    num_chunks = (len(df_jobs) - 1) // chunk_size + 1
-
-    print(f"职位数据将被分为 {num_chunks} 块进行处理...")
-
-    for i in range(num_chunks):
-        start_index = i * chunk_size
-        end_index = start_index + chunk_size
-        df_chunk = df_jobs.iloc[start_index:end_index]
-        
-        print(f"\n--- 处理第 {i+1}/{num_chunks} 块 (职位 {start_index+1}-{end_index}) ---")
-        chunk_result = match_jobs_in_chunk(df_chunk)
-        
-        if chunk_result.get("matched_jobs"):
-            all_matched_jobs.extend(chunk_result["matched_jobs"])
-        if chunk_result.get("other_jobs"):
-            all_other_jobs.extend(chunk_result["other_jobs"])
-        
-        print(f"本块处理完成。累计核心匹配: {len(all_matched_jobs)}，其他关注: {len(all_other_jobs)}")
-
-    # (Reduce步骤) 对所有职位进行最终的宏观市场总结
-    print("\n所有职位块匹配完成，为避免API速率超限，开始15秒冷却...")
-    time.sleep(15)
-    print("冷却结束，开始生成最终市场总结...")
-    final_summary = summarize_market_trends(df_jobs)
+    # 跨来源近似去重：同一职位在多个渠道重复出现时只保留一条，并合并来源
+    if DEDUP_ENABLED:
+        with metrics.stage("dedup"):
+            df_jobs, dedup_stats = deduplicate_jobs(df_jobs, max_distance=DEDUP_MAX_DISTANCE)
+        print(f"近似去重: {dedup_stats['total']} 条职位合并为 {dedup_stats['unique']} 条，"
+              f"去除重复 {dedup_stats['removed']} 条，去重率 {dedup_stats['ratio']:.1%}")
+    metrics.set_count("unique", len(df_jobs))
+
+    # 抓取和清洗只做一次，之后按画像分别打分、增量过滤，匹配时同一块职位在一次请求中为多个画像挑选
+    profiles = load_profiles()
+    embedder = _open_embedder()
+    profile_set = ProfileSet(profiles, embedder=embedder, embedding_min_score=EMBEDDING_MIN_SCORE)
+    if profile_set.multi:
+        print(f"多用户画像: {', '.join(profile.name for profile in profiles)}")
+
+    # 本地相关度打分：按用户专业和扩展关键词（BM25）或职位与画像向量的相似度为每个职位计算 relevance_score
+    if PREFILTER_ENABLED:
+        try:
+            with metrics.stage("prefilter"):
+                df_jobs = profile_set.score(df_jobs)
+        finally:
+            _close_embedder(embedder)
+
+    # 增量处理：只有新出现或内容有变化的职位才送去AI匹配，其余沿用上次的匹配结果
+    profile_set.seen_stores = _open_seen_stores(profiles)
+    try:
+        df_pending = df_jobs
+        try:
+            df_pending = profile_set.partition(df_jobs)
+            if profile_set.seen_stores:
+                print(f"增量处理: {len(df_jobs)} 个职位中有 {len(df_pending)} 个为新增或已变化，"
+                      f"沿用历史结果 {profile_set.carried['matched']} 个核心匹配、{profile_set.carried['other']} 个其他关注。")
+        except Exception as e:
+            print(f"读取已处理职位记录失败，将对全部职位进行匹配: {e}")
+            profile_set.drop_seen_stores()
+            df_pending = profile_set.partition(df_jobs)
+
+        # 只把相关度最高（或超过阈值）的职位送去AI匹配
+        if PREFILTER_ENABLED:
+            with metrics.stage("prefilter"):
+                df_pending, dropped_count = profile_set.select(df_pending, PREFILTER_TOP_N, PREFILTER_MIN_SCORE)
+            print(f"相关度预筛选: 保留 {len(df_pending)} 个职位送去AI匹配，过滤掉 {dropped_count} 个相关度较低的职位。")
+
+        # 按token预算装箱分块，长文章截断到单个职位的上限，短职位尽量多装
+        with metrics.stage("plan_chunks"):
+            planner = ChunkPlanner(profiles=profiles)
+            chunks, plan_stats = planner.plan(df_pending)
+        metrics.set_count("sent", len(df_pending))
+        metrics.set_count("chunks", len(chunks))
+
+        print(f"待匹配职位将被分为 {len(chunks)} 块（约 {plan_stats['tokens']} 个token，"
+              f"每块预算 {plan_stats['token_budget']}，截断 {plan_stats['truncated']} 个超长职位），并发进行处理...")
+
+        matcher = ConcurrentMatcher(profiles=profiles)
+        with metrics.stage("match"):
+            chunk_results = matcher.match_chunks(chunks)
+
+        # 按块的原始顺序合并结果，保证报告内容稳定；匹配失败的块不记录，下次运行会重新匹配
+        for df_chunk, chunk_result in zip(chunks, chunk_results):
+            profile_set.add_chunk_result(df_chunk, chunk_result)
+    finally:
+        _close_seen_stores(profile_set.seen_stores)
+
+    matched_count, other_count = profile_set.totals()
+    print(f"所有职位块匹配完成。核心匹配: {matched_count}，其他关注: {other_count}")
+
+    finalize_run(matcher, df_jobs, profile_set, recorder)
+    return profile_set.failed_chunks == 0
+
+def run_streaming_pipeline(recorder=None):
+    """
+    流式版本的核心流程：各数据源并发抓取，抓到的职位立即经有界队列交给清洗和匹配阶段，
+    每装满一块就提交AI匹配，抓取与模型调用重叠进行，总耗时接近两者中较长的一个而不是两者之和。
+    队列和在途块数都有上限：模型跟不上时清洗阶段阻塞，队列填满后爬虫线程随之等待（背压）。
+    :param recorder: 职位库的 RunRecorder，为None时不写入职位库
+    :return: 是否全部职位块都匹配成功（没有需要匹配的职位时也为True）
+    """
+    print("\n[STEP 1/3] 以流式模式获取职位数据，同时进行清洗和AI分块匹配...")
+    metrics = get_metrics()
+    start_time = time.monotonic()
+
+    profiles = load_profiles()
+    if len(profiles) > 1:
+        print(f"多用户画像: {', '.join(profile.name for profile in profiles)}")
+    embedder = _open_embedder()
+    profile_set = ProfileSet(profiles, _open_seen_stores(profiles), streaming=True, embedder=embedder,
+                             embedding_min_score=EMBEDDING_MIN_SCORE)
+    matcher = ConcurrentMatcher(profiles=profiles)
+    stage = StreamingMatchStage(
+        matcher, ChunkPlanner(profiles=profiles),
+        profile_set,
+        prefilter=PREFILTER_ENABLED,
+        min_score=PREFILTER_MIN_SCORE,
+        # 多画像时批处理流程每个画像各取前N个，流式模式的总上限与之一致
+        max_jobs=PREFILTER_TOP_N * len(profiles) if PREFILTER_ENABLED and PREFILTER_TOP_N > 0 else 0,
+        dedup_max_distance=DEDUP_MAX_DISTANCE if DEDUP_ENABLED else None,
+        max_inflight_chunks=PIPELINE_MAX_INFLIGHT_CHUNKS
+    )
+
+    runner = start_sources()
+    try:
+        # 流式模式下抓取与清洗、匹配重叠进行，这一步的耗时包含了边抓边处理的全部工作
+        with metrics.stage("fetch_and_match"):
+            for batch in runner.iter_batches():
+                if recorder:
+                    recorder.add_raw_jobs(batch)
+                stage.feed(batch)
+        print(f"\n所有数据源抓取完毕，用时 {time.monotonic() - start_time:.1f} 秒。")
+        runner.print_report()
+        metrics.set_sources(runner.report())
+
+        print("\n[STEP 2/3] 等待剩余的AI匹配任务完成...")
+        with metrics.stage("match_drain"):
+            df_jobs = stage.finish()
+    finally:
+        stage.close()
+        _close_seen_stores(profile_set.seen_stores)
+        _close_embedder(embedder)
+
+    stats = stage.stats
+    for name in ("raw", "duplicates", "unchanged", "filtered", "sent", "chunks", "truncated"):
+        metrics.set_count(name, stats[name])
+    if not stats["raw"]:
+        print("\n所有数据源均未能获取任何职位信息。程序退出。")
+        return True
+    print(f"流式处理统计: 原始职位 {stats['raw']} 条，近似重复 {stats['duplicates']} 条，"
+          f"沿用历史结果 {stats['unchanged']} 条，相关度过低 {stats['filtered']} 条，"
+          f"送去AI匹配 {stats['sent']} 条（{stats['chunks']} 块，截断 {stats['truncated']} 个超长职位）。")
+    matched_count, other_count = profile_set.totals()
+    print(f"所有职位块匹配完成。核心匹配: {matched_count}，其他关注: {other_count}，"
+          f"抓取与匹配总用时 {time.monotonic() - start_time:.1f} 秒。")
+
+    finalize_run(matcher, df_jobs, profile_set, recorder)
+    return profile_set.failed_chunks == 0
+
+def finalize_run(matcher, df_jobs, profile_set, recorder=None):
+    """
+    生成市场总结并保存结果（批处理和流式两种流程共用）。
+    市场总结与画像无关，只生成一次；各画像的结果分别保存（多画像时每个画像一个JSON文件）。
+    """
+    # (Reduce步骤) 对所有职位进行最终的宏观市场总结；如遇过限流，会先等待冷却期结束
+    metrics = get_metrics()
+    matched_count, other_count = profile_set.totals()
+    metrics.set_count("matched", matched_count)
+    metrics.set_count("other", other_count)
+    metrics.set_count("profiles", len(profile_set.profiles))
+    metrics.set_count("failed_chunks", profile_set.failed_chunks)
+    print("\n开始生成最终市场总结...")
+    with metrics.stage("summary"):
+        final_summary = matcher.summarize(df_jobs)
+
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        removed = llm_cache.prune()
+        print(f"{llm_cache.stats_line()}，本次淘汰 {removed} 条过期/超额缓存。")
 
     # --- 3. 保存结果 ---
     print("\n[STEP 3/3] 正在整合并保存AI处理结果...")
     
     os.makedirs(os.path.dirname(MATCHED_JOBS_SUMMARY_PATH), exist_ok=True)
-    
-    final_output = {
-        "timestamp": pd.Timestamp.now().isoformat(),
-        "summary": final_summary,
-        "matched_jobs": all_matched_jobs,
-        "other_jobs": all_other_jobs
-    }
-
-    with open(MATCHED_JOBS_SUMMARY_PATH, 'w', encoding='utf-8') as f:
-        json.dump(final_output, f, ensure_ascii=False, indent=4)
-    
-    print(f"AI处理结果已成功保存到 '{MATCHED_JOBS_SUMMARY_PATH}'。")
+    timestamp = pd.Timestamp.now().isoformat()
+
+    summary_paths = []
+    with metrics.stage("save"):
+        if recorder:
+            recorder.save_clean_jobs(df_jobs)
+        for profile in profile_set.profiles:
+            results = profile_set.results[profile.name]
+            final_output = {
+                "timestamp": timestamp,
+                "summary": final_summary,
+                "matched_jobs": results["matched"],
+                "other_jobs": results["other"]
+            }
+            if recorder:
+                recorder.save_results(results["matched"], results["other"], final_summary, profile.name)
+            summary_path = profile_path(MATCHED_JOBS_SUMMARY_PATH, profile, profile_set.multi)
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                json.dump(final_output, f, ensure_ascii=False, indent=4)
+            summary_paths.append(summary_path)
+            if profile_set.multi:
+                print(f"  画像 {profile.name}: 核心匹配 {len(results['matched'])}，其他关注 {len(results['other'])}")
+
+    print(f"AI处理结果已成功保存到 {', '.join(repr(path) for path in summary_paths)}" +
+          (f"，并写入职位库 '{JOB_STORE_PATH}'（运行编号 {recorder.run_id}）。" if recorder else "。"))
     print("="*50)
     print("流程执行完毕。定时任务将在指定时间发送邮件。")
 
 
 if __name__ == "__main__":
-    try:
-        run_job_agent_pipeline()
-    except KeyboardInterrupt:
-        print("\n程序已由用户中断。")
-    except Exception as e:
-        print(f"\n程序运行出错: {e}")
\ No newline at end of file
+    lock = pipeline_lock()
+    if not lock.acquire():
+        print(f"流水线正在运行（{lock.describe_holder()}），本次不再重复运行。")
+    else:
+        try:
+            run_job_agent_pipeline()
+        except KeyboardInterrupt:
+            print("\n程序已由用户中断。")
+        except Exception as e:
+            print(f"\n程序运行出错: {e}")
+        finally:
+            lock.release()
\ No newline at end of file
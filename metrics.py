@@ -0,0 +1,361 @@
+# metrics.py
+"""
+运行指标采集：记录流水线各步骤耗时、各数据源的抓取情况、各类HTTP请求的次数/字节数/延迟，
+以及每次模型调用的延迟、输入输出token和重试次数。
+运行结束后导出为JSON运行记录（与匹配结果放在同一目录）和Prometheus textfile格式。
+所有记录只在内存中按类别累加（模型调用数量很少，逐次保留明细），开销可以忽略。
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import METRICS_ENABLED, METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH
+
+# 延迟直方图的桶上限（秒），覆盖从RSS源的几十毫秒到模型调用的几十秒
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _new_timing():
+    return {"count": 0, "errors": 0, "bytes": 0, "seconds": 0.0, "max_seconds": 0.0,
+            "buckets": [0] * len(LATENCY_BUCKETS)}
+
+
+def _observe(timing, seconds, nbytes=0, ok=True):
+    timing["count"] += 1
+    timing["seconds"] += seconds
+    timing["bytes"] += nbytes
+    if seconds > timing["max_seconds"]:
+        timing["max_seconds"] = seconds
+    if not ok:
+        timing["errors"] += 1
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            timing["buckets"][i] += 1
+            break
+
+
+def _timing_summary(timing):
+    """JSON运行记录中的汇总形式（不含直方图桶）。"""
+    count = timing["count"]
+    return {
+        "count": count,
+        "errors": timing["errors"],
+        "bytes": timing["bytes"],
+        "seconds": round(timing["seconds"], 3),
+        "avg_seconds": round(timing["seconds"] / count, 3) if count else 0.0,
+        "max_seconds": round(timing["max_seconds"], 3),
+    }
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+def _write_atomic(path, text):
+    """先写临时文件再替换，避免读取方（如node_exporter）读到写了一半的文件。"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class RunMetrics:
+    """
+    单次运行的指标记录器，线程安全。
+    - stage(): 流水线步骤耗时（同名步骤累加）
+    - record_request(): 按组件（firecrawl、rss_feed、wechat_article等）汇总HTTP请求
+    - record_timing(): 按名称汇总的其他耗时（如RSS解析）
+    - record_llm_call() / record_llm_retry(): 模型调用明细和重试次数
+    - set_sources(): 各数据源的抓取情况（SourceRunner.report() 的结果）
+    - set_count(): 流水线各环节的职位数量
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.status = "running"
+        self.stages = {}
+        self.requests = {}
+        self.timings = {}
+        self.llm_calls = []
+        self.llm_retries = 0
+        self.sources = []
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """记录 with 块内的耗时为流水线步骤 name。"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def record_request(self, component, seconds, nbytes=0, ok=True):
+        """
+        记录一次HTTP请求。
+        :param component: 请求所属的组件，如 "firecrawl"、"rss_feed"、"wechat_article"
+        :param seconds: 请求耗时
+        :param nbytes: 响应体字节数
+        :param ok: 请求是否成功
+        """
+        with self._lock:
+            _observe(self.requests.setdefault(component, _new_timing()), seconds, nbytes, ok)
+
+    def record_timing(self, name, seconds):
+        with self._lock:
+            _observe(self.timings.setdefault(name, _new_timing()), seconds)
+
+    def record_llm_call(self, kind, seconds, input_tokens=None, output_tokens=None, cached=False, error=None):
+        """
+        记录一次模型调用（命中缓存的也记录，便于统计命中率）。
+        :param kind: 调用类型，"match" 或 "summary"
+        :param input_tokens: 接口返回的输入token数，接口未返回时为None
+        :param output_tokens: 接口返回的输出token数
+        :param cached: 是否命中响应缓存（未实际调用接口）
+        :param error: 调用失败时的错误描述
+        """
+        call = {
+            "kind": kind,
+            "seconds": round(seconds, 3),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached": cached,
+            "error": error,
+        }
+        with self._lock:
+            self.llm_calls.append(call)
+
+    def record_llm_retry(self):
+        with self._lock:
+            self.llm_retries += 1
+
+    def set_sources(self, report):
+        with self._lock:
+            self.sources = list(report)
+
+    def set_count(self, name, value):
+        with self._lock:
+            self.counts[name] = value
+
+    def _llm_summary(self):
+        summary = {}
+        for call in self.llm_calls:
+            entry = summary.setdefault(call["kind"], {
+                "calls": 0, "cached": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                "input_tokens": 0, "output_tokens": 0
+            })
+            if call["cached"]:
+                entry["cached"] += 1
+                continue
+            entry["calls"] += 1
+            entry["seconds"] = round(entry["seconds"] + call["seconds"], 3)
+            entry["max_seconds"] = max(entry["max_seconds"], call["seconds"])
+            entry["input_tokens"] += call["input_tokens"] or 0
+            entry["output_tokens"] += call["output_tokens"] or 0
+            if call["error"]:
+                entry["errors"] += 1
+        return summary
+
+    def to_dict(self):
+        """导出为可JSON序列化的运行记录。"""
+        with self._lock:
+            return {
+                "started_at": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                "duration_seconds": round(time.perf_counter() - self._started, 3),
+                "status": self.status,
+                "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+                "counts": dict(self.counts),
+                "sources": list(self.sources),
+                "requests": {name: _timing_summary(timing) for name, timing in self.requests.items()},
+                "timings": {name: _timing_summary(timing) for name, timing in self.timings.items()},
+                "llm": {
+                    "retries": self.llm_retries,
+                    "by_kind": self._llm_summary(),
+                    "calls": list(self.llm_calls),
+                },
+            }
+
+    def _histogram_lines(self, name, labels, timing):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, timing["buckets"]):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {timing["count"]}')
+        lines.append(f'{name}_sum{_labels(**labels)} {timing["seconds"]:.6f}')
+        lines.append(f'{name}_count{_labels(**labels)} {timing["count"]}')
+        return lines
+
+    def to_prometheus(self):
+        """导出为Prometheus文本格式（供node_exporter的textfile collector读取）。"""
+        record = self.to_dict()
+        lines = [
+            '# HELP job_agent_run_timestamp_seconds Unix time when the last run started.',
+            '# TYPE job_agent_run_timestamp_seconds gauge',
+            f'job_agent_run_timestamp_seconds {self.started_at:.0f}',
+            '# HELP job_agent_run_duration_seconds Wall time of the last run.',
+            '# TYPE job_agent_run_duration_seconds gauge',
+            f'job_agent_run_duration_seconds {record["duration_seconds"]}',
+            '# HELP job_agent_run_success Whether the last run finished without error.',
+            '# TYPE job_agent_run_success gauge',
+            f'job_agent_run_success {1 if record["status"] == "ok" else 0}',
+            '# HELP job_agent_stage_duration_seconds Wall time spent in each pipeline stage.',
+            '# TYPE job_agent_stage_duration_seconds gauge',
+        ]
+        lines += [f'job_agent_stage_duration_seconds{_labels(stage=name)} {seconds}'
+                  for name, seconds in record["stages"].items()]
+
+        lines += ['# HELP job_agent_jobs Number of jobs at each pipeline step.', '# TYPE job_agent_jobs gauge']
+        lines += [f'job_agent_jobs{_labels(step=name)} {value}' for name, value in record["counts"].items()]
+
+        lines += [
+            '# HELP job_agent_source_jobs Jobs delivered by each source.', '# TYPE job_agent_source_jobs gauge',
+        ]
+        lines += [f'job_agent_source_jobs{_labels(source=s["source"], status=s["status"])} {s["jobs"]}'
+                  for s in record["sources"]]
+        lines += [
+            '# HELP job_agent_source_duration_seconds Wall time of each source.',
+            '# TYPE job_agent_source_duration_seconds gauge',
+        ]
+        lines += [f'job_agent_source_duration_seconds{_labels(source=s["source"])} {s["seconds"]}'
+                  for s in record["sources"] if s["seconds"] is not None]
+
+        with self._lock:
+            requests = {name: dict(timing, buckets=list(timing["buckets"])) for name, timing in self.requests.items()}
+            timings = {name: dict(timing, buckets=list(timing["buckets"])) for name, timing in self.timings.items()}
+        lines += [
+            '# HELP job_agent_http_request_duration_seconds HTTP request latency by component.',
+            '# TYPE job_agent_http_request_duration_seconds histogram',
+        ]
+        for name, timing in requests.items():
+            lines += self._histogram_lines('job_agent_http_request_duration_seconds', {"component": name}, timing)
+        lines += [
+            '# HELP job_agent_http_request_errors_total Failed HTTP requests by component.',
+            '# TYPE job_agent_http_request_errors_total counter',
+        ]
+        lines += [f'job_agent_http_request_errors_total{_labels(component=name)} {timing["errors"]}'
+                  for name, timing in requests.items()]
+        lines += [
+            '# HELP job_agent_http_response_bytes_total Response body bytes by component.',
+            '# TYPE job_agent_http_response_bytes_total counter',
+        ]
+        lines += [f'job_agent_http_response_bytes_total{_labels(component=name)} {timing["bytes"]}'
+                  for name, timing in requests.items()]
+        lines += [
+            '# HELP job_agent_operation_duration_seconds Latency of other instrumented operations.',
+            '# TYPE job_agent_operation_duration_seconds histogram',
+        ]
+        for name, timing in timings.items():
+            lines += self._histogram_lines('job_agent_operation_duration_seconds', {"operation": name}, timing)
+
+        llm = record["llm"]
+        lines += [
+            '# HELP job_agent_llm_calls_total Model API calls by kind and outcome.',
+            '# TYPE job_agent_llm_calls_total counter',
+        ]
+        for kind, entry in llm["by_kind"].items():
+            lines.append(f'job_agent_llm_calls_total{_labels(kind=kind, outcome="ok")} {entry["calls"] - entry["errors"]}')
+            lines.append(f'job_agent_llm_calls_total{_labels(kind=kind, outcome="error")} {entry["errors"]}')
+            lines.append(f'job_agent_llm_calls_total{_labels(kind=kind, outcome="cached")} {entry["cached"]}')
+        lines += [
+            '# HELP job_agent_llm_call_seconds_total Total model API latency by kind.',
+            '# TYPE job_agent_llm_call_seconds_total counter',
+        ]
+        lines += [f'job_agent_llm_call_seconds_total{_labels(kind=kind)} {entry["seconds"]}'
+                  for kind, entry in llm["by_kind"].items()]
+        lines += ['# HELP job_agent_llm_tokens_total Model tokens by kind and direction.',
+                  '# TYPE job_agent_llm_tokens_total counter']
+        for kind, entry in llm["by_kind"].items():
+            lines.append(f'job_agent_llm_tokens_total{_labels(kind=kind, direction="input")} {entry["input_tokens"]}')
+            lines.append(f'job_agent_llm_tokens_total{_labels(kind=kind, direction="output")} {entry["output_tokens"]}')
+        lines += [
+            '# HELP job_agent_llm_retries_total Model API calls retried after throttling.',
+            '# TYPE job_agent_llm_retries_total counter',
+            f'job_agent_llm_retries_total {llm["retries"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def export(self, json_path=None, prometheus_path=None):
+        """
+        写出JSON运行记录和Prometheus textfile，任一路径为空时跳过该格式。
+        :return: 实际写出的文件路径列表
+        """
+        written = []
+        if json_path:
+            _write_atomic(json_path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+            written.append(json_path)
+        if prometheus_path:
+            _write_atomic(prometheus_path, self.to_prometheus())
+            written.append(prometheus_path)
+        return written
+
+
+class _NullMetrics:
+    """未启用指标采集时使用的空实现，各埋点处无需判断是否启用。"""
+    status = "running"
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def record_request(self, component, seconds, nbytes=0, ok=True):
+        pass
+
+    def record_timing(self, name, seconds):
+        pass
+
+    def record_llm_call(self, kind, seconds, input_tokens=None, output_tokens=None, cached=False, error=None):
+        pass
+
+    def record_llm_retry(self):
+        pass
+
+    def set_sources(self, report):
+        pass
+
+    def set_count(self, name, value):
+        pass
+
+    def export(self, json_path=None, prometheus_path=None):
+        return []
+
+
+_NULL_METRICS = _NullMetrics()
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def start_run():
+    """开始新一次运行的指标记录，返回记录器（未启用时为空实现）。"""
+    global _metrics
+    with _metrics_lock:
+        _metrics = RunMetrics() if METRICS_ENABLED else _NULL_METRICS
+        return _metrics
+
+
+def get_metrics():
+    """返回当前运行的指标记录器；尚未调用 start_run() 时（如单独使用爬虫）返回空实现。"""
+    with _metrics_lock:
+        return _metrics or _NULL_METRICS
+
+
+def export_run(metrics):
+    """按配置写出本次运行的指标，失败时只打印提示，不影响主流程。"""
+    try:
+        written = metrics.export(METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH)
+        if written:
+            print(f"运行指标已保存到: {', '.join(written)}")
+    except Exception as e:
+        print(f"保存运行指标失败: {e}")
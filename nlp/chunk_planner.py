@@ -0,0 +1,226 @@
+# nlp/chunk_planner.py
+import bisect
+import math
+import re
+
+from config import (
+    LLM_TOKENIZER, LLM_CONTEXT_WINDOW, LLM_OUTPUT_RESERVE_TOKENS, LLM_CHUNK_TOKEN_BUDGET,
+    LLM_MAX_JOB_TOKENS, LLM_MAX_JOBS_PER_CHUNK
+)
+from nlp import standardize
+from nlp.profiles import group_profiles
+
+# 中日韩文字及全角标点，多数分词器中约1个字符对应1个token
+_CJK_RE = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+# 超长时需要截断的Prompt字段，及其对应的DataFrame列
+TRUNCATABLE_FIELDS = {'desc': 'description', 'title': 'title', 'company': 'company', 'location': 'location'}
+# 依次尝试截断的字段组：先截断描述，仍超出上限时（标题、公司名等异常长）再截断其余文本字段
+TRUNCATION_TIERS = (('desc',), ('title', 'company', 'location'))
+TRUNCATION_MARK = '…'
+# 估算时使用的占位编号，按三位数编号计，保证不会低估
+PLACEHOLDER_JOB_ID = 'J999'
+
+
+class HeuristicTokenizer:
+    """
+    不依赖任何分词库的保守估算：中文等字符按1个token计，其余字符按每4个1个token计。
+    对中文而言通常会略微高估，保证按估算装箱时不会超出模型上下文。
+    """
+    name = 'heuristic'
+
+    def count(self, text):
+        if not text:
+            return 0
+        cjk_count = _CJK_RE.subn('', text)[1]
+        return cjk_count + math.ceil((len(text) - cjk_count) / 4)
+
+
+class TiktokenTokenizer:
+    """使用 tiktoken 精确计数（需要额外安装 tiktoken）。"""
+    name = 'tiktoken'
+
+    def __init__(self, encoding_name='cl100k_base'):
+        import tiktoken
+        self._encoding = tiktoken.get_encoding(encoding_name)
+
+    def count(self, text):
+        if not text:
+            return 0
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def get_tokenizer(name=None):
+    """
+    按名称创建token计数器：'heuristic'（默认）或 'tiktoken[:编码名]'。
+    指定的分词库不可用时回退到启发式估算。
+    """
+    name = (name or LLM_TOKENIZER or 'heuristic').strip()
+    if name.startswith('tiktoken'):
+        _, _, encoding_name = name.partition(':')
+        try:
+            return TiktokenTokenizer(encoding_name or 'cl100k_base')
+        except Exception as e:
+            print(f"加载 tiktoken 失败，改用启发式token估算: {e}")
+    elif name != 'heuristic':
+        print(f"未知的分词器 '{name}'，改用启发式token估算。")
+    return HeuristicTokenizer()
+
+
+def truncate_to_tokens(text, max_tokens, tokenizer):
+    """二分查找不超过 max_tokens 的最长前缀，截断处加省略号。"""
+    if tokenizer.count(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if tokenizer.count(text[:mid] + TRUNCATION_MARK) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + TRUNCATION_MARK
+
+
+class ChunkPlanner:
+    """
+    按token预算把职位装箱成请求块：先把超长描述截断到单个职位的上限，
+    再用最佳适配递减（Best-Fit Decreasing）装箱，使每次调用装入尽可能多的职位、总调用次数尽可能少，
+    且任何一块加上Prompt模板和输出预留都不会超过模型的上下文窗口。
+    """
+    def __init__(self, token_budget=None, max_job_tokens=None, max_jobs_per_chunk=None,
+                 context_window=None, output_reserve_tokens=None, tokenizer=None, profiles=None):
+        """
+        :param token_budget: 每块职位数据的输入token预算
+        :param max_job_tokens: 单个职位最多占用的token数，超出时截断描述
+        :param max_jobs_per_chunk: 每块最多的职位数（模型每块最多挑出5+5个，块太大会漏掉好职位）
+        :param context_window: 模型上下文窗口大小
+        :param output_reserve_tokens: 为模型输出预留的token数
+        :param tokenizer: 带 count(text) 方法的token计数器，默认按配置创建
+        :param profiles: 参与匹配的 UserProfile 列表；多于一个时按多画像Prompt估算，
+                         输出预留按每次请求的画像数放大
+        """
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.max_jobs_per_chunk = max(1, max_jobs_per_chunk or LLM_MAX_JOBS_PER_CHUNK)
+        context_window = context_window or LLM_CONTEXT_WINDOW
+        output_reserve_tokens = LLM_OUTPUT_RESERVE_TOKENS if output_reserve_tokens is None else output_reserve_tokens
+
+        # 多画像时按最大的一组估算：职位记录中的 for 字段、Prompt中的用户背景和输出都随组内画像数增加
+        self.profile_ids = None
+        if profiles and len(profiles) > 1:
+            group = group_profiles(list(profiles))[0]
+            self.profile_ids = standardize.profile_ids(group)
+            template = standardize.build_profiles_match_prompt(None, group)
+            output_reserve_tokens *= len(group)
+        else:
+            template = standardize.build_match_prompt(None, profiles[0] if profiles else None)
+        # Prompt模板本身（不含职位）占用的token
+        self.overhead_tokens = self.tokenizer.count(template) + self.tokenizer.count(standardize.MATCH_SYSTEM_PROMPT)
+        window_budget = context_window - output_reserve_tokens - self.overhead_tokens
+        self.token_budget = min(token_budget or LLM_CHUNK_TOKEN_BUDGET, window_budget)
+        if self.token_budget <= 0:
+            raise ValueError(f"上下文窗口 {context_window} 不足以容纳Prompt模板和输出预留，请检查配置。")
+        self.max_job_tokens = min(max_job_tokens or LLM_MAX_JOB_TOKENS, self.token_budget)
+        # 所有文本字段都截断为空后剩下的记录骨架（编号、字段名，以及多画像时最长的 for 字段）必须放得下
+        skeleton = standardize.prompt_record(PLACEHOLDER_JOB_ID, {})
+        if self.profile_ids and len(self.profile_ids) > 1:
+            skeleton["for"] = list(self.profile_ids.values())[:-1]
+        if self.job_tokens(skeleton) > self.max_job_tokens:
+            raise ValueError(f"单个职位的token上限 {self.max_job_tokens} 过小，放不下职位记录本身，请检查配置。")
+
+    def job_tokens(self, record):
+        # 加1计入记录之间的换行
+        return self.tokenizer.count(standardize.render_prompt_record(record)) + 1
+
+    def _truncate_fields(self, record, fields, tokens):
+        """按各字段的token数比例截断 fields 中的文本，使记录不超过单个职位的上限，返回截断后的token数。"""
+        field_tokens = {
+            field: self.tokenizer.count(record[field])
+            for field in fields if isinstance(record.get(field), str) and record[field]
+        }
+        if not field_tokens:
+            return tokens
+        long_total = sum(field_tokens.values())
+        available = max(0, self.max_job_tokens - (tokens - long_total))
+        for field, count in field_tokens.items():
+            record[field] = truncate_to_tokens(record[field], available * count // long_total, self.tokenizer)
+        tokens = self.job_tokens(record)
+        # JSON转义等因素导致仍略超时，逐步收紧，最后清空这些字段
+        while tokens > self.max_job_tokens and any(record[field] for field in field_tokens):
+            for field in field_tokens:
+                text = record[field]
+                keep = int(len(text) * 0.8) - 1
+                record[field] = text[:keep] + TRUNCATION_MARK if keep > 0 else ''
+            tokens = self.job_tokens(record)
+        return tokens
+
+    def _fit_record(self, record):
+        """若单个职位超过上限，依次按 TRUNCATION_TIERS 截断其中的文本字段，返回 (记录, token数, 是否截断)。"""
+        tokens = self.job_tokens(record)
+        if tokens <= self.max_job_tokens:
+            return record, tokens, False
+
+        record = dict(record)
+        for fields in TRUNCATION_TIERS:
+            tokens = self._truncate_fields(record, fields, tokens)
+            if tokens <= self.max_job_tokens:
+                break
+        return record, tokens, True
+
+    def fit_job(self, job):
+        """
+        估算单个职位在Prompt中占用的token，超过上限时截断描述（仍超出时再截断标题、公司名和地点）。
+        :param job: 职位字典（DataFrame的一行）
+        :return: (可能被截断的职位字典, token数, 是否截断)
+        """
+        record = standardize.prompt_record(PLACEHOLDER_JOB_ID, job, self.profile_ids)
+        fitted, tokens, truncated = self._fit_record(record)
+        if truncated:
+            job = dict(job)
+            for field, column in TRUNCATABLE_FIELDS.items():
+                if fitted.get(field) != record.get(field):
+                    job[column] = fitted[field]
+        return job, tokens, truncated
+
+    def plan(self, df_jobs):
+        """
+        规划请求块。
+        :param df_jobs: 待匹配职位的DataFrame
+        :return: (DataFrame块列表, 统计信息字典)。块按其中最早职位的原始顺序排列，
+                 块内职位保持原始顺序，相同输入得到相同的分块，便于命中响应缓存。
+        """
+        stats = {"jobs": len(df_jobs), "chunks": 0, "truncated": 0, "tokens": 0,
+                 "token_budget": self.token_budget, "overhead_tokens": self.overhead_tokens}
+        if df_jobs.empty:
+            return [], stats
+
+        df_fitted = df_jobs.copy()
+        costs = []
+        for position, job in enumerate(df_jobs.to_dict(orient='records')):
+            fitted_job, tokens, truncated = self.fit_job(job)
+            if truncated:
+                stats["truncated"] += 1
+                for column in TRUNCATABLE_FIELDS.values():
+                    if column in df_fitted.columns and fitted_job.get(column) is not job.get(column):
+                        df_fitted.iat[position, df_fitted.columns.get_loc(column)] = fitted_job[column]
+            costs.append(tokens)
+        stats["tokens"] = sum(costs)
+
+        # 最佳适配递减：按token数从大到小放入剩余容量最小且放得下的块
+        bins = []  # 每块的职位位置列表
+        open_bins = []  # 按剩余容量排序的 (剩余容量, 块编号)
+        for position in sorted(range(len(costs)), key=lambda i: (-costs[i], i)):
+            cost = costs[position]
+            slot = bisect.bisect_left(open_bins, (cost, -1))
+            if slot < len(open_bins):
+                remaining, bin_id = open_bins.pop(slot)
+            else:
+                remaining, bin_id = self.token_budget, len(bins)
+                bins.append([])
+            bins[bin_id].append(position)
+            remaining -= cost
+            if len(bins[bin_id]) < self.max_jobs_per_chunk and remaining > 0:
+                bisect.insort(open_bins, (remaining, bin_id))
+
+        ordered_bins = sorted((sorted(members) for members in bins), key=lambda members: members[0])
+        chunks = [df_fitted.iloc[members] for members in ordered_bins]
+        stats["chunks"] = len(chunks)
+        return chunks, stats
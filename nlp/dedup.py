@@ -0,0 +1,242 @@
+# nlp/dedup.py
+import re
+
+import numpy as np
+
+# 参与指纹计算的描述最大长度，公众号文章正文可能很长，截断后足以区分不同职位
+MAX_DESCRIPTION_CHARS = 2000
+# 各字段shingle的权重：标题最能区分职位，其次是公司，描述中模板化内容较多
+TITLE_WEIGHT = 3
+COMPANY_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+_NON_WORD_RE = re.compile(r'[\W_]+', re.UNICODE)
+_BRACKET_RE = re.compile(r'[\(（\[【][^\)）\]】]*[\)）\]】]')
+_COMPANY_SUFFIXES = ('股份有限公司', '有限责任公司', '有限公司', '集团', '公司')
+
+
+def normalize_text(text):
+    """转小写并去掉空白和标点，只保留文字和数字。"""
+    if not isinstance(text, str):
+        return ''
+    return _NON_WORD_RE.sub('', text.lower())
+
+
+def normalize_company(company):
+    """规范化公司名：去掉括号内的地区等信息和常见的公司后缀。"""
+    name = _BRACKET_RE.sub('', company if isinstance(company, str) else '')
+    name = normalize_text(name)
+    if name in ('', 'na'):
+        return ''
+    for suffix in _COMPANY_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name
+
+
+def companies_compatible(company_a, company_b):
+    """两个规范化后的公司名是否可能指同一家公司（任一为空，或一个包含另一个）。"""
+    if not company_a or not company_b:
+        return True
+    return company_a in company_b or company_b in company_a
+
+
+SHINGLE_SIZE = 3
+_FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+_FNV_PRIME = np.uint64(0x100000001b3)
+
+
+def _mix64(values):
+    """splitmix64 的末端混合函数，使哈希的每一位都足够均匀（numpy的uint64乘法按2^64自动回绕）。"""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return values ^ (values >> np.uint64(31))
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    """
+    计算文本所有字符k-gram的64位哈希（向量化，不逐个构造子串）。
+    按字符切分对中文同样有效，不依赖分词；文本短于k时整个文本作为一个特征。
+    """
+    if not text:
+        return np.empty(0, dtype=np.uint64)
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    width = min(k, len(codes))
+    count = len(codes) - width + 1
+    hashes = np.full(count, _FNV_OFFSET, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for offset in range(width):
+            hashes = (hashes ^ codes[offset:offset + count]) * _FNV_PRIME
+        return _mix64(hashes)
+
+
+def simhash(hashes, weights):
+    """
+    计算64位SimHash。
+    :param hashes: 各特征的64位哈希（numpy uint64数组）
+    :param weights: 各特征的权重
+    :return: 64位整数指纹，相似的特征集合得到汉明距离很小的指纹
+    """
+    if len(hashes) == 0:
+        return 0
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    totals = weights @ (bits.astype(np.float64) * 2 - 1)
+    return int(np.packbits(totals > 0, bitorder='little').view('<u8')[0])
+
+
+def job_simhash(title, company, description):
+    """对标题、公司和描述的shingle加权计算职位的SimHash。"""
+    field_hashes = []
+    field_weights = []
+    for text, weight in (
+        (normalize_text(title), TITLE_WEIGHT),
+        (normalize_company(company), COMPANY_WEIGHT),
+        (normalize_text(description)[:MAX_DESCRIPTION_CHARS], DESCRIPTION_WEIGHT),
+    ):
+        hashes = shingle_hashes(text)
+        field_hashes.append(hashes)
+        field_weights.append(np.full(len(hashes), weight, dtype=np.float64))
+    return simhash(np.concatenate(field_hashes), np.concatenate(field_weights))
+
+
+class NearDuplicateIndex:
+    """
+    基于SimHash + LSH分段的近似重复职位索引，支持逐条增量加入。
+    64位指纹被切成 max_distance+1 段，由抽屉原理，汉明距离不超过 max_distance 的两个指纹
+    至少有一段完全相同，因此只需比较同段桶内的候选，整体接近线性复杂度。
+    指纹完全相同的记录直接归并，不进入分段桶，避免大量相同记录使某个桶退化为平方复杂度。
+    """
+    def __init__(self, max_distance=6, strict_distance=2):
+        """
+        :param max_distance: 判定为重复的最大汉明距离
+        :param strict_distance: 公司名对不上时（如公众号以账号名作为公司）仍判定为重复的最大汉明距离
+        """
+        self.max_distance = max_distance
+        self.strict_distance = min(strict_distance, max_distance)
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self._band_mask = (1 << self.band_bits) - 1
+        self._buckets = [{} for _ in range(self.bands)]
+        self._exact = {}
+        self._signatures = []
+        self._companies = []
+        self._parent = []
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _find(self, i):
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _union(self, a, b):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            # 以先加入的记录为根，保证簇的代表稳定
+            if root_b < root_a:
+                root_a, root_b = root_b, root_a
+            self._parent[root_b] = root_a
+
+    def _band_keys(self, signature):
+        return [(signature >> (band * self.band_bits)) & self._band_mask for band in range(self.bands)]
+
+    def add(self, title, company, description):
+        """
+        加入一条记录。
+        :return: (记录编号, 与之重复的最早一条已有记录的编号；没有重复时为None)
+        """
+        signature = job_simhash(title, company, description)
+        company_key = normalize_company(company)
+        record_id = len(self._signatures)
+        self._signatures.append(signature)
+        self._companies.append(company_key)
+        self._parent.append(record_id)
+
+        exact_id = self._exact.get(signature)
+        if exact_id is not None:
+            self._union(record_id, exact_id)
+            return record_id, self._find(exact_id)
+        self._exact[signature] = record_id
+
+        duplicate_of = None
+        candidates = set()
+        band_keys = self._band_keys(signature)
+        for bucket, key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(key, ()))
+        for candidate in sorted(candidates):
+            distance = bin(signature ^ self._signatures[candidate]).count('1')
+            if distance > self.max_distance:
+                continue
+            if distance > self.strict_distance and not companies_compatible(company_key, self._companies[candidate]):
+                continue
+            self._union(record_id, candidate)
+            if duplicate_of is None:
+                duplicate_of = self._find(candidate)
+
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, []).append(record_id)
+        return record_id, duplicate_of
+
+    def clusters(self):
+        """返回所有簇（记录编号列表），按簇中最早记录的编号排序。"""
+        groups = {}
+        for record_id in range(len(self._signatures)):
+            groups.setdefault(self._find(record_id), []).append(record_id)
+        return [groups[root] for root in sorted(groups)]
+
+
+def merge_sources(sources):
+    """按出现顺序去重合并来源名称。"""
+    merged = []
+    for source in sources:
+        if source and source not in merged:
+            merged.append(source)
+    return merged
+
+
+def deduplicate_jobs(df_jobs, max_distance=6):
+    """
+    跨来源近似去重：同一职位在智联、GiveMeOC和多个公众号中往往以略有不同的标题和模板文字重复出现。
+    每个重复簇只保留描述最完整的一条作为代表，并把簇内所有来源合并到 source 列（完整列表保存在 sources 列）。
+    :param df_jobs: 经过 process_jobs_dataframe 清洗的DataFrame
+    :param max_distance: 判定为重复的最大SimHash汉明距离
+    :return: (去重后的DataFrame, 统计信息字典)
+    """
+    total = len(df_jobs)
+    if total == 0:
+        return df_jobs, {"total": 0, "unique": 0, "removed": 0, "ratio": 0.0}
+
+    titles = df_jobs['title'].tolist()
+    companies = df_jobs['company'].tolist()
+    descriptions = df_jobs['clean_description'].tolist()
+    sources = df_jobs['source'].tolist()
+
+    index = NearDuplicateIndex(max_distance=max_distance)
+    for title, company, description in zip(titles, companies, descriptions):
+        index.add(title, company, description)
+
+    keep_positions = []
+    merged_sources = []
+    for members in index.clusters():
+        canonical = max(members, key=lambda i: (len(descriptions[i]), -i))
+        keep_positions.append(canonical)
+        merged_sources.append(merge_sources(sources[i] for i in members))
+
+    order = sorted(range(len(keep_positions)), key=lambda k: keep_positions[k])
+    df_unique = df_jobs.iloc[[keep_positions[k] for k in order]].copy()
+    df_unique['sources'] = [merged_sources[k] for k in order]
+    df_unique['source'] = [' / '.join(s) if s else '未知来源' for s in df_unique['sources']]
+    df_unique = df_unique.reset_index(drop=True)
+
+    unique = len(df_unique)
+    stats = {
+        "total": total,
+        "unique": unique,
+        "removed": total - unique,
+        "ratio": (total - unique) / total,
+    }
+    return df_unique, stats
@@ -0,0 +1,250 @@
+# nlp/embeddings.py
+import re
+import time
+import zlib
+
+import numpy as np
+
+from config import (
+    EMBEDDING_PROVIDER, EMBEDDING_STORE_DIR, EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_CHARS,
+    EMBEDDING_API_KEY, EMBEDDING_BASE_URL
+)
+from storage.embedding_store import EmbeddingStore
+from storage.seen_jobs import job_fingerprint
+from metrics import get_metrics
+
+# 参与向量化的职位文本的拼接方式版本号，修改 job_text 后需要递增，使旧的向量失效
+EMBEDDING_TEXT_VERSION = "t1"
+# 中日韩文字按相邻两字切分，其余按单词切分
+_CJK_RUN_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_WORD_RE = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _normalize_rows(vectors):
+    """按行做L2归一化（全零行保持为0），使内积即为余弦相似度。"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class HashingEmbeddingProvider:
+    """
+    不依赖任何模型服务的本地向量化：中文按相邻两字、英文按单词提取特征，
+    用带符号的特征哈希映射到固定维度（词频取 log(1+tf)），结果与运行环境无关，可以长期缓存。
+    """
+    name = 'hashing'
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.signature = f"hashing-{dim}"
+
+    @staticmethod
+    def features(text):
+        text = (text or '').lower()
+        features = _WORD_RE.findall(text)
+        for run in _CJK_RUN_RE.findall(text):
+            if len(run) == 1:
+                features.append(run)
+            else:
+                features.extend(run[i:i + 2] for i in range(len(run) - 1))
+        return features
+
+    def _vector(self, text):
+        counts = {}
+        for feature in self.features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not counts:
+            return vector
+        hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in counts), dtype=np.int64, count=len(counts))
+        weights = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        signs = np.where((hashes // self.dim) & 1, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, hashes % self.dim, signs * weights)
+        return vector
+
+    def embed(self, texts):
+        """返回形状为 (len(texts), dim) 的已归一化向量。"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _normalize_rows(np.stack([self._vector(text) for text in texts]))
+
+
+class OpenAIEmbeddingProvider:
+    """
+    调用OpenAI兼容的 /embeddings 接口（也可以把 EMBEDDING_BASE_URL 指向本地部署的兼容服务）。
+    每次调用的延迟和token用量按 "embedding" 类型记入运行指标。
+    """
+    name = 'openai'
+
+    def __init__(self, model='text-embedding-3-small', client=None):
+        if client is None:
+            import openai
+            client = openai.OpenAI(api_key=EMBEDDING_API_KEY, base_url=EMBEDDING_BASE_URL)
+        self.client = client
+        self.model = model
+        self.signature = f"openai-{model}"
+
+    def embed(self, texts):
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        started = time.perf_counter()
+        try:
+            response = self.client.embeddings.create(model=self.model, input=list(texts))
+        except Exception as e:
+            get_metrics().record_llm_call('embedding', time.perf_counter() - started, error=type(e).__name__)
+            raise
+        usage = getattr(response, 'usage', None)
+        get_metrics().record_llm_call(
+            'embedding', time.perf_counter() - started, input_tokens=getattr(usage, 'prompt_tokens', None)
+        )
+        data = sorted(response.data, key=lambda item: item.index)
+        if len(data) != len(texts):
+            raise ValueError(f"向量接口返回了 {len(data)} 个向量，请求的是 {len(texts)} 个")
+        return _normalize_rows([item.embedding for item in data])
+
+
+def get_embedding_provider(name=None):
+    """
+    按名称创建向量化提供方：'hashing[:维度]'（默认，本地特征哈希）或 'openai[:模型名]'。
+    指定的提供方不可用时回退到本地特征哈希。
+    """
+    name = (name or EMBEDDING_PROVIDER or 'hashing').strip()
+    kind, _, option = name.partition(':')
+    if kind == 'openai':
+        try:
+            return OpenAIEmbeddingProvider(option or 'text-embedding-3-small')
+        except Exception as e:
+            print(f"初始化向量接口失败，改用本地特征哈希: {e}")
+    elif kind == 'hashing':
+        try:
+            return HashingEmbeddingProvider(int(option) if option else 512)
+        except ValueError:
+            print(f"无效的特征哈希维度 '{option}'，改用默认的512维。")
+    else:
+        print(f"未知的向量化方式 '{name}'，改用本地特征哈希。")
+    return HashingEmbeddingProvider()
+
+
+def job_text(title, company, description, max_chars):
+    """参与向量化的职位文本：标题、公司和描述折叠空白后拼接，截断到 max_chars 个字符。"""
+    parts = (_WHITESPACE_RE.sub(' ', str(value or '')).strip() for value in (title, company, description))
+    return ' | '.join(part for part in parts if part)[:max_chars]
+
+
+def profile_text(profile):
+    """画像的查询文本：专业和扩展关键词。"""
+    return ' '.join(profile.phrases)
+
+
+def cosine_top_k(queries, matrix, k, block_size=65536):
+    """
+    在（可能是内存映射的）已归一化矩阵中为每个查询向量找出余弦相似度最高的 k 行。
+    按块计算内积并只保留每块的前 k 名，内存占用与矩阵行数无关。
+    :param queries: 形状为 (查询数, dim) 的已归一化向量
+    :param matrix: 形状为 (行数, dim) 的已归一化向量
+    :return: (行号, 相似度)，形状均为 (查询数, min(k, 行数))，按相似度从高到低排列
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    k = min(k, len(matrix))
+    if k <= 0:
+        empty = np.zeros((len(queries), 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+    best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(matrix), block_size):
+        scores = queries @ np.asarray(matrix[start:start + block_size]).T
+        rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        scores = np.concatenate([best_scores, scores], axis=1)
+        rows = np.concatenate([best_rows, rows], axis=1)
+        if scores.shape[1] > k:
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, keep, axis=1)
+            rows = np.take_along_axis(rows, keep, axis=1)
+        best_scores, best_rows = scores, rows
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+class JobEmbedder:
+    """
+    职位向量化阶段：以内容指纹为键查向量库，只把库中没有的职位按批送去向量化，
+    再用向量与画像向量的余弦相似度作为预筛选的相关度分数。
+    """
+    def __init__(self, provider, store, batch_size=None, max_chars=None):
+        """
+        :param provider: 向量化提供方（HashingEmbeddingProvider / OpenAIEmbeddingProvider 或同样提供 embed(texts) 的对象）
+        :param store: EmbeddingStore
+        :param batch_size: 每次向量化的文本数，默认 EMBEDDING_BATCH_SIZE
+        :param max_chars: 参与向量化的职位文本长度上限，默认 EMBEDDING_MAX_CHARS
+        """
+        self.provider = provider
+        self.store = store
+        self.batch_size = max(1, batch_size or EMBEDDING_BATCH_SIZE)
+        self.max_chars = max_chars or EMBEDDING_MAX_CHARS
+        self._profile_vectors = {}
+        self.stats = {"hits": 0, "computed": 0, "batches": 0}
+
+    def _embed(self, keys, texts):
+        """返回与 keys 对齐的向量；库中已有的直接读取，其余去重后按批计算并写入向量库。"""
+        rows = self.store.lookup(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in rows and key not in missing:
+                missing[key] = text
+        self.stats["hits"] += len(keys) - sum(1 for key in keys if key in missing)
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            vectors = self.provider.embed([text for _, text in batch])
+            rows.update(self.store.add([key for key, _ in batch], vectors))
+            self.stats["computed"] += len(batch)
+            self.stats["batches"] += 1
+        return self.store.get([rows[key] for key in keys])
+
+    def embed_jobs(self, df_jobs):
+        """为职位DataFrame的每一行返回向量（形状为 (行数, dim)）。"""
+        if df_jobs.empty:
+            return np.zeros((0, self.store.dim or 0), dtype=np.float32)
+        descriptions = df_jobs['clean_description'] if 'clean_description' in df_jobs.columns else df_jobs['description']
+        keys, texts = [], []
+        for title, company, description in zip(df_jobs['title'], df_jobs['company'], descriptions):
+            keys.append(job_fingerprint(title, company, description))
+            texts.append(job_text(title, company, description, self.max_chars))
+        return self._embed(keys, texts)
+
+    def embed_profiles(self, profiles):
+        """
+        返回画像向量（形状为 (画像数, dim)）。画像向量不写入向量库（库中只有职位），
+        同一画像在一次运行中只计算一次。
+        """
+        texts = list(dict.fromkeys(profile_text(p) for p in profiles if profile_text(p) not in self._profile_vectors))
+        if texts:
+            self._profile_vectors.update(zip(texts, self.provider.embed(texts)))
+        return np.stack([self._profile_vectors[profile_text(p)] for p in profiles])
+
+    def score(self, df_jobs, profiles):
+        """
+        职位与各画像的余弦相似度（负值按0计，与BM25分数一样以0表示不相关），保留4位小数。
+        :return: 形状为 (职位数, 画像数) 的数组
+        """
+        if df_jobs.empty:
+            return np.zeros((0, len(profiles)))
+        scores = self.embed_jobs(df_jobs) @ self.embed_profiles(profiles).T
+        return np.round(np.clip(scores, 0.0, None), 4).astype(np.float64)
+
+    def stats_line(self):
+        return (f"职位向量({self.provider.signature}): 向量库命中 {self.stats['hits']} 个，"
+                f"新计算 {self.stats['computed']} 个（{self.stats['batches']} 批），库中共 {self.store.count} 个")
+
+    def close(self):
+        self.store.close()
+
+
+def open_embedder(provider_name=None, store_dir=None):
+    """按配置创建向量化提供方并打开对应的向量库（库按提供方和文本截断长度区分）。"""
+    provider = get_embedding_provider(provider_name)
+    signature = f"{provider.signature}-c{EMBEDDING_MAX_CHARS}-{EMBEDDING_TEXT_VERSION}"
+    store = EmbeddingStore(store_dir or EMBEDDING_STORE_DIR, signature, getattr(provider, 'dim', None))
+    return JobEmbedder(provider, store)
@@ -0,0 +1,150 @@
+# nlp/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import LLM_CACHE_PATH, LLM_CACHE_TTL_HOURS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_BYPASS
+
+
+def make_cache_key(kind, model, prompt_version, profile, payload):
+    """
+    生成缓存键：对模型名、Prompt模板版本、用户画像和规范化后的职位数据取SHA-256。
+    payload 会以排序后的键序列化，字段顺序不同的等价数据得到相同的键。
+    """
+    canonical = json.dumps(
+        {
+            'kind': kind,
+            'model': model,
+            'prompt_version': prompt_version,
+            'profile': profile,
+            'payload': payload,
+        },
+        ensure_ascii=False, sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    模型响应的本地持久化缓存（SQLite）。
+    相同的模型、Prompt版本、用户画像和职位数据直接返回上次的结果，不再重复付费调用。
+    支持按存活时间(TTL)过期和按条目数上限淘汰最久未访问的条目。
+    """
+    def __init__(self, path, ttl_seconds=72 * 3600, max_entries=5000, bypass=False):
+        """
+        :param path: SQLite数据库文件路径
+        :param ttl_seconds: 条目的最长存活时间（秒），<=0 表示不过期
+        :param max_entries: 最多保留的条目数，<=0 表示不限制
+        :param bypass: 为True时不读取缓存（仍会写入新结果），用于强制刷新
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access ON llm_responses(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_created_at ON llm_responses(created_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        读取缓存的响应。
+        :return: 反序列化后的响应；未命中、已过期或处于bypass模式时返回None
+        """
+        now = time.time()
+        with self._lock:
+            if self.bypass:
+                self.misses += 1
+                return None
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, kind, value):
+        """写入（或覆盖）一条响应，value 必须可被JSON序列化。"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, kind, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._conn.commit()
+
+    def prune(self):
+        """
+        删除过期条目，并在条目数超过上限时淘汰最久未访问的条目。
+        :return: 被删除的条目数
+        """
+        removed = 0
+        with self._lock:
+            if self.ttl_seconds > 0:
+                cursor = self._conn.execute(
+                    "DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                )
+                removed += cursor.rowcount
+            if self.max_entries > 0:
+                cursor = self._conn.execute("""
+                    DELETE FROM llm_responses WHERE key IN (
+                        SELECT key FROM llm_responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,))
+                removed += cursor.rowcount
+            self._conn.commit()
+        return removed
+
+    def stats_line(self):
+        """返回用于日志输出的命中统计。"""
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        mode = "（bypass模式，仅写入）" if self.bypass else ""
+        return f"模型响应缓存命中 {self.hits} 次，未命中 {self.misses} 次，命中率 {hit_rate:.1f}%{mode}"
+
+
+_cache = None
+_cache_open_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """返回进程内共享的模型响应缓存；未配置路径或打开失败时返回None。"""
+    global _cache, _cache_open_failed
+    with _cache_lock:
+        if _cache is None and LLM_CACHE_PATH and not _cache_open_failed:
+            try:
+                _cache = LLMResponseCache(
+                    LLM_CACHE_PATH,
+                    ttl_seconds=int(LLM_CACHE_TTL_HOURS * 3600),
+                    max_entries=LLM_CACHE_MAX_ENTRIES,
+                    bypass=LLM_CACHE_BYPASS
+                )
+            except Exception as e:
+                print(f"打开模型响应缓存失败，将不使用缓存: {e}")
+                _cache_open_failed = True
+        return _cache
@@ -0,0 +1,220 @@
+# nlp/matching_engine.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+
+import openai
+
+from config import (
+    LLM_MAX_CONCURRENCY, LLM_INITIAL_CONCURRENCY, LLM_MAX_RETRIES, LLM_BACKOFF_SECONDS
+)
+from nlp import standardize
+from nlp.profiles import group_profiles, targets_of
+from metrics import get_metrics
+
+
+def _retry_after_seconds(error):
+    """从429/503等响应的 Retry-After(-Ms) 头中解析需要等待的秒数，没有则返回None。"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def is_throttling_error(error):
+    """判断是否为应当降低并发并重试的错误：429、5xx、超时和连接错误。"""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD（加性增、乘性减）自适应并发限制器。
+    每次请求成功，并发上限缓慢增加（约每轮增加1）；遇到429/5xx时上限减半，
+    并根据 Retry-After 设置冷却期，冷却期内不再发出新请求。
+    """
+    def __init__(self, initial_limit=2, min_limit=1, max_limit=8, decrease_factor=0.5):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.throttle_count = 0
+        self._cooldown_until = 0.0
+        self._condition = threading.Condition()
+
+    def wait_for_cooldown(self):
+        """阻塞直到限流冷却期结束。"""
+        while True:
+            with self._condition:
+                delay = self._cooldown_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def acquire(self):
+        """等待冷却期结束并占用一个并发名额。"""
+        while True:
+            self.wait_for_cooldown()
+            with self._condition:
+                if self._cooldown_until > time.monotonic():
+                    continue
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._condition.wait(timeout=0.5)
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self, retry_after=None, fallback_delay=2.0):
+        with self._condition:
+            self.throttle_count += 1
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            delay = retry_after if retry_after is not None else fallback_delay
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+
+
+class ConcurrentMatcher:
+    """
+    并发的职位块匹配引擎：多个块同时请求模型，并发数按限流反馈自适应调整，
+    最终结果按块的原始顺序合并，保证报告内容稳定。
+    有多个用户画像时，每块职位按画像分组（每组不超过 MATCH_PROFILES_PER_REQUEST 个）请求，
+    同一组的画像共用一次调用。
+    """
+    def __init__(self, llm_client=None, max_concurrency=None, initial_concurrency=None,
+                 max_retries=None, backoff_seconds=None, profiles=None):
+        base_client = llm_client or standardize.client
+        # 关闭SDK内部的自动重试，由本引擎根据429/5xx自行退避，才能感知到限流信号
+        self.client = base_client.with_options(max_retries=0) if base_client else None
+        self.max_concurrency = max(1, max_concurrency or LLM_MAX_CONCURRENCY)
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = LLM_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=initial_concurrency or LLM_INITIAL_CONCURRENCY,
+            max_limit=self.max_concurrency
+        )
+        self.profiles = list(profiles or [])
+
+    def call(self, func, *args, **kwargs):
+        """
+        在自适应限流下调用 func(*args, llm_client=..., **kwargs)，遇到限流类错误时退避重试。
+        其他错误或重试耗尽时抛出最后一次的异常。
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                result = func(*args, llm_client=self.client, **kwargs)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt >= self.max_retries:
+                    raise
+                retry_after = _retry_after_seconds(e)
+                fallback_delay = self.backoff_seconds * (2 ** attempt)
+                self.limiter.on_throttle(retry_after, fallback_delay)
+                get_metrics().record_llm_retry()
+                attempt += 1
+                wait = retry_after if retry_after is not None else fallback_delay
+                print(f"  模型接口限流或暂时不可用 ({type(e).__name__})，{wait:.1f}秒后进行第 {attempt} 次重试，"
+                      f"并发上限降为 {int(self.limiter.limit)}。")
+                continue
+            finally:
+                self.limiter.release()
+            self.limiter.on_success()
+            return result
+
+    def match_one(self, df_chunk):
+        """
+        匹配单个职位块，出错时返回带 error 字段的空结果而不抛出。
+        多画像时返回 {"profiles": {画像名称: 结果}}，各画像结果中的 selected 为整块内的位置；
+        某一组画像的请求失败时，只有这组画像的结果带 error 字段。
+        """
+        if len(self.profiles) > 1:
+            return self._match_profiles(df_chunk)
+        try:
+            return self.call(standardize.request_chunk_match, df_chunk,
+                             profile=self.profiles[0] if self.profiles else None)
+        except Exception as e:
+            print(f"调用AI进行职位匹配时出错: {e}")
+            # 标记失败，调用方据此避免把这一块职位当作“已处理”
+            return {"matched_jobs": [], "other_jobs": [], "error": str(e)}
+
+    def _match_profiles(self, df_chunk):
+        targets = targets_of(df_chunk, self.profiles)
+        results = {}
+        for group in group_profiles(self.profiles):
+            names = {profile.name for profile in group}
+            # 只发送面向本组画像的职位
+            positions = [i for i, job_targets in enumerate(targets) if job_targets & names]
+            if not positions:
+                results.update({profile.name: {"matched_jobs": [], "other_jobs": []} for profile in group})
+                continue
+            try:
+                group_results = self.call(standardize.request_profiles_match, df_chunk.iloc[positions], profiles=group)
+            except Exception as e:
+                print(f"调用AI进行职位匹配时出错: {e}")
+                results.update({profile.name: {"matched_jobs": [], "other_jobs": [], "error": str(e)} for profile in group})
+                continue
+            for name, result in group_results.items():
+                # 子块内的位置换算回整块内的位置
+                result["selected"] = {
+                    category: [positions[i] for i in picks]
+                    for category, picks in (result.get("selected") or {}).items()
+                }
+                results[name] = result
+        return {"profiles": results}
+
+    def match_chunks(self, chunks):
+        """
+        并发匹配所有职位块。
+        :param chunks: DataFrame 列表
+        :return: 与 chunks 顺序一一对应的匹配结果列表
+        """
+        if not self.client:
+            print("OpenAI客户端未初始化，无法进行AI匹配。")
+            return [{"matched_jobs": [], "other_jobs": [], "error": "OpenAI客户端未初始化"} for _ in chunks]
+
+        results = [None] * len(chunks)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            future_to_index = {executor.submit(self.match_one, chunk): i for i, chunk in enumerate(chunks)}
+            done_count = 0
+            for future in as_completed(future_to_index):
+                i = future_to_index[future]
+                results[i] = future.result()
+                done_count += 1
+                print(f"第 {i+1} 块处理完成 ({done_count}/{len(chunks)})，当前并发上限: {int(self.limiter.limit)}")
+        return results
+
+    def summarize(self, df_jobs):
+        """在限流冷却结束后生成市场总结，取代原先固定的15秒冷却。"""
+        if not self.client or df_jobs.empty:
+            return "因数据不足或AI服务未配置，无法生成市场总结。"
+        self.limiter.wait_for_cooldown()
+        try:
+            return self.call(standardize.request_market_summary, df_jobs)
+        except Exception as e:
+            print(f"调用AI进行市场总结时出错: {e}")
+            return f"AI市场总结生成失败: {e}"
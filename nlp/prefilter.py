@@ -0,0 +1,249 @@
+# nlp/prefilter.py
+import re
+
+import numpy as np
+
+# 中文短语按字二元组(bigram)展开，使“计算机科学与技术”也能命中只写了“计算机”“软件”的职位
+_CJK_RUN_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_LATIN_WORD_RE = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+# 连词等在专业名称里常见、但没有区分度的二元组
+_STOP_BIGRAMS = {'与技', '和技', '及其', '与工', '与管', '学与'}
+# 用于拼接文档的分隔符，查询词中不会出现
+_DOC_SEPARATOR = '\n'
+# 每个文档参与打分的最大字符数，公众号长文只看开头部分即可判断相关性
+MAX_DOC_CHARS = 3000
+
+
+def expand_query(phrases, bigram_weight=0.5):
+    """
+    把用户专业和扩展关键词展开成带权重的查询词。
+    每个短语本身权重为1；其中的中文片段再拆成二元组（权重 bigram_weight），英文按单词切分。
+    :param phrases: 短语列表，如 ["计算机科学与技术", "软件开发", "Python"]
+    :return: {查询词: 权重}
+    """
+    terms = {}
+    for phrase in phrases:
+        phrase = (phrase or '').strip().lower()
+        if not phrase:
+            continue
+        terms[phrase] = max(terms.get(phrase, 0), 1.0)
+        for run in _CJK_RUN_RE.findall(phrase):
+            for i in range(len(run) - 1):
+                bigram = run[i:i + 2]
+                if bigram != phrase and bigram not in _STOP_BIGRAMS:
+                    terms[bigram] = max(terms.get(bigram, 0), bigram_weight)
+        for word in _LATIN_WORD_RE.findall(phrase):
+            if word != phrase:
+                terms[word] = max(terms.get(word, 0), 1.0)
+    return terms
+
+
+# 码点数组统一用16位；基本多文种平面以外的字符（emoji等）都记为这个非字符码点，查询词中不会出现
+_OTHER_CHAR = 0xFFFF
+
+
+def _is_ascii_word(codes):
+    """码点是否为ASCII字母或数字。"""
+    return ((codes >= 97) & (codes <= 122)) | ((codes >= 65) & (codes <= 90)) | ((codes >= 48) & (codes <= 57))
+
+
+def _char_variants(code):
+    """码点及其ASCII大写形式（查询词已转小写，原文不整体转小写，比较时忽略ASCII大小写）。"""
+    return (code, code - 32) if 97 <= code <= 122 else (code,)
+
+
+class _CandidateIndex:
+    """
+    查询词起始位置的候选索引：整个文档集只查表扫描一遍，找出首字符属于某个查询词首字符的位置，
+    再按前两个字符把这些位置分到各查询词前缀的组里（不属于任何前缀的丢弃）。
+    之后每个查询词只需校验自己那一组位置，耗时与命中数成正比，不再是查询词数乘以文档总长。
+    """
+    def __init__(self, codes, terms_codes):
+        """
+        :param codes: 拼接后的16位码点数组，末尾是一个分隔符（保证每个位置都有下一个字符）
+        :param terms_codes: 各查询词（小写）的码点列表
+        """
+        self.codes = codes
+        first_chars = sorted({term_codes[0] for term_codes in terms_codes})
+        self.first_ids = {code: i for i, code in enumerate(first_chars)}
+        first_table = np.full(1 << 16, -1, dtype=np.int16)
+        for code, i in self.first_ids.items():
+            first_table[list(_char_variants(code))] = i
+        self.candidates = np.flatnonzero((first_table >= 0)[codes])
+        self.first = first_table[codes[self.candidates]]
+
+        # 多字查询词按 (首字符, 第二个字符) 分组，用二维表一次查出每个候选位置所属的组
+        prefixes = sorted({tuple(term_codes[:2]) for term_codes in terms_codes if len(term_codes) > 1})
+        self.prefix_ids = {prefix: i for i, prefix in enumerate(prefixes)}
+        group_table = np.full((len(first_chars), 1 << 16), -1, dtype=np.int16)
+        for (first_code, second_code), i in self.prefix_ids.items():
+            group_table[self.first_ids[first_code], list(_char_variants(second_code))] = i
+        groups = group_table[self.first, codes[self.candidates + 1]]
+        hit = groups >= 0
+        # 组号是很小的整数，稳定排序走基数排序，组内位置保持升序
+        order = np.argsort(groups[hit], kind='stable')
+        self.positions = self.candidates[hit][order]
+        self.bounds = np.searchsorted(groups[hit][order], np.arange(len(prefixes) + 1))
+
+    def find(self, term_codes):
+        """查询词在拼接串中的所有起始位置（以字母或数字开头/结尾的查询词两侧须为单词边界）。"""
+        codes = self.codes
+        if len(term_codes) == 1:
+            positions = self.candidates[self.first == self.first_ids[term_codes[0]]]
+        else:
+            group = self.prefix_ids[tuple(term_codes[:2])]
+            positions = self.positions[self.bounds[group]:self.bounds[group + 1]]
+            positions = positions[positions <= len(codes) - len(term_codes)]
+        for offset in range(2, len(term_codes)):
+            if positions.size == 0:
+                break
+            chars = codes[positions + offset]
+            matched = chars == term_codes[offset]
+            for variant in _char_variants(term_codes[offset])[1:]:
+                matched |= chars == variant
+            positions = positions[matched]
+        # 避免 "java" 命中 "javascript"、"ai" 命中 "email"
+        if positions.size and _is_ascii_word(term_codes[0]):
+            before = positions > 0
+            before[before] = _is_ascii_word(codes[positions[before] - 1])
+            positions = positions[~before]
+        if positions.size and _is_ascii_word(term_codes[-1]):
+            positions = positions[~_is_ascii_word(codes[positions + len(term_codes)])]
+        return positions
+
+
+def _term_frequencies(texts, terms):
+    """
+    统计每个查询词在每个文档中的出现次数，返回 (文档数 x 查询词数) 的矩阵和各文档长度。
+    所有文档拼接后转成Unicode码点数组，用候选索引一次定位所有查询词，
+    再用 searchsorted 把命中位置映射回文档，避免逐文档逐词的Python循环。
+    """
+    texts = [text[:MAX_DOC_CHARS] if isinstance(text, str) else '' for text in texts]
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    # 每个文档在拼接串中的起始偏移
+    starts = np.zeros(len(texts), dtype=np.int64)
+    if len(texts) > 1:
+        np.cumsum(lengths[:-1] + len(_DOC_SEPARATOR), out=starts[1:])
+    # 末尾多加一个分隔符，使每个命中位置之后都有一个字符，检查词边界时不必判断越界
+    codes = np.frombuffer((_DOC_SEPARATOR.join(texts) + _DOC_SEPARATOR).encode('utf-32-le'), dtype=np.uint32)
+    if codes.max() > _OTHER_CHAR:
+        codes = np.minimum(codes, _OTHER_CHAR)
+    codes = codes.astype(np.uint16)
+
+    counts = np.zeros((len(texts), len(terms)), dtype=np.float64)
+    columns = []
+    for column, term in enumerate(terms):
+        term_codes = [ord(char) for char in term]
+        # 含基本多文种平面以外字符的查询词无法在16位数组中匹配，跳过
+        if term_codes and max(term_codes) < _OTHER_CHAR and len(term_codes) < len(codes):
+            columns.append((column, term_codes))
+    if not columns:
+        return counts, lengths
+
+    index = _CandidateIndex(codes, [term_codes for _, term_codes in columns])
+    for column, term_codes in columns:
+        positions = index.find(term_codes)
+        if positions.size:
+            doc_ids = np.searchsorted(starts, positions, side='right') - 1
+            counts[:, column] = np.bincount(doc_ids, minlength=len(texts))
+    return counts, lengths
+
+
+def _weighted_tf(titles, descriptions, terms, title_weight):
+    """标题和描述的加权词频矩阵及文档长度（标题中的命中按 title_weight 加权，类似BM25F）。"""
+    title_tf, title_len = _term_frequencies(titles, terms)
+    desc_tf, desc_len = _term_frequencies(descriptions, terms)
+    return title_weight * title_tf + desc_tf, title_weight * title_len + desc_len
+
+
+def _bm25(tf, doc_len, total_docs, doc_freq, avg_len, weights, k1, b):
+    idf = np.log(1.0 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    norm = k1 * (1.0 - b + b * doc_len / (avg_len or 1.0))
+    saturated = tf * (k1 + 1.0) / (tf + norm[:, None])
+    return saturated @ (idf * weights)
+
+
+def bm25_scores(titles, descriptions, query_terms, k1=1.5, b=0.75, title_weight=2.0):
+    """
+    对职位标题和描述计算BM25相关度。
+    :param titles: 标题列表
+    :param descriptions: 清洗后的描述列表
+    :param query_terms: {查询词: 权重}，通常由 expand_query 生成
+    :return: 与输入顺序一致的numpy分数数组
+    """
+    total = len(titles)
+    if total == 0 or not query_terms:
+        return np.zeros(total, dtype=np.float64)
+
+    terms = list(query_terms)
+    tf, doc_len = _weighted_tf(titles, descriptions, terms, title_weight)
+    weights = np.fromiter((query_terms[term] for term in terms), dtype=np.float64, count=len(terms))
+    return _bm25(tf, doc_len, total, np.count_nonzero(tf, axis=0), doc_len.mean(), weights, k1, b)
+
+
+class StreamingBM25Scorer:
+    """
+    流式流水线使用的BM25打分器：职位分批到达，文档频率和平均长度按目前为止见过的全部职位累计估算，
+    每批职位到达时即可打分，不必等所有数据源抓取完毕。
+    """
+    def __init__(self, phrases, k1=1.5, b=0.75, title_weight=2.0):
+        self.query_terms = expand_query(phrases)
+        self.terms = list(self.query_terms)
+        self.weights = np.fromiter((self.query_terms[t] for t in self.terms), dtype=np.float64, count=len(self.terms))
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.total_docs = 0
+        self.total_len = 0.0
+        self.doc_freq = np.zeros(len(self.terms), dtype=np.float64)
+
+    def score(self, df_jobs):
+        """为一批职位添加 relevance_score 列，返回新的DataFrame。"""
+        df_jobs = df_jobs.copy()
+        if df_jobs.empty or not self.terms:
+            df_jobs['relevance_score'] = 0.0
+            return df_jobs
+        tf, doc_len = _weighted_tf(
+            df_jobs['title'].tolist(), df_jobs['clean_description'].tolist(), self.terms, self.title_weight
+        )
+        self.total_docs += len(df_jobs)
+        self.total_len += float(doc_len.sum())
+        self.doc_freq += np.count_nonzero(tf, axis=0)
+        scores = _bm25(tf, doc_len, self.total_docs, self.doc_freq, self.total_len / self.total_docs,
+                       self.weights, self.k1, self.b)
+        df_jobs['relevance_score'] = np.round(scores, 4)
+        return df_jobs
+
+
+def score_jobs(df_jobs, phrases):
+    """为职位DataFrame添加 relevance_score 列（保留4位小数），返回新的DataFrame。"""
+    df_jobs = df_jobs.copy()
+    scores = bm25_scores(df_jobs['title'].tolist(), df_jobs['clean_description'].tolist(), expand_query(phrases))
+    df_jobs['relevance_score'] = np.round(scores, 4)
+    return df_jobs
+
+
+def select_relevant(df_jobs, top_n=0, min_score=0.0):
+    """
+    按 relevance_score 选出需要送去AI匹配的职位：先按阈值过滤，再保留分数最高的 top_n 个。
+    返回的职位保持原始顺序，使分块和响应缓存保持稳定。
+    :param top_n: 最多保留的职位数，<=0 表示不限制
+    :param min_score: 分数下限
+    :return: (保留的DataFrame, 被过滤掉的职位数)
+    """
+    if df_jobs.empty:
+        return df_jobs, 0
+    scores = df_jobs['relevance_score'].to_numpy()
+    keep = scores >= min_score
+    if top_n > 0 and np.count_nonzero(keep) > top_n:
+        candidates = np.flatnonzero(keep)
+        # 稳定排序：同分时先出现的职位优先
+        best = candidates[np.argsort(-scores[candidates], kind='stable')[:top_n]]
+        keep = np.zeros(len(scores), dtype=bool)
+        keep[best] = True
+    return df_jobs[keep], int(len(scores) - np.count_nonzero(keep))
+
+
+def parse_keywords(value):
+    """解析逗号分隔的关键词配置（支持中英文逗号）。"""
+    return [keyword.strip() for keyword in re.split(r'[,，]', value or '') if keyword.strip()]
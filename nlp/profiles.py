@@ -0,0 +1,317 @@
+# nlp/profiles.py
+import os
+import re
+
+from config import USER_EDUCATION, USER_MAJOR, PREFILTER_KEYWORDS, USER_PROFILES, MATCH_PROFILES_PER_REQUEST
+from nlp.prefilter import parse_keywords, score_jobs, select_relevant, StreamingBM25Scorer
+from storage.seen_jobs import SeenJobsStore
+
+# 未配置 USER_PROFILES 时，由 USER_EDUCATION/USER_MAJOR 构成的唯一画像的名称
+DEFAULT_PROFILE_NAME = "default"
+# 职位面向哪些画像（画像名称的元组），多画像时由增量过滤和预筛选写入
+TARGETS_COLUMN = "target_profiles"
+_SLUG_RE = re.compile(r'[^\w-]+')
+
+
+class UserProfile:
+    """一位用户的求职画像：学历、专业、预筛选扩展关键词，以及接收报告的邮箱。"""
+    def __init__(self, name, education, major, keywords=None, email=None):
+        self.name = name
+        self.education = education
+        self.major = major
+        self.keywords = list(keywords or [])
+        self.email = email or None
+
+    @property
+    def phrases(self):
+        """BM25预筛选的查询短语：专业加扩展关键词。"""
+        return [self.major] + self.keywords
+
+    @property
+    def slug(self):
+        """用于文件名的画像标识。"""
+        return _SLUG_RE.sub('_', self.name).strip('_') or 'profile'
+
+    def cache_key(self):
+        """参与模型响应缓存键计算的画像内容（只含影响模型判断的字段）。"""
+        return {"education": self.education, "major": self.major}
+
+    def describe(self):
+        """Prompt中的用户背景描述。"""
+        return f"用户学历: {self.education}, 专业: {self.major}"
+
+    def __repr__(self):
+        return f"UserProfile({self.name!r}, {self.education!r}, {self.major!r})"
+
+
+def parse_profiles(value):
+    """
+    解析 USER_PROFILES 配置。
+    :param value: 如 "alice:本科:计算机科学与技术:后端,Python:alice@example.com;bob:硕士:市场营销"
+    :return: UserProfile 列表，格式有误或名称重复的条目会被忽略
+    """
+    profiles = []
+    names = set()
+    for item in re.split(r'[;；]', value or ''):
+        item = item.strip()
+        if not item:
+            continue
+        fields = [field.strip() for field in re.split(r'[:：]', item)]
+        if len(fields) < 3 or not all(fields[:3]):
+            print(f"忽略格式有误的用户画像配置: {item}（应为 名称:学历:专业[:扩展关键词[:收件邮箱]]）")
+            continue
+        name, education, major = fields[:3]
+        if name in names:
+            print(f"忽略重复的用户画像: {name}")
+            continue
+        names.add(name)
+        keywords = parse_keywords(fields[3]) if len(fields) > 3 else []
+        email = fields[4] if len(fields) > 4 else None
+        profiles.append(UserProfile(name, education, major, keywords, email))
+    return profiles
+
+
+def default_profile():
+    """由 USER_EDUCATION/USER_MAJOR/PREFILTER_KEYWORDS 构成的单用户画像。"""
+    return UserProfile(DEFAULT_PROFILE_NAME, USER_EDUCATION, USER_MAJOR, parse_keywords(PREFILTER_KEYWORDS))
+
+
+def load_profiles():
+    """按配置加载本次运行的全部画像；未配置 USER_PROFILES 时只有默认画像。"""
+    return parse_profiles(USER_PROFILES) or [default_profile()]
+
+
+def group_profiles(profiles, size=None):
+    """把画像按每次请求的上限分组。"""
+    size = max(1, size or MATCH_PROFILES_PER_REQUEST)
+    return [profiles[start:start + size] for start in range(0, len(profiles), size)]
+
+
+def profile_path(path, profile, multi):
+    """
+    画像专属的文件路径：单画像时沿用原路径，多画像时在扩展名前插入画像标识，
+    如 data/seen_jobs.sqlite3 -> data/seen_jobs.alice.sqlite3。
+    """
+    if not multi:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{profile.slug}{ext}"
+
+
+def score_column(profile):
+    """多画像时该画像的相关度分数列名。"""
+    return f"relevance_score@{profile.name}"
+
+
+def targets_of(df_chunk, profiles):
+    """块内每个职位面向的画像名称集合；没有 target_profiles 列时视为面向全部画像。"""
+    if TARGETS_COLUMN not in df_chunk.columns:
+        everyone = {profile.name for profile in profiles}
+        return [everyone] * len(df_chunk)
+    return [set(targets) for targets in df_chunk[TARGETS_COLUMN]]
+
+
+class ProfileSet:
+    """
+    一次运行中参与匹配的全部画像。抓取、清洗和去重只做一次，之后：
+    - 按画像分别做BM25打分（或用职位向量与各画像向量的相似度打分）和增量过滤（各画像有自己的已处理职位记录），
+      职位只要对任一画像是新的且足够相关就送去匹配，并在 target_profiles 列记下它面向哪些画像；
+    - 每块职位在一次请求中同时为多个画像挑选（见 ConcurrentMatcher.match_one），结果再拆回各画像。
+    只有一个画像时，各步骤与单用户流程完全一致。
+    """
+    def __init__(self, profiles, seen_stores=None, streaming=False, embedder=None, embedding_min_score=0.0):
+        """
+        :param profiles: UserProfile 列表
+        :param seen_stores: {画像名称: SeenJobsStore}，缺少的画像不做增量过滤
+        :param streaming: 为True时使用 StreamingBM25Scorer 逐批打分
+        :param embedder: nlp.embeddings.JobEmbedder，提供时以职位与画像向量的余弦相似度代替BM25打分
+        :param embedding_min_score: 向量打分时的相似度下限（BM25打分的下限由 select 的参数给出）
+        """
+        self.profiles = list(profiles)
+        self.multi = len(self.profiles) > 1
+        self.seen_stores = dict(seen_stores or {})
+        self.embedder = embedder
+        self.embedding_min_score = embedding_min_score
+        self._scorers = {p.name: StreamingBM25Scorer(p.phrases) for p in self.profiles} if streaming else None
+        self.results = {p.name: {"matched": [], "other": []} for p in self.profiles}
+        self.carried = {"matched": 0, "other": 0}
+        # 沿用历史结果、无需匹配的职位数（包括上次未被选中的职位；多画像时为对所有画像都无变化的职位）
+        self.unchanged = 0
+        # 匹配失败（至少一个画像的请求出错）的职位块数
+        self.failed_chunks = 0
+
+    def _score_one(self, df_jobs, profile):
+        if self._scorers:
+            return self._scorers[profile.name].score(df_jobs)
+        return score_jobs(df_jobs, profile.phrases)
+
+    def _embedding_scores(self, df_jobs):
+        """向量打分，返回形状为 (职位数, 画像数) 的数组；向量化失败时停用向量打分并返回None（改用BM25）。"""
+        try:
+            return self.embedder.score(df_jobs, self.profiles)
+        except Exception as e:
+            print(f"职位向量化失败，预筛选改用BM25打分: {e}")
+            self.embedder = None
+            return None
+
+    def score(self, df_jobs):
+        """
+        为职位打相关度分。多画像时每个画像一列 relevance_score@名称，
+        relevance_score 取各画像中的最高分。
+        """
+        scores = self._embedding_scores(df_jobs) if self.embedder else None
+        if scores is not None:
+            # 职位只向量化一次，与全部画像向量一起算相似度
+            df_jobs = df_jobs.copy()
+            if not self.multi:
+                df_jobs['relevance_score'] = scores[:, 0]
+                return df_jobs
+            for i, profile in enumerate(self.profiles):
+                df_jobs[score_column(profile)] = scores[:, i]
+            df_jobs['relevance_score'] = scores.max(axis=1)
+            return df_jobs
+        if not self.multi:
+            return self._score_one(df_jobs, self.profiles[0])
+        df_jobs = df_jobs.copy()
+        columns = []
+        for profile in self.profiles:
+            column = score_column(profile)
+            df_jobs[column] = self._score_one(df_jobs, profile)['relevance_score'].to_numpy()
+            columns.append(column)
+        df_jobs['relevance_score'] = df_jobs[columns].max(axis=1)
+        return df_jobs
+
+    def drop_seen_stores(self):
+        """关闭并停用全部已处理职位记录，清空已沿用的历史结果（读取记录出错时改为对全部职位匹配）。"""
+        for store in self.seen_stores.values():
+            store.close()
+        self.seen_stores = {}
+        self.results = {p.name: {"matched": [], "other": []} for p in self.profiles}
+        self.carried = {"matched": 0, "other": 0}
+        self.unchanged = 0
+
+    def _carry(self, profile, carried_matched, carried_other):
+        self.results[profile.name]["matched"].extend(carried_matched)
+        self.results[profile.name]["other"].extend(carried_other)
+        self.carried["matched"] += len(carried_matched)
+        self.carried["other"] += len(carried_other)
+
+    def partition(self, df_jobs):
+        """
+        增量过滤：沿用各画像已有的匹配结果，返回至少对一个画像需要匹配的职位。
+        多画像时结果带 target_profiles 列；没有任何已处理职位记录时原样返回（多画像时面向全部画像）。
+        """
+        if not self.multi:
+            store = self.seen_stores.get(self.profiles[0].name)
+            if not store:
+                return df_jobs
+            df_jobs = store.annotate(df_jobs)
+            df_pending, carried_matched, carried_other = store.partition(df_jobs)
+            self._carry(self.profiles[0], carried_matched, carried_other)
+            self.unchanged += len(df_jobs) - len(df_pending)
+            return df_pending
+
+        df_jobs = SeenJobsStore.annotate(df_jobs).reset_index(drop=True)
+        targets = [[] for _ in range(len(df_jobs))]
+        for profile in self.profiles:
+            store = self.seen_stores.get(profile.name)
+            if store:
+                df_pending, carried_matched, carried_other = store.partition(df_jobs)
+                self._carry(profile, carried_matched, carried_other)
+                pending_positions = df_pending.index
+            else:
+                pending_positions = df_jobs.index
+            for position in pending_positions:
+                targets[position].append(profile.name)
+        df_jobs[TARGETS_COLUMN] = [tuple(names) for names in targets]
+        keep = [bool(names) for names in targets]
+        self.unchanged += keep.count(False)
+        return df_jobs[keep]
+
+    def select(self, df_jobs, top_n=0, min_score=0.0):
+        """
+        按相关度选出需要匹配的职位（语义同 select_relevant）。多画像时每个画像按自己的分数
+        各自取前 top_n 个，职位面向的画像随之收窄，保留至少被一个画像选中的职位。
+        :param min_score: BM25打分的分数下限；分数来自向量打分时改用 embedding_min_score
+        （向量化失败时 score 会停用向量打分，此后的职位按BM25打分，下限随之切换）
+        :return: (保留的DataFrame, 被过滤掉的职位数)
+        """
+        if self.embedder is not None:
+            min_score = self.embedding_min_score
+        if not self.multi:
+            return select_relevant(df_jobs, top_n, min_score)
+        if df_jobs.empty:
+            return df_jobs, 0
+        df_jobs = df_jobs.reset_index(drop=True)
+        current = targets_of(df_jobs, self.profiles)
+        selected = [set() for _ in range(len(df_jobs))]
+        for profile in self.profiles:
+            positions = [i for i, names in enumerate(current) if profile.name in names]
+            if not positions:
+                continue
+            candidates = df_jobs.iloc[positions]
+            candidates = candidates.assign(relevance_score=candidates[score_column(profile)])
+            kept, _ = select_relevant(candidates, top_n, min_score)
+            for position in kept.index:
+                selected[position].add(profile.name)
+        df_jobs[TARGETS_COLUMN] = [
+            tuple(profile.name for profile in self.profiles if profile.name in names) for names in selected
+        ]
+        keep = [bool(names) for names in selected]
+        return df_jobs[keep], keep.count(False)
+
+    def add_chunk_result(self, df_chunk, chunk_result):
+        """
+        合并一块职位的匹配结果，并记入各画像的已处理职位记录（匹配失败的部分不记录，下次运行会重新匹配）。
+        :param chunk_result: 单画像时为 {"matched_jobs", "other_jobs", "selected"}；
+                             多画像时为 {"profiles": {画像名称: 同上格式}}
+        """
+        if not self.multi:
+            profile = self.profiles[0]
+            self.results[profile.name]["matched"].extend(chunk_result.get("matched_jobs") or [])
+            self.results[profile.name]["other"].extend(chunk_result.get("other_jobs") or [])
+            if chunk_result.get("error"):
+                self.failed_chunks += 1
+                return
+            store = self.seen_stores.get(profile.name)
+            if store:
+                store.record_results(df_chunk, chunk_result)
+            return
+
+        by_profile = chunk_result.get("profiles") or {}
+        targets = targets_of(df_chunk, self.profiles)
+        failed = False
+        for profile in self.profiles:
+            result = by_profile.get(profile.name) or {"error": chunk_result.get("error") or "没有该画像的结果"}
+            self.results[profile.name]["matched"].extend(result.get("matched_jobs") or [])
+            self.results[profile.name]["other"].extend(result.get("other_jobs") or [])
+            failed = failed or bool(result.get("error"))
+            store = self.seen_stores.get(profile.name)
+            if not store or result.get("error"):
+                continue
+            positions = [i for i, names in enumerate(targets) if profile.name in names]
+            if not positions:
+                continue
+            # 结果中的位置是整块内的位置，换算为该画像所见子块内的位置
+            local = {position: i for i, position in enumerate(positions)}
+            selected = {
+                category: [local[position] for position in picks if position in local]
+                for category, picks in (result.get("selected") or {}).items()
+            }
+            store.record_results(df_chunk.iloc[positions], dict(result, selected=selected))
+        if failed:
+            self.failed_chunks += 1
+
+    def rename_sources(self, names):
+        """按 {URL: 合并后的来源名称} 更新全部画像的结果。"""
+        if not names:
+            return
+        for lists in self.results.values():
+            for job in lists["matched"] + lists["other"]:
+                if job.get('url') in names:
+                    job['source'] = names[job['url']]
+
+    def totals(self):
+        """全部画像合计的 (核心匹配数, 其他关注数)。"""
+        return (sum(len(lists["matched"]) for lists in self.results.values()),
+                sum(len(lists["other"]) for lists in self.results.values()))
@@ -1,9 +1,19 @@
 # nlp/standardize.py
 import re
+import time
 import pandas as pd
 import json
 import openai
 from config import OPENAI_API_KEY, OPENAI_BASE_URL, GEMINI_MODEL_NAME, USER_EDUCATION, USER_MAJOR
+from nlp.llm_cache import get_llm_cache, make_cache_key
+from nlp.profiles import TARGETS_COLUMN, score_column, targets_of
+from metrics import get_metrics
+
+# Prompt模板版本号，修改Prompt内容或输出格式后需要递增，使旧的缓存结果失效
+MATCH_PROMPT_VERSION = "match-v2"
+MULTI_MATCH_PROMPT_VERSION = "match-multi-v1"
+SUMMARY_PROMPT_VERSION = "summary-v1"
+MATCH_SYSTEM_PROMPT = "你是一个专业的求职顾问，专注于精准筛选职位。"
 
 # 初始化OpenAI客户端
 try:
@@ -27,6 +37,7 @@ def process_jobs_dataframe(jobs_list):
     """
     if not jobs_list: 
         return pd.DataFrame()
+    started = time.perf_counter()
     df = pd.DataFrame(jobs_list)
     
     for col in ['title', 'description', 'company', 'source', 'url']:
@@ -40,81 +51,332 @@ def process_jobs_dataframe(jobs_list):
     df['url'] = df['url'].fillna('')
     
     df['clean_description'] = df['description'].apply(clean_text)
+    get_metrics().record_timing('clean_jobs', time.perf_counter() - started)
     
     return df
 
-def match_jobs_in_chunk(df_chunk):
+def _create_completion(kind, llm_client, **request):
     """
-    (新) 使用Gemini模型仅对一小块职位进行匹配，不进行总结。
-    :param df_chunk: 包含一小块职位信息的DataFrame
-    :return: 一个包含匹配职位列表的字典
+    调用模型接口并记录本次调用的延迟和token用量（失败的调用也会记录，随后原样抛出）。
+    :param kind: 调用类型，用于指标分类，"match" 或 "summary"
     """
-    if not client:
-        print("OpenAI客户端未初始化，无法进行AI匹配。")
-        return {"matched_jobs": [], "other_jobs": []}
+    started = time.perf_counter()
+    try:
+        response = llm_client.chat.completions.create(**request)
+    except Exception as e:
+        get_metrics().record_llm_call(kind, time.perf_counter() - started, error=type(e).__name__)
+        raise
+    usage = getattr(response, 'usage', None)
+    get_metrics().record_llm_call(
+        kind, time.perf_counter() - started,
+        input_tokens=getattr(usage, 'prompt_tokens', None),
+        output_tokens=getattr(usage, 'completion_tokens', None)
+    )
+    return response
 
-    if df_chunk.empty:
-        return {"matched_jobs": [], "other_jobs": []}
+# 发给模型的职位描述取原始文本并折叠空白，不再附带为JSON手工转义过的 clean_description，避免同一内容发送两遍
+_WHITESPACE_RE = re.compile(r'\s+')
+# 模型每块最多挑出的职位数（核心匹配、其他关注各自的上限）
+MAX_PICKS_PER_CATEGORY = 5
 
-    jobs_json_string = df_chunk.to_json(orient='records', force_ascii=False)
-    user_profile = f"用户学历: {USER_EDUCATION}, 专业: {USER_MAJOR}"
+def _user_profile_key():
+    """参与缓存键计算的用户画像。"""
+    return {"education": USER_EDUCATION, "major": USER_MAJOR}
 
-    prompt = f"""
+def _compact_text(value):
+    if not isinstance(value, str):
+        return ''
+    return _WHITESPACE_RE.sub(' ', value).strip()
+
+def prompt_record(job_id, job, profile_ids=None):
+    """
+    单个职位在Prompt中的精简表示：只包含模型判断所需的字段，并以短ID代替URL等长字段。
+    :param job_id: 块内的短ID，如 "J3"
+    :param job: 职位字典（DataFrame的一行）
+    :param profile_ids: 多画像请求中 {画像名称: 用户编号}；职位只面向其中部分画像时加上 for 字段
+    """
+    record = {
+        "id": job_id,
+        "title": _compact_text(job.get('title')),
+        "company": _compact_text(job.get('company')),
+    }
+    location = _compact_text(job.get('location'))
+    if location and location != 'N/A':
+        record["location"] = location
+    targets = job.get(TARGETS_COLUMN) if profile_ids else None
+    if targets is not None:
+        ids = [profile_id for name, profile_id in profile_ids.items() if name in targets]
+        if len(ids) < len(profile_ids):
+            record["for"] = ids
+    record["desc"] = _compact_text(job.get('description'))
+    return record
+
+def prompt_records(df_chunk, profile_ids=None):
+    """按块内顺序为每个职位分配 J1、J2... 的短ID，返回精简记录列表。"""
+    return [prompt_record(f"J{i + 1}", job, profile_ids) for i, job in enumerate(df_chunk.to_dict(orient='records'))]
+
+def profile_ids(profiles):
+    """多画像请求中按顺序为画像分配 P1、P2... 的用户编号，返回 {画像名称: 用户编号}。"""
+    return {profile.name: f"P{i + 1}" for i, profile in enumerate(profiles)}
+
+def render_prompt_record(record):
+    """单个精简记录的文本（每行一个紧凑JSON对象）。"""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+def build_match_prompt(df_chunk, profile=None):
+    """
+    构造单个职位块的匹配Prompt。df_chunk 为None时生成不含职位的模板，用于估算固定开销。
+    :param profile: UserProfile，默认使用 USER_EDUCATION/USER_MAJOR
+    """
+    records = prompt_records(df_chunk) if df_chunk is not None else []
+    jobs_lines = "\n".join(render_prompt_record(record) for record in records)
+    user_profile = profile.describe() if profile else f"用户学历: {USER_EDUCATION}, 专业: {USER_MAJOR}"
+
+    return f"""
     你是一个专业的求职顾问。请根据以下用户背景和一小批职位信息，筛选出匹配的职位。
 
     **用户背景:**
     {user_profile}
 
-    **本批次的职位信息 (JSON格式):**
-    ```json
-    {jobs_json_string}
-    ```
+    **本批次的职位信息 (每行一个职位，id为职位编号，desc为职位描述):**
+    {jobs_lines}
 
     **请严格执行以下任务:**
-    1.  **核心匹配岗位筛选**: 严格根据用户的学历和专业背景，从上述职位中筛选出 **最多5个** 最匹配的职位。
-    2.  **其他值得关注岗位筛选**: 从剩余职位中筛选出 **最多5个** 其他值得关注的岗位（例如：行业前景好、技能可迁移等）。
-    3.  **格式化输出**: 严格按照下面的JSON格式返回结果，确保每个对象都包含`title`, `company`, `source`, `url`和`reason`。
+    1.  **核心匹配岗位筛选**: 严格根据用户的学历和专业背景，从上述职位中筛选出 **最多{MAX_PICKS_PER_CATEGORY}个** 最匹配的职位。
+    2.  **其他值得关注岗位筛选**: 从剩余职位中筛选出 **最多{MAX_PICKS_PER_CATEGORY}个** 其他值得关注的岗位（例如：行业前景好、技能可迁移等）。
+    3.  **格式化输出**: 只返回职位编号和推荐理由，不要重复职位的其他信息。
 
     **输出格式:**
-    ```json
-    {{
-      "matched_jobs": [
-        {{"title": "职位1", "company": "公司1", "source": "来源1", "url": "链接1", "reason": "推荐理由1..."}}
-      ],
-      "other_jobs": [
-        {{"title": "职位2", "company": "公司2", "source": "来源2", "url": "链接2", "reason": "推荐理由2..."}}
-      ]
-    }}
-    ```
+    {{"matched": [{{"id": "J1", "reason": "推荐理由..."}}], "other": [{{"id": "J2", "reason": "推荐理由..."}}]}}
     """
 
+def build_profiles_match_prompt(df_chunk, profiles):
+    """
+    构造多画像的匹配Prompt：同一块职位只发送一次，由模型分别为每位用户挑选。
+    df_chunk 为None时生成不含职位的模板，用于估算固定开销。
+    :param profiles: 本次请求评估的 UserProfile 列表
+    """
+    ids = profile_ids(profiles)
+    records = prompt_records(df_chunk, ids) if df_chunk is not None else []
+    jobs_lines = "\n".join(render_prompt_record(record) for record in records)
+    profile_lines = "\n    ".join(f"{ids[profile.name]}: {profile.describe()}" for profile in profiles)
+
+    return f"""
+    你是一个专业的求职顾问。请根据以下几位用户的背景和一小批职位信息，分别为每位用户筛选出匹配的职位。
+
+    **用户背景 (P1、P2...为用户编号):**
+    {profile_lines}
+
+    **本批次的职位信息 (每行一个职位，id为职位编号，desc为职位描述；带for字段的职位只需为其中列出的用户评估):**
+    {jobs_lines}
+
+    **请严格为每位用户分别执行以下任务:**
+    1.  **核心匹配岗位筛选**: 严格根据该用户的学历和专业背景，从上述职位中筛选出 **最多{MAX_PICKS_PER_CATEGORY}个** 最匹配的职位。
+    2.  **其他值得关注岗位筛选**: 从剩余职位中为该用户筛选出 **最多{MAX_PICKS_PER_CATEGORY}个** 其他值得关注的岗位（例如：行业前景好、技能可迁移等）。
+    3.  **格式化输出**: 以用户编号为键分别给出结果，每位用户都要有对应的键；只返回职位编号和推荐理由，不要重复职位的其他信息。
+
+    **输出格式:**
+    {{"P1": {{"matched": [{{"id": "J1", "reason": "推荐理由..."}}], "other": [{{"id": "J2", "reason": "推荐理由..."}}]}}, "P2": {{"matched": [{{"id": "J3", "reason": "推荐理由..."}}], "other": []}}}}
+    """
+
+def join_match_response(df_chunk, response, allowed=None, score_field='relevance_score'):
+    """
+    把模型返回的职位编号与本地数据关联，得到完整的匹配结果。
+    未知编号、重复编号和超出数量上限的条目会被丢弃；同一职位同时出现在两类中时只保留为核心匹配。
+    :param df_chunk: 发送给模型的职位块
+    :param response: 模型返回的 {"matched": [{"id", "reason"}], "other": [...]}
+    :param allowed: 允许出现在结果中的块内位置集合（多画像时为面向该画像的职位），为None时不限制
+    :param score_field: 作为结果中 relevance_score 的列
+    :return: {"matched_jobs": [...], "other_jobs": [...], "selected": {"matched": [块内位置], "other": [...]},
+              "capped": 是否有一类达到了数量上限}
+    """
+    if not isinstance(response, dict):
+        raise ValueError(f"模型响应格式错误，应为JSON对象: {type(response).__name__}")
+    jobs = df_chunk.to_dict(orient='records')
+    result = {"matched_jobs": [], "other_jobs": [], "selected": {"matched": [], "other": []}}
+    used = set()
+    for category in ('matched', 'other'):
+        for pick in response.get(category) or []:
+            if not isinstance(pick, dict):
+                continue
+            job_id = str(pick.get('id', '')).strip().upper()
+            if not job_id.startswith('J') or not job_id[1:].isdigit():
+                continue
+            position = int(job_id[1:]) - 1
+            if not 0 <= position < len(jobs) or position in used:
+                continue
+            if allowed is not None and position not in allowed:
+                continue
+            if len(result["selected"][category]) >= MAX_PICKS_PER_CATEGORY:
+                break
+            used.add(position)
+            job = jobs[position]
+            joined = {
+                "title": job.get('title', ''),
+                "company": job.get('company', ''),
+                "source": job.get('source', ''),
+                "url": job.get('url', ''),
+                "reason": str(pick.get('reason') or ''),
+            }
+            if job.get(score_field) is not None:
+                joined["relevance_score"] = float(job[score_field])
+            result[f"{category}_jobs"].append(joined)
+            result["selected"][category].append(position)
+    # 达到上限时未被选中的职位不一定是不合适，只是名额用完了
+    result["capped"] = any(len(picks) >= MAX_PICKS_PER_CATEGORY for picks in result["selected"].values())
+    return result
+
+def join_profiles_response(df_chunk, profiles, response):
+    """
+    把多画像请求的模型响应拆分到各画像，并分别与本地数据关联。
+    模型为某位用户挑出了不面向该用户的职位（for 字段之外）时丢弃。
+    :param response: 模型返回的 {"P1": {"matched": [...], "other": [...]}, ...}
+    :return: {画像名称: join_match_response 的结果}
+    """
+    if not isinstance(response, dict):
+        raise ValueError(f"模型响应格式错误，应为JSON对象: {type(response).__name__}")
+    targets = targets_of(df_chunk, profiles)
+    results = {}
+    for profile_id, profile in zip(profile_ids(profiles).values(), profiles):
+        picks = response.get(profile_id)
+        allowed = {position for position, names in enumerate(targets) if profile.name in names}
+        column = score_column(profile)
+        results[profile.name] = join_match_response(
+            df_chunk, picks if isinstance(picks, dict) else {}, allowed,
+            column if column in df_chunk.columns else 'relevance_score'
+        )
+    return results
+
+def request_chunk_match(df_chunk, llm_client=None, profile=None):
+    """
+    调用模型对一小块职位进行匹配。与 match_jobs_in_chunk 不同，API错误会直接抛出，
+    便于调用方（如并发匹配引擎）根据429/5xx调整并发和重试。
+    :param df_chunk: 包含一小块职位信息的DataFrame
+    :param llm_client: 使用的OpenAI客户端，默认使用模块级的 client
+    :param profile: UserProfile，默认使用 USER_EDUCATION/USER_MAJOR
+    :return: 一个包含匹配职位列表的字典
+    """
+    llm_client = llm_client or client
+    if df_chunk.empty:
+        return {"matched_jobs": [], "other_jobs": []}
+
+    # 缓存的是模型返回的编号和理由，命中后仍与本地最新数据关联
+    cache = get_llm_cache()
+    cache_key = make_cache_key(
+        'match', GEMINI_MODEL_NAME, MATCH_PROMPT_VERSION,
+        profile.cache_key() if profile else _user_profile_key(), prompt_records(df_chunk)
+    )
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"命中模型响应缓存，跳过对 {len(df_chunk)} 个职位的AI匹配。")
+            get_metrics().record_llm_call('match', 0.0, cached=True)
+            return join_match_response(df_chunk, cached)
+
+    prompt = build_match_prompt(df_chunk, profile)
     print(f"正在对 {len(df_chunk)} 个职位进行AI匹配...")
+    response = _create_completion(
+        'match', llm_client,
+        model=GEMINI_MODEL_NAME,
+        messages=[
+            {"role": "system", "content": MATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2,
+        response_format={"type": "json_object"}
+    )
+    raw_result = json.loads(response.choices[0].message.content)
+    # 先与本地数据关联校验，格式不对的响应直接抛出，不写入缓存
+    result = join_match_response(df_chunk, raw_result)
+    if cache:
+        cache.put(cache_key, 'match', raw_result)
+    return result
+
+def request_profiles_match(df_chunk, llm_client=None, profiles=None):
+    """
+    在一次模型调用中为多个画像匹配同一块职位：职位数据只发送一次，输入token和调用次数
+    不随画像数成倍增长。API错误会直接抛出，由调用方决定如何重试。
+    :param df_chunk: 职位块，target_profiles 列给出每个职位面向的画像（缺省为全部）
+    :param llm_client: 使用的OpenAI客户端，默认使用模块级的 client
+    :param profiles: 本次请求评估的 UserProfile 列表
+    :return: {画像名称: {"matched_jobs": [...], "other_jobs": [...], "selected": {...}}}
+    """
+    llm_client = llm_client or client
+    if df_chunk.empty:
+        return {profile.name: {"matched_jobs": [], "other_jobs": []} for profile in profiles}
+
+    cache = get_llm_cache()
+    cache_key = make_cache_key(
+        'match', GEMINI_MODEL_NAME, MULTI_MATCH_PROMPT_VERSION,
+        [profile.cache_key() for profile in profiles], prompt_records(df_chunk, profile_ids(profiles))
+    )
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"命中模型响应缓存，跳过对 {len(df_chunk)} 个职位、{len(profiles)} 个用户画像的AI匹配。")
+            get_metrics().record_llm_call('match', 0.0, cached=True)
+            return join_profiles_response(df_chunk, profiles, cached)
+
+    prompt = build_profiles_match_prompt(df_chunk, profiles)
+    print(f"正在对 {len(df_chunk)} 个职位进行AI匹配（同时评估 {len(profiles)} 个用户画像）...")
+    response = _create_completion(
+        'match', llm_client,
+        model=GEMINI_MODEL_NAME,
+        messages=[
+            {"role": "system", "content": MATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2,
+        response_format={"type": "json_object"}
+    )
+    raw_result = json.loads(response.choices[0].message.content)
+    result = join_profiles_response(df_chunk, profiles, raw_result)
+    if cache:
+        cache.put(cache_key, 'match', raw_result)
+    return result
+
+def match_jobs_in_chunk(df_chunk):
+    """
+    (新) 使用Gemini模型仅对一小块职位进行匹配，不进行总结。
+    :param df_chunk: 包含一小块职位信息的DataFrame
+    :return: 一个包含匹配职位列表的字典
+    """
+    if not client:
+        print("OpenAI客户端未初始化，无法进行AI匹配。")
+        return {"matched_jobs": [], "other_jobs": []}
+
+    if df_chunk.empty:
+        return {"matched_jobs": [], "other_jobs": []}
+
     try:
-        response = client.chat.completions.create(
-            model=GEMINI_MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "你是一个专业的求职顾问，专注于精准筛选职位。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        return request_chunk_match(df_chunk)
     except Exception as e:
         print(f"调用AI进行职位匹配时出错: {e}")
         return {"matched_jobs": [], "other_jobs": []}
 
-def summarize_market_trends(df_jobs):
+def request_market_summary(df_jobs, llm_client=None):
     """
-    (新) 使用Gemini模型对所有职位进行最终的宏观市场总结。
+    调用模型生成宏观市场总结。API错误会直接抛出，由调用方决定如何重试。
     :param df_jobs: 包含所有职位信息的DataFrame
-    :return: 一个包含市场总结的字符串
+    :param llm_client: 使用的OpenAI客户端，默认使用模块级的 client
+    :return: 市场总结文本
     """
-    if not client or df_jobs.empty:
-        return "因数据不足或AI服务未配置，无法生成市场总结。"
-
+    llm_client = llm_client or client
     # 为了节省token，我们只给AI看职位标题和来源
-    sample_jobs_string = df_jobs.head(100)[['title', 'source']].to_string(index=False)
+    sample_jobs = df_jobs.head(100)[['title', 'source']]
+    sample_jobs_string = sample_jobs.to_string(index=False)
+
+    cache = get_llm_cache()
+    cache_key = make_cache_key(
+        'summary', GEMINI_MODEL_NAME, SUMMARY_PROMPT_VERSION, None,
+        sample_jobs.to_dict(orient='records')
+    )
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print("命中模型响应缓存，跳过市场趋势总结的AI调用。")
+            get_metrics().record_llm_call('summary', 0.0, cached=True)
+            return cached
 
     prompt = f"""
     你是一个敏锐的市场分析师。请根据以下近百个职位列表的概览，为求职者撰写一段150-200字的宏观市场趋势分析。
@@ -130,17 +392,32 @@ def summarize_market_trends(df_jobs):
     """
 
     print("正在调用AI模型进行最终的市场趋势总结...")
+    response = _create_completion(
+        'summary', llm_client,
+        model=GEMINI_MODEL_NAME,
+        messages=[
+            {"role": "system", "content": "你是一个专业的市场分析师，擅长从职位列表中洞察趋势。"},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7
+    )
+    content = response.choices[0].message.content
+    summary = content.strip() if content else ""
+    if cache and summary:
+        cache.put(cache_key, 'summary', summary)
+    return summary
+
+def summarize_market_trends(df_jobs):
+    """
+    (新) 使用Gemini模型对所有职位进行最终的宏观市场总结。
+    :param df_jobs: 包含所有职位信息的DataFrame
+    :return: 一个包含市场总结的字符串
+    """
+    if not client or df_jobs.empty:
+        return "因数据不足或AI服务未配置，无法生成市场总结。"
+
     try:
-        response = client.chat.completions.create(
-            model=GEMINI_MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "你是一个专业的市场分析师，擅长从职位列表中洞察趋势。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-        content = response.choices[0].message.content
-        return content.strip() if content else ""
+        return request_market_summary(df_jobs)
     except Exception as e:
         print(f"调用AI进行市场总结时出错: {e}")
         return f"AI市场总结生成失败: {e}"
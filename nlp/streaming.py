@@ -0,0 +1,175 @@
+# nlp/streaming.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from nlp.standardize import process_jobs_dataframe
+from nlp.dedup import NearDuplicateIndex
+from nlp.prefilter import select_relevant
+
+
+class StreamingMatchStage:
+    """
+    流式流水线的消费端：逐批接收爬虫产出的原始职位，依次完成清洗、近似去重、相关度打分、
+    增量过滤和按token预算装块，每装满一块就立即提交给模型匹配，不必等所有数据源抓取完毕。
+    在途的块数达到上限时 feed() 会阻塞，从而让上游的有界队列填满、爬虫线程随之等待（背压）。
+    """
+    def __init__(self, matcher, planner, profile_set, prefilter=False, min_score=0.0, max_jobs=0,
+                 dedup_max_distance=None, max_inflight_chunks=8):
+        """
+        :param matcher: ConcurrentMatcher 实例
+        :param planner: ChunkPlanner 实例，提供单个职位的token估算和截断
+        :param profile_set: ProfileSet 实例（以 streaming=True 创建），负责各画像的打分、增量过滤和结果收集
+        :param prefilter: 是否做相关度预筛选
+        :param min_score: 相关度分数下限（流式模式下无法预知全量排名，只按阈值过滤）
+        :param max_jobs: 本次运行最多送去匹配的职位数（按到达顺序先到先得，每批内优先取分数高的），<=0 表示不限制
+        :param dedup_max_distance: 近似去重的最大汉明距离，为None时不去重
+        :param max_inflight_chunks: 同时在途（已提交、未完成）的块数上限
+        """
+        self.matcher = matcher
+        self.planner = planner
+        self.profile_set = profile_set
+        self.prefilter = prefilter
+        self.min_score = min_score
+        self.max_jobs = max_jobs
+        self._admitted = 0
+        self.dedup_index = NearDuplicateIndex(max_distance=dedup_max_distance) if dedup_max_distance is not None else None
+        self._executor = ThreadPoolExecutor(max_workers=matcher.max_concurrency)
+        self._inflight = threading.BoundedSemaphore(max(1, max_inflight_chunks))
+
+        self._open_rows = []
+        self._open_tokens = 0
+        self._dispatched = []  # [(df_chunk, future)]，按提交顺序
+        self._kept_frames = []
+        self._record_sources = {}  # 去重索引中的记录编号 -> 合并后的来源列表
+        self._record_urls = {}  # 去重索引中的记录编号 -> 保留下来的职位URL
+        self.stats = {"raw": 0, "duplicates": 0, "unchanged": 0, "filtered": 0, "sent": 0, "truncated": 0, "chunks": 0}
+
+    def _deduplicate(self, df_batch):
+        """去掉与已见职位近似重复的记录（保留先到达的一条），并把来源合并到先到达的记录上。"""
+        if self.dedup_index is None:
+            return df_batch
+        keep = []
+        for title, company, description, source, url in zip(
+            df_batch['title'], df_batch['company'], df_batch['clean_description'], df_batch['source'], df_batch['url']
+        ):
+            record_id, duplicate_of = self.dedup_index.add(title, company, description)
+            if duplicate_of is None:
+                self._record_sources[record_id] = [source]
+                self._record_urls[record_id] = url
+                keep.append(True)
+                continue
+            merged = self._record_sources.setdefault(duplicate_of, [])
+            if source not in merged:
+                merged.append(source)
+            keep.append(False)
+        self.stats["duplicates"] += keep.count(False)
+        return df_batch[keep]
+
+    def feed(self, raw_jobs):
+        """
+        处理一批原始职位（爬虫产出的职位字典列表）。
+        """
+        if not raw_jobs:
+            return
+        self.stats["raw"] += len(raw_jobs)
+        df_batch = process_jobs_dataframe(raw_jobs)
+        df_batch = self._deduplicate(df_batch)
+        if df_batch.empty:
+            return
+        if self.prefilter:
+            df_batch = self.profile_set.score(df_batch)
+        self._kept_frames.append(df_batch)
+
+        unchanged_before = self.profile_set.unchanged
+        df_batch = self.profile_set.partition(df_batch)
+        self.stats["unchanged"] += self.profile_set.unchanged - unchanged_before
+        if self.prefilter:
+            df_batch, filtered_count = self.profile_set.select(df_batch, 0, self.min_score)
+            self.stats["filtered"] += filtered_count
+        df_batch = self._apply_budget(df_batch)
+
+        for job in df_batch.to_dict(orient='records'):
+            self._add_job(job)
+
+    def _apply_budget(self, df_batch):
+        """按本次运行的职位数上限截取这一批，超出上限的职位计入相关度过滤数。"""
+        if self.max_jobs <= 0 or df_batch.empty:
+            return df_batch
+        remaining = self.max_jobs - self._admitted
+        if remaining <= 0:
+            kept = df_batch.iloc[0:0]
+        elif 'relevance_score' in df_batch.columns:
+            kept, _ = select_relevant(df_batch, remaining)
+        else:
+            kept = df_batch.head(remaining)
+        self.stats["filtered"] += len(df_batch) - len(kept)
+        self._admitted += len(kept)
+        return kept
+
+    def _add_job(self, job):
+        """把职位放入当前块；放不下（超出token预算或职位数上限）时先提交当前块。"""
+        job, tokens, truncated = self.planner.fit_job(job)
+        if truncated:
+            self.stats["truncated"] += 1
+        if self._open_rows and (self._open_tokens + tokens > self.planner.token_budget
+                                or len(self._open_rows) >= self.planner.max_jobs_per_chunk):
+            self._dispatch()
+        self._open_rows.append(job)
+        self._open_tokens += tokens
+
+    def _dispatch(self):
+        if not self._open_rows:
+            return
+        df_chunk = pd.DataFrame(self._open_rows)
+        self._open_rows = []
+        self._open_tokens = 0
+        # 在途块数达到上限时在此阻塞，直到有块完成
+        self._inflight.acquire()
+        future = self._executor.submit(self.matcher.match_one, df_chunk)
+        future.add_done_callback(lambda _: self._inflight.release())
+        self._dispatched.append((df_chunk, future))
+        self.stats["chunks"] += 1
+        self.stats["sent"] += len(df_chunk)
+        print(f"  已提交第 {len(self._dispatched)} 块 ({len(df_chunk)} 个职位) 进行AI匹配。")
+
+    def _merged_source_names(self):
+        """保留下来的职位URL -> 合并后的来源名称（仅限有重复的职位）。"""
+        names = {}
+        for record_id, sources in self._record_sources.items():
+            url = self._record_urls.get(record_id)
+            if url and len(sources) > 1:
+                names[url] = ' / '.join(sources)
+        return names
+
+    def close(self):
+        """
+        关闭匹配线程池：取消尚未开始的块，并等待正在进行的块结束。可重复调用；
+        feed() 或 finish() 中途出错时由调用方在 finally 中调用，避免线程池泄漏。
+        """
+        for _, future in self._dispatched:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+
+    def finish(self):
+        """
+        提交最后一个未满的块并等待所有块完成，各画像的匹配结果收集在 profile_set.results 中。
+        :return: 去重后全部职位的DataFrame
+        """
+        self._dispatch()
+        try:
+            # 按提交顺序合并结果，保证报告内容稳定
+            for df_chunk, future in self._dispatched:
+                self.profile_set.add_chunk_result(df_chunk, future.result())
+        finally:
+            self.close()
+
+        # 去重时合并到先到达记录上的来源，在结果和全量数据中一并更新
+        merged_names = self._merged_source_names()
+        self.profile_set.rename_sources(merged_names)
+
+        df_all = pd.concat(self._kept_frames, ignore_index=True) if self._kept_frames else pd.DataFrame()
+        if merged_names and not df_all.empty:
+            df_all['source'] = [merged_names.get(url, source) for url, source in zip(df_all['url'], df_all['source'])]
+        return df_all
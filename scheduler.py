@@ -1,5 +1,6 @@
 # scheduler.py
-import schedule
+import math
+import threading
 import time
 import smtplib
 from email.mime.text import MIMEText
@@ -7,16 +8,21 @@ from email.mime.multipart import MIMEMultipart
 import json
 import os
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # 导入配置
 from config import (
     SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, RECIPIENT_EMAIL,
-    EMAIL_SEND_TIME, MATCHED_JOBS_SUMMARY_PATH
+    EMAIL_SEND_TIME, MATCHED_JOBS_SUMMARY_PATH, JOB_STORE_PATH,
+    SCHEDULE_DEFAULT_LEAD_MINUTES, SCHEDULE_SAFETY_FACTOR, SCHEDULE_MIN_LEAD_MINUTES, SCHEDULE_MAX_LEAD_MINUTES,
+    SCHEDULE_MAX_WAIT_MINUTES, SCHEDULE_CATCHUP_HOURS, SCHEDULER_STATE_PATH
 )
 
 # 导入主流程
-from main import run_job_agent_pipeline
+from main import run_job_agent_pipeline, pipeline_lock
+from storage.job_store import JobStore
+from scraping.state_store import ScraperStateStore
+from nlp.profiles import DEFAULT_PROFILE_NAME, load_profiles, profile_path
 
 def send_email(subject, body_html, to_email):
     """
@@ -100,14 +106,59 @@ def job_to_html(job):
     </tr>
     """
 
+def load_report_from_store(max_matched, max_other, profile_name=DEFAULT_PROFILE_NAME):
+    """
+    从职位库读取最近一次成功运行中某个画像的报告数据，只查询邮件中需要展示的行。
+    :param profile_name: 画像名称
+    :return: 报告字典；职位库未启用或没有成功的运行时返回None
+    """
+    if not JOB_STORE_PATH or not os.path.exists(JOB_STORE_PATH):
+        return None
+    store = JobStore(JOB_STORE_PATH)
+    try:
+        run = store.latest_run()
+        if not run:
+            return None
+        totals = store.count_results(run["run_id"], profile_name)
+        return {
+            "timestamp": datetime.fromtimestamp(run["started_at"]).isoformat(),
+            "summary": run["summary"] or "无总结信息。",
+            "matched_jobs": store.get_results(run["run_id"], "matched", limit=max_matched, profile=profile_name),
+            "other_jobs": store.get_results(run["run_id"], "other", limit=max_other, profile=profile_name),
+            "matched_total": totals.get("matched", 0),
+            "other_total": totals.get("other", 0),
+        }
+    finally:
+        store.close()
+
+def load_report_from_json(max_matched, max_other, path=MATCHED_JOBS_SUMMARY_PATH):
+    """读取JSON结果文件中的报告数据（未启用职位库时使用）。"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        report_data = json.load(f)
+    all_matched_jobs = report_data.get("matched_jobs", [])
+    all_other_jobs = report_data.get("other_jobs", [])
+    return {
+        "timestamp": report_data.get("timestamp", "未知时间"),
+        "summary": report_data.get("summary", "无总结信息。"),
+        "matched_jobs": all_matched_jobs[:max_matched],
+        "other_jobs": all_other_jobs[:max_other],
+        "matched_total": len(all_matched_jobs),
+        "other_total": len(all_other_jobs),
+    }
+
 def send_daily_job_report():
     """
-    定时任务：执行数据抓取和处理，然后读取匹配结果并发送邮件
+    立即执行数据抓取和处理，然后读取匹配结果并发送邮件（不做提前调度，供手动触发使用）。
     """
     print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== 定时任务触发：开始执行完整流程 ======")
     
     # 1. 执行数据抓取和处理流水线
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 1/3] 正在调用 main.py 的数据抓取和处理流水线...")
+    lock = pipeline_lock()
+    if not lock.acquire():
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 1/3] 错误：流水线正在运行（{lock.describe_holder()}）")
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== 定时任务因流水线正在运行而中止 ======")
+        return
     try:
         run_job_agent_pipeline()
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 1/3] 数据抓取和处理流水线执行成功。")
@@ -115,39 +166,65 @@ def send_daily_job_report():
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 1/3] 错误：数据抓取和处理流水线执行失败: {e}")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== 定时任务因流水线失败而中止 ======")
         return
+    finally:
+        lock.release()
 
-    # 2. 检查并读取新生成的匹配结果文件
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] 正在检查匹配结果文件: {MATCHED_JOBS_SUMMARY_PATH}...")
-    if not os.path.exists(MATCHED_JOBS_SUMMARY_PATH):
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] 错误：匹配结果文件未找到: {MATCHED_JOBS_SUMMARY_PATH}")
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== 定时任务因文件未找到而中止 ======")
-        return
+    send_all_reports()
 
-    try:
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] 成功找到文件，正在读取和解析JSON...")
-        with open(MATCHED_JOBS_SUMMARY_PATH, 'r', encoding='utf-8', errors='replace') as f:
-            report_data = json.load(f)
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] JSON文件解析成功。")
-    except Exception as e:
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] 错误：读取或解析匹配结果文件失败: {e}")
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== 定时任务因文件读取错误而中止 ======")
-        return
 
-    summary = report_data.get("summary", "无总结信息。")
-    all_matched_jobs = report_data.get("matched_jobs", [])
-    all_other_jobs = report_data.get("other_jobs", [])
-    timestamp = report_data.get("timestamp", "未知时间")
-    
-    # 新增：限制邮件中展示的职位数量
+def send_all_reports():
+    """按画像分别读取最近一次的匹配结果并发送报告：抓取和匹配只运行了一次，每位用户收到自己的结果。"""
+    profiles = load_profiles()
+    for profile in profiles:
+        send_profile_report(profile, len(profiles) > 1)
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== 定时任务流程执行完毕 ======")
+
+
+def send_profile_report(profile, multi):
+    """
+    读取某个画像的最近一次匹配结果并发送报告邮件。
+    :param profile: UserProfile，报告发往其邮箱（未配置时发往 RECIPIENT_EMAIL）
+    :param multi: 是否配置了多个画像（决定JSON结果文件的路径和邮件标题）
+    """
+    # 限制邮件中展示的职位数量
     max_matched_in_email = 60
     max_other_in_email = 60
-    matched_jobs_in_email = all_matched_jobs[:max_matched_in_email]
-    other_jobs_in_email = all_other_jobs[:max_other_in_email]
+    label = f"[画像 {profile.name}] " if multi else ""
+
+    # 读取匹配结果：优先查询职位库，未启用时读取JSON结果文件
+    report_data = None
+    try:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] {label}正在从职位库查询最近一次的匹配结果: {JOB_STORE_PATH}...")
+        report_data = load_report_from_store(max_matched_in_email, max_other_in_email, profile.name)
+    except Exception as e:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] 警告：查询职位库失败，改为读取JSON结果文件: {e}")
 
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] 数据摘要：核心匹配 {len(all_matched_jobs)} 个，其他关注 {len(all_other_jobs)} 个。")
+    if report_data is None:
+        summary_path = profile_path(MATCHED_JOBS_SUMMARY_PATH, profile, multi)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] {label}正在检查匹配结果文件: {summary_path}...")
+        if not os.path.exists(summary_path):
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] 错误：匹配结果文件未找到: {summary_path}")
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== {label}报告因文件未找到而中止 ======")
+            return
+        try:
+            report_data = load_report_from_json(max_matched_in_email, max_other_in_email, summary_path)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] JSON文件解析成功。")
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] 错误：读取或解析匹配结果文件失败: {e}")
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== {label}报告因文件读取错误而中止 ======")
+            return
+
+    summary = report_data["summary"]
+    timestamp = report_data["timestamp"]
+    matched_jobs_in_email = report_data["matched_jobs"]
+    other_jobs_in_email = report_data["other_jobs"]
+    matched_total = report_data["matched_total"]
+    other_total = report_data["other_total"]
+
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 2/3] {label}数据摘要：核心匹配 {matched_total} 个，其他关注 {other_total} 个。")
     print(f"    将在邮件中展示最多 {max_matched_in_email} 个核心匹配和 {max_other_in_email} 个其他关注职位。")
     
-    subject = f"您的每日职位匹配报告 - {datetime.now().strftime('%Y-%m-%d')}"
+    subject = f"您的每日职位匹配报告{f' ({profile.name})' if multi else ''} - {datetime.now().strftime('%Y-%m-%d')}"
 
     html_body = f"""
     <html>
@@ -159,7 +236,7 @@ def send_daily_job_report():
         <h3>市场汇总与分析</h3>
         <p>{summary.replace(chr(10), '<br>')}</p>
         
-        <h3>核心匹配职位 (展示前 {len(matched_jobs_in_email)}/{len(all_matched_jobs)} 个)</h3>
+        <h3>核心匹配职位 (展示前 {len(matched_jobs_in_email)}/{matched_total} 个)</h3>
     """
     
     if matched_jobs_in_email:
@@ -184,7 +261,7 @@ def send_daily_job_report():
     else:
         html_body += "<p>今日暂无核心匹配的职位。</p>"
 
-    html_body += f"<br><h3>其他值得关注职位 (展示前 {len(other_jobs_in_email)}/{len(all_other_jobs)} 个)</h3>"
+    html_body += f"<br><h3>其他值得关注职位 (展示前 {len(other_jobs_in_email)}/{other_total} 个)</h3>"
     if other_jobs_in_email:
         html_body += """
         <table style="width: 100%; border-collapse: collapse; margin-top: 20px;">
@@ -214,9 +291,196 @@ def send_daily_job_report():
     </html>
     """
 
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 3/3] 正在准备发送邮件...")
-    send_email(subject, html_body, RECIPIENT_EMAIL)
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== 定时任务流程执行完毕 ======")
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [步骤 3/3] {label}正在准备发送邮件...")
+    send_email(subject, html_body, profile.email or RECIPIENT_EMAIL)
+
+
+def parse_send_time(value):
+    """解析 "HH:MM" 或 "HH:MM:SS" 格式的发送时间。"""
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            return datetime.strptime(value.strip(), fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"无效的发送时间 '{value}'，应为 HH:MM 格式")
+
+
+def estimate_lead_seconds(durations):
+    """
+    按最近的运行耗时估算流水线需要提前多久启动（秒）：耗时的P90乘以安全系数，并限制在最小/最大提前量之间。
+    :param durations: 最近几次成功运行的耗时（秒）；为空时使用默认提前量
+    """
+    if not durations:
+        lead = SCHEDULE_DEFAULT_LEAD_MINUTES * 60
+    else:
+        ordered = sorted(durations)
+        p90 = ordered[max(0, math.ceil(0.9 * len(ordered)) - 1)]
+        lead = p90 * SCHEDULE_SAFETY_FACTOR
+    return min(max(lead, SCHEDULE_MIN_LEAD_MINUTES * 60), SCHEDULE_MAX_LEAD_MINUTES * 60)
+
+
+class PipelineWorker:
+    """
+    在后台线程中为某一天的报告运行一次完整流水线，调度循环不会被长时间的抓取和模型调用阻塞。
+    运行前获取流水线运行锁；锁被手动运行等占用时每隔几秒重试，直到对方结束。
+    """
+    def __init__(self, day, retry_seconds=10):
+        self.day = day
+        self.retry_seconds = retry_seconds
+        self.status = None
+        self.duration = None
+        self.done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='pipeline-worker', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        lock = pipeline_lock()
+        try:
+            if not lock.acquire():
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 流水线正在运行（{lock.describe_holder()}），等待其结束...")
+                while not lock.acquire():
+                    time.sleep(self.retry_seconds)
+            started = time.monotonic()
+            try:
+                run_job_agent_pipeline()
+                self.status = "ok"
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 后台流水线执行成功，用时 {time.monotonic() - started:.0f} 秒。")
+            except Exception as e:
+                self.status = "error"
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 错误：后台流水线执行失败: {e}")
+            finally:
+                self.duration = time.monotonic() - started
+                lock.release()
+        finally:
+            self.done.set()
+
+
+class DeadlineScheduler:
+    """
+    以发送时间为截止时间的每日报告调度器：
+    - 根据最近几次运行的耗时，提前在后台线程中启动流水线，到发送时间时报告已经生成，发送只需几秒；
+    - 到发送时间流水线仍未完成时最多再等 SCHEDULE_MAX_WAIT_MINUTES 分钟（补跑时从流水线启动时算起），
+      超时后发送最近一次已完成运行的结果；
+    - 已发送报告的日期和最近一次运行的结果保存在状态文件中，容器重启后在 SCHEDULE_CATCHUP_HOURS 内
+      补跑错过的报告（当天的流水线已经成功运行过时直接发送）。
+    """
+    STATE_NAMESPACE = "scheduler"
+    # 状态文件中保留的运行耗时条数
+    MAX_DURATIONS = 20
+
+    def __init__(self, send_time=None, state_path=None):
+        self.send_time = parse_send_time(send_time or EMAIL_SEND_TIME)
+        self.state = ScraperStateStore(state_path or SCHEDULER_STATE_PATH)
+        self.worker = None
+        self._worker_started_at = None
+        self._plan = None
+        self._notices = set()
+
+    def _get(self, key, default=None):
+        return self.state.get(self.STATE_NAMESPACE, key, default)
+
+    def _set(self, key, value):
+        self.state.set(self.STATE_NAMESPACE, key, value)
+        self.state.save()
+
+    def _notice(self, key, message):
+        """同一条提示只打印一次。"""
+        if key not in self._notices:
+            self._notices.add(key)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+
+    def recent_durations(self, limit=10):
+        """最近几次成功运行的耗时（秒）：优先取职位库的运行记录（包含手动运行），未启用时取调度器自己记录的耗时。"""
+        if JOB_STORE_PATH and os.path.exists(JOB_STORE_PATH):
+            try:
+                store = JobStore(JOB_STORE_PATH)
+                try:
+                    runs = store.list_runs(limit * 3)
+                finally:
+                    store.close()
+                durations = [run["finished_at"] - run["started_at"] for run in runs
+                             if run["status"] == "ok" and run["finished_at"]][:limit]
+                if durations:
+                    return durations
+            except Exception as e:
+                self._notice("store-error", f"读取职位库的运行记录失败，改用调度器记录的耗时: {e}")
+        return list(self._get("durations") or [])[:limit]
+
+    def deadline(self, day):
+        return datetime.combine(day, self.send_time)
+
+    def target_day(self, now):
+        """
+        下一份待发送报告的日期：今天的报告已发送、或错过发送时间超过补跑期限时为明天
+        （发送时间接近午夜时，明天报告的提前启动时间可能落在今天）。
+        """
+        today = now.date()
+        if self._get("last_report_day") == today.isoformat():
+            return today + timedelta(days=1)
+        overdue = now - self.deadline(today)
+        if overdue > timedelta(0) and (SCHEDULE_CATCHUP_HOURS <= 0 or overdue > timedelta(hours=SCHEDULE_CATCHUP_HOURS)):
+            self._notice(f"missed-{today}", f"已错过今天 {self.send_time.strftime('%H:%M')} 的发送时间超过补跑期限，今天不再发送。")
+            return today + timedelta(days=1)
+        return today
+
+    def plan(self, day):
+        """(流水线启动时间, 提前量秒数)；每天估算一次，使用截至当时的运行耗时。"""
+        if not self._plan or self._plan[0] != day:
+            lead = estimate_lead_seconds(self.recent_durations())
+            self._plan = (day, self.deadline(day) - timedelta(seconds=lead), lead)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {day} 的报告: 预计提前 {lead / 60:.0f} 分钟，"
+                  f"于 {self._plan[1].strftime('%Y-%m-%d %H:%M:%S')} 在后台启动流水线，"
+                  f"{self.deadline(day).strftime('%Y-%m-%d %H:%M:%S')} 发送。")
+        return self._plan[1], self._plan[2]
+
+    def _collect_worker(self):
+        """记录已结束的后台运行的结果和耗时。"""
+        worker, self.worker = self.worker, None
+        self._set("last_run", {"day": worker.day.isoformat(), "status": worker.status,
+                               "duration": worker.duration, "finished_at": time.time()})
+        if worker.status == "ok":
+            self._set("durations", ([worker.duration] + list(self._get("durations") or []))[:self.MAX_DURATIONS])
+
+    def tick(self, now=None):
+        """调度循环每次检查时调用：按需启动后台流水线、收集结果，到发送时间后发送报告。"""
+        now = now or datetime.now()
+        if self.worker and self.worker.done.is_set():
+            self._collect_worker()
+        day = self.target_day(now)
+        key = day.isoformat()
+        start_at, _ = self.plan(day)
+        last_run = self._get("last_run") or {}
+        ran = last_run.get("day") == key
+
+        if not ran and self.worker is None and now >= start_at:
+            if now > self.deadline(day):
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 补跑错过的 {key} 报告...")
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== 在后台启动 {key} 报告的流水线 ======")
+            self.worker = PipelineWorker(day).start()
+            self._worker_started_at = now
+            return
+
+        if now < self.deadline(day):
+            return
+        if self.worker is not None and self.worker.day == day:
+            # 补跑时流水线在发送时间之后才启动，等待时间从启动时算起
+            wait_from = max(self.deadline(day), self._worker_started_at or now)
+            if now < wait_from + timedelta(minutes=SCHEDULE_MAX_WAIT_MINUTES):
+                self._notice(f"waiting-{key}", "已到发送时间，流水线尚未完成，等待其结束后发送...")
+                return
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 警告：等待超过 {SCHEDULE_MAX_WAIT_MINUTES:.0f} 分钟，"
+                  f"发送最近一次已完成运行的结果。")
+        elif ran and last_run.get("status") != "ok":
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== {key} 的流水线执行失败，本次不发送报告 ======")
+            self._set("last_report_day", key)
+            return
+
+        print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ====== 发送 {key} 的报告 ======")
+        send_all_reports()
+        self._set("last_report_day", key)
 
 
 def main_scheduler_loop():
@@ -228,18 +492,15 @@ def main_scheduler_loop():
     print("按 Ctrl+C 退出。")
     print("调度器正在等待下一个执行周期...")
 
-    # 安排每天的任务
-    schedule.every().day.at(EMAIL_SEND_TIME).do(send_daily_job_report)
+    scheduler = DeadlineScheduler()
 
     try:
         while True:
-            # 在每次检查前打印当前时间，方便调试
-            # print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 调度器心跳: 检查待执行任务...", end='\\r') # \\r 会覆盖上一行，比较整洁
-            schedule.run_pending()
+            scheduler.tick()
             time.sleep(1) # 每秒检查一次
     except KeyboardInterrupt:
-        print("\\n定时任务调度器已停止。")
+        print("\n定时任务调度器已停止。")
         sys.exit(0)
 
 if __name__ == "__main__":
-    main_scheduler_loop()
\ No newline at end of file
+    main_scheduler_loop()
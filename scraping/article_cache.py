@@ -0,0 +1,117 @@
+# scraping/article_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class ArticleCache:
+    """
+    文章正文的本地持久化缓存（SQLite）。
+    以URL的SHA-256作为键，保存已经提取、清洗好的正文文本（zlib压缩），
+    命中时可以同时跳过网络请求和HTML解析。
+    支持按存活时间(TTL)过期，以及按总大小上限做LRU淘汰。
+    """
+    def __init__(self, path, max_bytes=200 * 1024 * 1024, ttl_seconds=30 * 24 * 3600):
+        """
+        :param path: SQLite数据库文件路径
+        :param max_bytes: 缓存中压缩后正文的总大小上限（字节）
+        :param ttl_seconds: 条目的最长存活时间（秒），<=0 表示不过期
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_last_access ON articles(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_created_at ON articles(created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def get(self, url):
+        """
+        读取缓存的正文文本。
+        :return: 正文字符串；未命中或已过期时返回None
+        """
+        key = self._key(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, created_at FROM articles WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE articles SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, url, text):
+        """写入（或覆盖）一篇文章的正文文本。"""
+        body = zlib.compress(text.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles (key, url, body, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(url), url, body, len(body), now, now)
+            )
+            self._conn.commit()
+
+    def prune(self):
+        """
+        清理过期条目，并在总大小超过上限时按最近访问时间淘汰最旧的条目。
+        :return: 被删除的条目数
+        """
+        removed = 0
+        with self._lock:
+            if self.ttl_seconds > 0:
+                cursor = self._conn.execute(
+                    "DELETE FROM articles WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                )
+                removed += cursor.rowcount
+
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+            if self.max_bytes and total > self.max_bytes:
+                stale_keys = []
+                for key, size in self._conn.execute("SELECT key, size FROM articles ORDER BY last_access ASC"):
+                    if total <= self.max_bytes:
+                        break
+                    stale_keys.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM articles WHERE key = ?", stale_keys)
+                removed += len(stale_keys)
+            self._conn.commit()
+        return removed
+
+    def stats_line(self):
+        """返回用于日志输出的命中统计。"""
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        return f"文章缓存命中 {self.hits} 次，未命中 {self.misses} 次，命中率 {hit_rate:.1f}%"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,6 +1,9 @@
 # scraping/base_scraper.py
+import time
 import requests
-from config import HEADERS
+from config import HEADERS, JOB_SEARCH_KEYWORD
+from metrics import get_metrics
+from scraping.capture import get_capture, request_key, CaptureMiss
 
 class BaseScraper:
     """
@@ -18,12 +21,29 @@ class BaseScraper:
         :param params: 请求参数
         :return: 页面的文本内容，如果失败则返回None
         """
+        capture = get_capture()
+        if capture and capture.replaying:
+            try:
+                response = capture.load_response('page', request_key(url, params), url)
+            except CaptureMiss as e:
+                print(e)
+                return None
+            response.encoding = response.apparent_encoding
+            return response
+
+        component = getattr(self, 'source_key', None) or type(self).__name__
+        started = time.perf_counter()
         try:
             response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
             response.encoding = response.apparent_encoding
+            get_metrics().record_request(component, time.perf_counter() - started, len(response.content))
+            if capture:
+                capture.record('page', request_key(url, params), response.content, response.status_code,
+                               {'Content-Type': response.headers.get('Content-Type', '')})
             return response
         except requests.RequestException as e:
+            get_metrics().record_request(component, time.perf_counter() - started, ok=False)
             print(f"Error fetching {url}: {e}")
             return None
 
@@ -32,4 +52,13 @@ class BaseScraper:
         具体的抓取逻辑。子类必须重写此方法。
         :param keyword: 用户输入的搜索关键字
         """
-        raise NotImplementedError("每个爬虫子类都必须实现scrape方法！")
\ No newline at end of file
+        raise NotImplementedError("每个爬虫子类都必须实现scrape方法！")
+
+    def fetch_jobs(self, emit):
+        """
+        数据源的统一入口，由流水线调用。抓取职位并通过 emit(职位列表) 交出，可多次调用以分批交出。
+        默认以配置的搜索关键字调用 scrape() 并一次性交出；支持分页的子类可以重写为逐页交出。
+        数据源超时被放弃后 emit 会抛出 scraping.registry.SourceCancelled，水位线等增量抓取状态
+        应在最后一次 emit 之后再保存，这样被放弃的数据源不会跳过未交出的职位。
+        """
+        emit(self.scrape(keyword=JOB_SEARCH_KEYWORD))
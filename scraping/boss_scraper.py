@@ -1,10 +1,14 @@
 # scraping/boss_scraper.py
 from scraping.base_scraper import BaseScraper
+from scraping.registry import register_source
 
+@register_source('boss')
 class BossScraper(BaseScraper):
     """
     针对BOSS直聘的具体爬虫实现。
     """
+    display_name = "BOSS直聘"
+
     def __init__(self):
         # BOSS直聘的URL需要后续确定
         super().__init__(base_url="https://www.zhipin.com")
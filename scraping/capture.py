@@ -0,0 +1,254 @@
+# scraping/capture.py
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import requests
+
+from config import CAPTURE_MODE, CAPTURE_DIR, CAPTURE_RUN_ID, CAPTURE_KEEP_RUNS
+
+ARCHIVE_SUFFIX = '.sqlite3'
+# 记录模式下每积累多少条响应提交一次事务
+_COMMIT_EVERY = 100
+
+
+class CaptureMiss(Exception):
+    """回放存档中没有对应的响应。"""
+
+
+def request_key(url, params=None):
+    """由URL和查询参数生成存档键，参数按名称排序，保证同一请求得到相同的键。"""
+    if not params:
+        return url
+    return f"{url} {json.dumps(params, ensure_ascii=False, sort_keys=True)}"
+
+
+def build_response(url, status_code, headers, body):
+    """用存档内容构造一个 requests.Response，供原本处理网络响应的代码直接使用。"""
+    response = requests.models.Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+class CaptureArchive:
+    """
+    单次运行的原始响应存档（SQLite，正文zlib压缩，按 (类型, 键) 建主键索引）。
+    记录模式下保存爬虫拿到的每一个原始响应；回放模式下按相同的键读出，整条流水线不发出任何抓取请求，
+    修改解析逻辑或Prompt后可以在几秒内用同一批数据重跑。
+    类型: page（BaseScraper.fetch_page）、firecrawl（Firecrawl抓取结果）、rss（RSS源原文）、
+    article（公众号文章HTML）、api（其他API数据源）。
+    存档同时记下记录开始的时间，回放时爬虫以它作为"当前时间"（如24小时窗口、回溯期限），
+    否则日后回放时这些按时间过滤的职位会被全部滤掉。
+    """
+    def __init__(self, path, mode):
+        """
+        :param path: 存档文件路径
+        :param mode: "record" 或 "replay"
+        """
+        self.path = path
+        self.mode = mode
+        self.replaying = mode == 'replay'
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        if self.replaying and not os.path.exists(path):
+            raise FileNotFoundError(f"回放存档不存在: {path}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                captured_at REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if not self.replaying:
+            self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('started_at', ?)", (repr(time.time()),))
+        self._conn.commit()
+        self.started_at = self._load_started_at()
+
+    def _load_started_at(self):
+        """记录开始的时间戳；早期没有 meta 表的存档取最早一个响应的记录时间，空存档返回None。"""
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'started_at'").fetchone()
+        if row:
+            return float(row[0])
+        row = self._conn.execute("SELECT MIN(captured_at) FROM responses").fetchone()
+        return row[0] if row else None
+
+    def record(self, kind, key, body, status_code=200, headers=None):
+        """
+        保存一个原始响应（同一请求多次出现时保留最后一次）。
+        :param body: 响应正文（bytes 或 str）
+        :param headers: 需要保留的响应头，如 Content-Type
+        """
+        if self.replaying:
+            return
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        body = body or b''
+        compressed = zlib.compress(body, 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (kind, key, status, headers, body, size, captured_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, status_code, json.dumps(dict(headers or {}), ensure_ascii=False),
+                 compressed, len(body), time.time())
+            )
+            self.recorded += 1
+            self.raw_bytes += len(body)
+            self.stored_bytes += len(compressed)
+            self._pending += 1
+            if self._pending >= _COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+
+    def load(self, kind, key):
+        """
+        读出存档中的响应。
+        :return: (状态码, 响应头字典, 正文bytes)
+        :raises CaptureMiss: 存档中没有该请求
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body FROM responses WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                raise CaptureMiss(f"回放存档中没有该请求: [{kind}] {key}")
+            self.hits += 1
+        status, headers, body = row
+        return status, json.loads(headers), zlib.decompress(body)
+
+    def load_response(self, kind, key, url):
+        """读出存档中的响应并构造为 requests.Response。"""
+        status, headers, body = self.load(kind, key)
+        return build_response(url, status, headers, body)
+
+    def keys(self, kind):
+        """返回存档中某一类型的全部键（供基准测试等离线工具遍历记录的页面）。"""
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM responses WHERE kind = ? ORDER BY key", (kind,)).fetchall()
+        return [row[0] for row in rows]
+
+    def stats_line(self):
+        if self.replaying:
+            return f"回放存档 {os.path.basename(self.path)}: 命中 {self.hits} 个请求，缺失 {self.misses} 个"
+        ratio = self.stored_bytes / self.raw_bytes if self.raw_bytes else 0.0
+        return (f"抓取存档 {self.path}: 记录 {self.recorded} 个响应，原始 {self.raw_bytes / 1024 / 1024:.1f} MB，"
+                f"压缩后 {self.stored_bytes / 1024 / 1024:.1f} MB ({ratio:.0%})")
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+def list_archives(capture_dir=None):
+    """按时间顺序返回存档目录中的所有存档路径（运行编号即文件名，按时间戳命名时可直接排序）。"""
+    pattern = os.path.join(capture_dir or CAPTURE_DIR, f"*{ARCHIVE_SUFFIX}")
+    return sorted(glob.glob(pattern))
+
+
+def prune_archives(keep, capture_dir=None):
+    """只保留最近的 keep 个存档，返回删除的个数；keep<=0 表示不清理。"""
+    if keep <= 0:
+        return 0
+    archives = list_archives(capture_dir)
+    removed = 0
+    for path in archives[:-keep]:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        removed += 1
+    return removed
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def open_capture(mode=None, run_id=None, capture_dir=None):
+    """
+    按配置打开本次运行的存档：记录模式下新建以时间戳命名的存档，回放模式下打开指定（默认最新）的存档。
+    未启用时返回None。打开后，各爬虫通过 get_capture() 取得同一个存档。
+    """
+    global _archive
+    mode = (mode or CAPTURE_MODE or 'off').strip().lower()
+    capture_dir = capture_dir or CAPTURE_DIR
+    run_id = run_id if run_id is not None else CAPTURE_RUN_ID
+    if mode not in ('record', 'replay'):
+        return None
+
+    if mode == 'record':
+        path = os.path.join(capture_dir, f"{run_id or time.strftime('%Y%m%d-%H%M%S')}{ARCHIVE_SUFFIX}")
+    elif run_id:
+        path = os.path.join(capture_dir, f"{run_id}{ARCHIVE_SUFFIX}")
+    else:
+        archives = list_archives(capture_dir)
+        if not archives:
+            raise FileNotFoundError(f"存档目录 {capture_dir} 中没有可回放的存档")
+        path = archives[-1]
+
+    archive = CaptureArchive(path, mode)
+    with _archive_lock:
+        _archive = archive
+    return archive
+
+
+def close_capture():
+    """关闭当前存档并打印统计；记录模式下按 CAPTURE_KEEP_RUNS 清理旧存档。"""
+    global _archive
+    with _archive_lock:
+        archive, _archive = _archive, None
+    if not archive:
+        return
+    print(archive.stats_line())
+    archive.close()
+    if not archive.replaying:
+        removed = prune_archives(CAPTURE_KEEP_RUNS, os.path.dirname(archive.path))
+        if removed:
+            print(f"清理了 {removed} 个旧的抓取存档。")
+
+
+def get_capture():
+    """返回当前运行的存档；未启用记录/回放时返回None。"""
+    return _archive
+
+
+def is_replaying():
+    return _archive is not None and _archive.replaying
+
+
+def capture_now(tz=None):
+    """
+    爬虫眼中的"当前时间"：回放时为存档记录开始的时间，其余情况为真实的当前时间。
+    :param tz: 时区，为None时返回本地时间的naive datetime（与 datetime.now() 相同）
+    """
+    archive = _archive
+    if archive is not None and archive.replaying and archive.started_at is not None:
+        return datetime.fromtimestamp(archive.started_at, tz)
+    return datetime.now(tz)
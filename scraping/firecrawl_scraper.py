@@ -1,18 +1,102 @@
 # scraping/firecrawl_scraper.py
 import json
-import os
-import subprocess
-from config import FIRECRAWL_API_KEY
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (
+    FIRECRAWL_API_KEY, FIRECRAWL_API_URL, FIRECRAWL_CONNECT_TIMEOUT, FIRECRAWL_READ_TIMEOUT,
+    FIRECRAWL_MAX_RETRIES, FIRECRAWL_POOL_SIZE
+)
+from metrics import get_metrics
+from scraping.capture import get_capture, CaptureMiss
+
+class _ScrapeRetry(Retry):
+    """
+    抓取接口的重试策略：GET 遇到 429 和 5xx 都重试；POST 提交的抓取任务按次计费，
+    5xx 或读取超时时服务端可能已经在处理，只在明确被限流（429）时重试。
+    建立连接失败（请求尚未发出）时两者都会重试。
+    """
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method and method.upper() == 'POST':
+            return status_code == 429 and bool(self.total)
+        return super().is_retry(method, status_code, has_retry_after)
+
 
 class FirecrawlScraper:
     """
     使用 Firecrawl API 来抓取需要JavaScript渲染的网站。
+    所有请求复用同一个 requests.Session（长连接池 + gzip + 自动重试），
+    不再为每个URL单独启动 curl 进程。
     """
-    def __init__(self):
-        if not FIRECRAWL_API_KEY:
+    def __init__(self, api_key=None, api_url=None, timeout=None, max_retries=None, pool_size=None):
+        """
+        :param api_key: Firecrawl API密钥，默认读取 FIRECRAWL_API_KEY
+        :param api_url: API根地址，默认读取 FIRECRAWL_API_URL，可指向本地的替身服务用于测试
+        :param timeout: (连接超时, 读取超时) 秒数
+        :param max_retries: 遇到连接错误、429和5xx时的最大重试次数（POST只在429时重试）
+        :param pool_size: 连接池大小，决定可以同时复用的长连接数量
+        """
+        self.api_key = api_key or FIRECRAWL_API_KEY
+        if not self.api_key:
             raise ValueError("FIRECRAWL_API_KEY 未在环境变量中设置。")
-        self.api_key = FIRECRAWL_API_KEY
-        self.api_url = "https://api.firecrawl.dev/v1/scrape" # Updated to v1
+        self.api_base_url = (api_url or FIRECRAWL_API_URL).rstrip('/')
+        self.api_url = f"{self.api_base_url}/scrape"
+        self.batch_api_url = f"{self.api_base_url}/batch/scrape"
+        self.timeout = timeout or (FIRECRAWL_CONNECT_TIMEOUT, FIRECRAWL_READ_TIMEOUT)
+
+        retries = FIRECRAWL_MAX_RETRIES if max_retries is None else max_retries
+        pool_size = pool_size or FIRECRAWL_POOL_SIZE
+        retry = _ScrapeRetry(
+            total=retries,
+            backoff_factor=1,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+
+    @staticmethod
+    def _scrape_options():
+        return {
+            "parsePDF": False,
+            "onlyMainContent": True
+        }
+
+    def _request_json(self, method, url, payload=None):
+        """发送请求并解析JSON响应，失败时打印原因并返回None。"""
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, json=payload, timeout=self.timeout)
+            get_metrics().record_request(
+                'firecrawl', time.perf_counter() - started, len(response.content), ok=response.status_code < 400
+            )
+            if response.status_code >= 400:
+                print(f"Firecrawl API 调用失败。HTTP状态码: {response.status_code}")
+                print(f"响应内容: {response.text[:500]}")
+                return None
+            if not response.content:
+                print("Firecrawl API 调用成功，但未返回任何内容。")
+                return None
+            return response.json()
+        except ValueError as e:
+            print(f"解析Firecrawl API响应失败: {e}")
+            return None
+        except requests.RequestException as e:
+            get_metrics().record_request('firecrawl', time.perf_counter() - started, ok=False)
+            print(f"Firecrawl API 请求出错: {e}")
+            return None
 
     def scrape(self, url):
         """
@@ -20,53 +104,108 @@ class FirecrawlScraper:
         :param url: 要抓取的URL
         :return: 抓取到的数据 (JSON格式)
         """
+        capture = get_capture()
+        if capture and capture.replaying:
+            try:
+                return json.loads(capture.load('firecrawl', url)[2])
+            except CaptureMiss as e:
+                print(e)
+                return None
+
         print(f"开始使用 Firecrawl 抓取URL: {url}...")
+        payload = {"url": url, **self._scrape_options()}
+        result = self._request_json('POST', self.api_url, payload)
+        # 只保存有效的结果，失败的请求在回放时同样表现为失败
+        if capture and result is not None:
+            capture.record('firecrawl', url, json.dumps(result, ensure_ascii=False))
+        return result
 
-        # Payload structure updated based on user feedback and v1 API
-        payload = {
-            "url": url,
-            "parsePDF": False, 
-            "onlyMainContent": True # Changed to False to get the full page content
-        }
-        payload_str = json.dumps(payload)
+    def batch_scrape(self, urls, poll_interval=2, max_wait=600):
+        """
+        使用 Firecrawl 的批量抓取接口一次提交多个URL，并轮询直到全部完成。
+        :param urls: 要抓取的URL列表
+        :param poll_interval: 轮询间隔（秒）
+        :param max_wait: 最长等待时间（秒），超时后返回已完成的部分
+        :return: 与 urls 一一对应的结果列表，每项与 scrape() 的返回格式一致 ({"data": {...}})，失败的项为None
+        """
+        if not urls:
+            return []
 
-        # 构建curl命令
-        command = [
-            'curl', '-s', '-X', 'POST', self.api_url,
-            '-H', f'Authorization: Bearer {self.api_key}',
-            '-H', 'Content-Type: application/json',
-            '-d', payload_str
-        ]
+        capture = get_capture()
+        if capture and capture.replaying:
+            # 录制时按URL逐条保存，回放时与单页抓取共用同一份记录
+            return [self.scrape(url) for url in urls]
 
-        print("正在执行 Firecrawl API 调用...")
-        try:
-            # 使用subprocess执行命令，并指定UTF-8编码
-            result = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8')
-            stdout = result.stdout
-            
-            if not stdout:
-                print("Firecrawl API 调用成功，但未返回任何内容。")
-                return None
+        print(f"开始使用 Firecrawl 批量抓取 {len(urls)} 个URL...")
+        payload = {"urls": list(urls), **self._scrape_options()}
+        job = self._request_json('POST', self.batch_api_url, payload)
+        if not job or not job.get("id"):
+            print("Firecrawl 批量抓取任务提交失败。")
+            return [None] * len(urls)
 
-            return json.loads(stdout)
-        except subprocess.CalledProcessError as e:
-            print(f"Firecrawl API 调用失败。退出码: {e.returncode}")
-            print(f"Stderr: {e.stderr}")
-            return None
-        except json.JSONDecodeError as e:
-            print(f"解析Firecrawl API响应失败: {e}")
-            print(f"收到的原始输出: {stdout}")
-            return None
-        except Exception as e:
-            print(f"执行curl命令时发生未知错误: {e}")
-            return None
+        status_url = f"{self.batch_api_url}/{job['id']}"
+        deadline = time.monotonic() + max_wait
+        documents = []
+        while True:
+            status = self._request_json('GET', status_url)
+            if status is None:
+                break
+            state = status.get("status")
+            if state == "completed":
+                documents = self._collect_pages(status)
+                break
+            if state == "failed":
+                print("Firecrawl 批量抓取任务失败。")
+                break
+            if time.monotonic() >= deadline:
+                print(f"Firecrawl 批量抓取等待超时 ({max_wait}秒)，仅返回已完成的部分。")
+                documents = status.get("data") or []
+                break
+            print(f"  批量抓取进行中: {status.get('completed', 0)}/{status.get('total', len(urls))}")
+            time.sleep(poll_interval)
+
+        results = self._align_documents(urls, documents)
+        if capture:
+            for url, result in zip(urls, results):
+                if result is not None:
+                    capture.record('firecrawl', url, json.dumps(result, ensure_ascii=False))
+        return results
+
+    def _collect_pages(self, status):
+        """批量结果较大时会分页返回（next字段），这里顺序拉取所有分页。"""
+        documents = list(status.get("data") or [])
+        next_url = status.get("next")
+        while next_url:
+            page = self._request_json('GET', next_url)
+            if not page:
+                break
+            documents.extend(page.get("data") or [])
+            next_url = page.get("next")
+        return documents
+
+    @staticmethod
+    def _align_documents(urls, documents):
+        """按提交顺序对齐批量结果；若返回结果都不带sourceURL，则按返回顺序对应。"""
+        results = [None] * len(urls)
+        index_by_url = {url: i for i, url in enumerate(urls)}
+        matched = False
+        for document in documents:
+            metadata = document.get("metadata") or {}
+            i = index_by_url.get(metadata.get("sourceURL") or metadata.get("url"))
+            if i is not None:
+                results[i] = {"success": True, "data": document}
+                matched = True
+        if not matched:
+            for i, document in enumerate(documents[:len(urls)]):
+                results[i] = {"success": True, "data": document}
+        return results
 
 # 用于独立测试
 if __name__ == '__main__':
     test_url = "https://www.zhaopin.com/sou/jl489/kwJ3FL9G8042CMSPCP00G9J6BCN4020NF5G9T0/p1"
     scraper = FirecrawlScraper()
     scraped_data = scraper.scrape(test_url)
-    
+
     if scraped_data:
         print("\nFirecrawl API 抓取成功！")
         if scraped_data.get("data") and scraped_data["data"].get("markdown"):
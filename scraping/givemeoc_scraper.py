@@ -1,99 +1,118 @@
 # scraping/givemeoc_scraper.py
-from bs4 import BeautifulSoup
 from scraping.base_scraper import BaseScraper
-from config import GIVE_ME_OC_URL
-import time
-import urllib.parse
+from scraping.html_extract import extract_element, element_text, find_by_class
+from scraping.registry import register_source
+from scraping.state_store import get_state_store
+from scraping.capture import get_capture, capture_now
+from config import (
+    GIVE_ME_OC_URL, GIVE_ME_OC_PAGE_URL, GIVE_ME_OC_MAX_PAGES, GIVE_ME_OC_LOOKBACK_DAYS, SCRAPER_STATE_PATH
+)
 from datetime import datetime, timedelta
 
+@register_source('givemeoc')
 class GiveMeOcScraper(BaseScraper):
     """
     针对 givemeoc.com 的具体爬虫实现。
+    未配置 GIVE_ME_OC_PAGE_URL 时只抓取首页；配置后按更新时间倒序逐页抓取，
+    并以水位线（已抓到的最新更新日期及该日期下的职位ID）实现增量抓取。
     """
+    display_name = "GiveMeOC"
+    # 在 ScraperStateStore 中保存水位线所用的命名空间
+    STATE_NAMESPACE = "givemeoc"
+
     def __init__(self):
         super().__init__(GIVE_ME_OC_URL)
 
-    def scrape(self, keyword=None, max_pages=1):
+    def fetch_jobs(self, emit):
+        """分页模式下每抓完一页就交出该页的新职位，下游无需等整个列表翻完。"""
+        if GIVE_ME_OC_PAGE_URL:
+            self.crawl_pages(GIVE_ME_OC_MAX_PAGES, emit)
+        else:
+            emit(self.scrape())
+
+    def scrape(self, keyword=None, max_pages=None):
         """
-        从 givemeoc.com 的校招首页抓取数据。
-        注意：此方法现在忽略keyword和max_pages，直接抓取首页列表。
+        从 givemeoc.com 抓取数据（keyword 被忽略，网站不支持搜索）。
+        :param max_pages: 分页模式下最多抓取的页数，默认 GIVE_ME_OC_MAX_PAGES
         """
+        if GIVE_ME_OC_PAGE_URL:
+            jobs = []
+            self.crawl_pages(max_pages or GIVE_ME_OC_MAX_PAGES, jobs.extend)
+            return jobs
+
         print("开始从 givemeoc.com 校招首页抓取数据...")
-        jobs = []
-        
-        # 直接访问首页，不再进行分页或搜索
+
+        # 直接访问首页，不进行分页或搜索
         target_url = self.base_url
         print(f"正在抓取页面: {target_url}")
-        
+
         response = self.fetch_page(target_url)
         if not response:
             print("无法获取页面内容，停止抓取。")
-            return jobs
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 找到主要的容器
-        crt_container = soup.find('div', class_='crt-container')
-        if not crt_container:
-            print("警告: 未找到 'crt-container'，页面结构可能已改变。")
-            return jobs
+            return []
 
-        # 在容器内查找所有职位行
-        job_rows = crt_container.select('table tbody tr[data-id]')
+        jobs = self.parse_page(response.text)
+        print(f"从 givemeoc.com 共抓取到 {len(jobs)} 个职位。")
+        return jobs
 
-        if not job_rows:
-            print("警告: 在页面中未找到任何职位行。")
-            return jobs
-            
-        print(f"找到 {len(job_rows)} 个职位信息，开始解析并过滤近半个月的职位...")
+    @staticmethod
+    def _lookback_cutoff():
+        if GIVE_ME_OC_LOOKBACK_DAYS <= 0:
+            return None
+        return capture_now() - timedelta(days=GIVE_ME_OC_LOOKBACK_DAYS)
 
-        # 计算半个月前的日期
-        half_month_ago = datetime.now() - timedelta(days=15)
-        filtered_jobs_count = 0
+    @staticmethod
+    def parse_rows(page_html):
+        """
+        解析页面中的全部职位行（按页面顺序），跳过没有确切更新日期（如 "招满为止"）的行。
+        :param page_html: 页面HTML
+        :return: [(data_id, 更新日期datetime, 职位字典)]；找不到职位表格时返回None
+        """
+        # 只解析主要的容器，页头、导航等其余部分不建树
+        crt_container = extract_element(page_html, 'div', class_name='crt-container')
+        if crt_container is None:
+            print("警告: 未找到 'crt-container'，页面结构可能已改变。")
+            return None
 
-        for row in job_rows:
+        # 在容器内查找所有职位行
+        rows = []
+        for row in crt_container.xpath('.//table//tbody//tr[@data-id]'):
             try:
                 # 提取更新时间
-                update_time_element = row.select_one('td.crt-col-update-time')
-                if not update_time_element:
+                update_time_element = find_by_class(row, 'td', 'crt-col-update-time')
+                if update_time_element is None:
                     continue # 如果没有更新时间，跳过此条目
-                
-                update_time_str = update_time_element.get_text(strip=True)
-                # 将字符串 "YYYY-MM-DD" 转换为 datetime 对象
-                # 处理 "招满为止" 这种特殊情况
+
+                update_time_str = element_text(update_time_element, strip=True)
+                # 处理 "招满为止" 这种特殊情况：它没有一个确切的更新日期，跳过
                 if update_time_str == "招满为止":
-                    # 可以选择跳过，或者将其视为一个很新的日期
-                    # 这里我们选择跳过，因为它没有一个确切的更新日期
-                    continue 
+                    continue
+                # 将字符串 "YYYY-MM-DD" 转换为 datetime 对象
                 update_date = datetime.strptime(update_time_str, '%Y-%m-%d')
 
-                # 判断日期是否在近半个月内
-                if update_date < half_month_ago:
-                    continue # 如果日期早于半个月前，跳过此条目
-
-                # 如果通过了日期过滤，则继续提取其他信息
-                filtered_jobs_count += 1
-                
-                company = row.select_one('td.crt-col-company').get_text(strip=True)
-                location = row.select_one('td.crt-col-location').get_text(strip=True)
-                
-                position_element = row.select_one('td.crt-col-position .crt-position-tag')
-                position = position_element.get_text(strip=True) if position_element else 'N/A'
-                
+                company = element_text(find_by_class(row, 'td', 'crt-col-company'), strip=True)
+                location = element_text(find_by_class(row, 'td', 'crt-col-location'), strip=True)
+
+                position_element = find_by_class(find_by_class(row, 'td', 'crt-col-position'), '*', 'crt-position-tag')
+                position = element_text(position_element, strip=True) if position_element is not None else 'N/A'
+
                 # 优先使用投递链接，如果没有则使用公告链接
-                apply_link_element = row.select_one('td.crt-col-links a.crt-link')
-                notice_link_element = row.select_one('td.crt-col-notice a.crt-notice-link')
-                
-                url = apply_link_element['href'] if apply_link_element else \
-                      (notice_link_element['href'] if notice_link_element else 'N/A')
+                apply_link_element = find_by_class(find_by_class(row, 'td', 'crt-col-links'), 'a', 'crt-link')
+                notice_link_element = find_by_class(find_by_class(row, 'td', 'crt-col-notice'), 'a', 'crt-notice-link')
+
+                url = apply_link_element.get('href') if apply_link_element is not None else \
+                      (notice_link_element.get('href') if notice_link_element is not None else 'N/A')
 
                 # 构造职位标题
                 title = f"{company} - {position}" if position != 'N/A' else company
-                
+
                 # 构造描述，可以包含更多上下文信息
-                recruitment_type_element = row.select_one('td.crt-col-recruitment-type .crt-badge')
-                recruitment_type = recruitment_type_element.get_text(strip=True) if recruitment_type_element else 'N/A'
-                
+                recruitment_type_element = find_by_class(
+                    find_by_class(row, 'td', 'crt-col-recruitment-type'), '*', 'crt-badge'
+                )
+                recruitment_type = element_text(recruitment_type_element, strip=True) \
+                    if recruitment_type_element is not None else 'N/A'
+
                 description = f"招聘类型: {recruitment_type} | 工作地点: {location} | 更新时间: {update_time_str}"
 
                 job_data = {
@@ -104,7 +123,7 @@ class GiveMeOcScraper(BaseScraper):
                     'url': url,
                     'source': 'givemeoc.com'
                 }
-                jobs.append(job_data)
+                rows.append((row.get('data-id'), update_date, job_data))
             except ValueError as ve:
                 # 日期解析失败
                 print(f"日期解析错误，跳过此条目: {ve}")
@@ -112,8 +131,96 @@ class GiveMeOcScraper(BaseScraper):
             except Exception as e:
                 print(f"解析职位行时出错: {e}")
                 continue
-        
-        print(f"经过日期过滤，从 {len(job_rows)} 个职位中筛选出 {len(jobs)} 个近半个月内的职位。")
+        return rows
 
-        print(f"从 givemeoc.com 共抓取到 {len(jobs)} 个职位。")
-        return jobs
\ No newline at end of file
+    @classmethod
+    def parse_page(cls, page_html):
+        """
+        解析校招首页HTML，返回近 GIVE_ME_OC_LOOKBACK_DAYS 天内更新的职位列表。
+        :param page_html: 页面HTML
+        """
+        rows = cls.parse_rows(page_html)
+        if rows is None:
+            return []
+        if not rows:
+            print("警告: 在页面中未找到任何职位行。")
+            return []
+
+        cutoff = cls._lookback_cutoff()
+        jobs = [job for _, update_date, job in rows if cutoff is None or update_date >= cutoff]
+        print(f"经过日期过滤，从 {len(rows)} 个职位中筛选出 {len(jobs)} 个近期更新的职位。")
+        return jobs
+
+    def crawl_pages(self, max_pages, emit):
+        """
+        按更新时间倒序逐页抓取，遇到不晚于水位线（或早于回溯期限）的职位后停止翻页。
+        首次运行没有水位线，会一直翻到回溯期限或最后一页。
+        :param max_pages: 最多抓取的页数
+        :param emit: 回调函数，每页调用一次，参数为该页的新职位列表
+        """
+        # 记录/回放时不使用水位线，保证每次都完整抓取同样的页面
+        state_store = None if get_capture() else get_state_store(SCRAPER_STATE_PATH)
+        watermark = (state_store.get(self.STATE_NAMESPACE, self.base_url) if state_store else None) or {}
+        mark_date = watermark.get('update_date')
+        mark_ids = set(watermark.get('ids') or [])
+        cutoff = self._lookback_cutoff()
+        print(f"开始分页抓取 givemeoc.com (最多 {max_pages} 页，水位线: {mark_date or '无'})...")
+
+        newest_date, newest_ids = mark_date, set(mark_ids)
+        seen_ids = set()
+        total = 0
+        # 只有连续翻到水位线、回溯期限或列表末尾才推进水位线；中途失败或达到页数上限时，
+        # 未翻到的职位比本次最新的职位旧，推进水位线会让下次运行跳过它们
+        complete = False
+        for page in range(1, max_pages + 1):
+            page_url = GIVE_ME_OC_PAGE_URL.format(page=page)
+            response = self.fetch_page(page_url)
+            if not response:
+                print(f"无法获取第 {page} 页，停止翻页。")
+                break
+            rows = self.parse_rows(response.text)
+            if rows is None:
+                break
+            if not rows:
+                print(f"第 {page} 页没有职位，已到达列表末尾。")
+                complete = True
+                break
+
+            page_jobs = []
+            reached_mark = False
+            for data_id, update_date, job in rows:
+                date_str = update_date.strftime('%Y-%m-%d')
+                if mark_date and (date_str < mark_date or (date_str == mark_date and data_id in mark_ids)):
+                    reached_mark = True
+                    continue
+                if cutoff is not None and update_date < cutoff:
+                    reached_mark = True
+                    continue
+                # 翻页期间列表有更新时，同一职位可能出现在相邻两页
+                if data_id in seen_ids:
+                    continue
+                seen_ids.add(data_id)
+                page_jobs.append(job)
+                if newest_date is None or date_str > newest_date:
+                    newest_date, newest_ids = date_str, {data_id}
+                elif date_str == newest_date:
+                    newest_ids.add(data_id)
+
+            print(f"  第 {page} 页: {len(rows)} 个职位，其中新职位 {len(page_jobs)} 个。")
+            total += len(page_jobs)
+            if page_jobs:
+                emit(page_jobs)
+            if reached_mark:
+                print("  已抓到上次的水位线或回溯期限，停止翻页。")
+                complete = True
+                break
+
+        if state_store and not complete:
+            print("  本次未翻到上次的水位线，保留原水位线，下次运行会重新检查这些页。")
+        elif state_store and newest_date and (newest_date, newest_ids) != (mark_date, mark_ids):
+            state_store.set(self.STATE_NAMESPACE, self.base_url, {
+                'update_date': newest_date,
+                'ids': sorted(newest_ids),
+            })
+            state_store.save()
+        print(f"从 givemeoc.com 共抓取到 {total} 个新职位。")
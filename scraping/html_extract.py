@@ -0,0 +1,98 @@
+# scraping/html_extract.py
+"""
+基于 lxml 的定向HTML提取。
+
+爬虫往往只需要页面中的一个容器（GiveMeOC 的 div.crt-container、公众号文章的 div#js_content），
+用 BeautifulSoup 解析整页会为页头、导航、大段内联脚本等无关内容建出完整的树。
+这里用 lxml 的增量解析器分块读入页面：目标容器出现之前已闭合的元素随即丢弃，
+目标容器闭合后立即停止解析，只保留需要的子树。
+"""
+from functools import lru_cache
+
+from lxml import etree
+
+# 解析时每次送入的字符数
+_CHUNK_SIZE = 64 * 1024
+# 与 BeautifulSoup.get_text 一致，这些标签中的内容不算作文本
+_NON_TEXT_TAGS = frozenset(('script', 'style', 'template'))
+
+
+def _matches(element, tag, element_id, class_name):
+    if element.tag != tag:
+        return False
+    if element_id is not None and element.get('id') != element_id:
+        return False
+    if class_name is not None and class_name not in (element.get('class') or '').split():
+        return False
+    return True
+
+
+def extract_element(html, tag, element_id=None, class_name=None):
+    """
+    从HTML中找到第一个匹配的元素并返回其子树。
+    :param html: 页面内容（str 或 bytes）
+    :param tag: 标签名，如 "div"
+    :param element_id: 要求的 id 属性
+    :param class_name: 要求包含的 class
+    :return: lxml 元素；页面中没有匹配元素时返回None
+    """
+    if not html:
+        return None
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    target = None
+    for offset in range(0, len(html), _CHUNK_SIZE):
+        parser.feed(html[offset:offset + _CHUNK_SIZE])
+        for event, element in parser.read_events():
+            if event == 'start':
+                if target is None and _matches(element, tag, element_id, class_name):
+                    target = element
+            elif element is target:
+                # 目标容器已完整，剩余部分无需解析
+                return target
+            elif target is None:
+                # 目标出现之前闭合的元素不可能包含目标，连同已处理的兄弟节点一起释放
+                element.clear()
+                parent = element.getparent()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+    # 页面在目标闭合前结束（如被截断），交给解析器补全后返回已有部分
+    parser.close()
+    return target
+
+
+def iter_strings(element):
+    """按文档顺序产出元素内的文本片段，跳过注释和脚本/样式内容。"""
+    if isinstance(element.tag, str) and element.tag in _NON_TEXT_TAGS:
+        return
+    if isinstance(element.tag, str) and element.text:
+        yield element.text
+    for child in element:
+        yield from iter_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def element_text(element, separator='', strip=False):
+    """
+    提取元素的文本，语义与 BeautifulSoup 的 Tag.get_text(separator, strip) 相同。
+    """
+    strings = iter_strings(element)
+    if strip:
+        strings = (text.strip() for text in strings)
+        strings = (text for text in strings if text)
+    return separator.join(strings)
+
+
+@lru_cache(maxsize=None)
+def _class_xpath(tag, class_name):
+    """编译后的按 class 查找表达式（逐行解析时重复使用）。"""
+    return etree.XPath(f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]")
+
+
+def find_by_class(element, tag, class_name):
+    """返回 element 下第一个带有指定 class 的 tag 元素（tag 可为 "*"），没有则返回None。"""
+    if element is None:
+        return None
+    found = _class_xpath(tag, class_name)(element)
+    return found[0] if found else None
@@ -1,24 +1,37 @@
 # scraping/opml_rss_scraper.py
 import xml.etree.ElementTree as ET
-from scraping.wechat_rss_scraper import WechatRssScraper
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from scraping.wechat_rss_scraper import WechatRssScraper, get_default_rate_limiter
+from scraping.throttle import HostLimiter
+from scraping.state_store import get_state_store, StagedStateStore
+from scraping.article_cache import ArticleCache
+from scraping.capture import get_capture
+from config import (
+    RSS_MAX_CONCURRENCY, RSS_PER_HOST_CONCURRENCY, RSS_PER_HOST_INTERVAL, SCRAPER_STATE_PATH,
+    ARTICLE_CACHE_PATH, ARTICLE_CACHE_MAX_MB, ARTICLE_CACHE_TTL_DAYS
+)
 
 class OpmlRssScraper:
     """
     解析OPML文件并批量抓取其中所有RSS源的爬虫。
     """
-    def __init__(self, opml_file_path):
+    def __init__(self, opml_file_path, state_path=SCRAPER_STATE_PATH, article_cache_path=ARTICLE_CACHE_PATH):
         """
         初始化OPML RSS爬虫。
         :param opml_file_path: OPML文件的路径
+        :param state_path: 增量抓取状态文件路径，传入None则每次全量抓取
+        :param article_cache_path: 文章正文缓存路径，传入None则不使用缓存
         """
         self.opml_file_path = opml_file_path
+        self.state_path = state_path
+        self.article_cache_path = article_cache_path
         self.rss_feeds = []
 
     def _parse_opml(self):
         """
         解析OPML文件，提取所有RSS源的xmlUrl。
         """
+        self.rss_feeds = []
         try:
             tree = ET.parse(self.opml_file_path)
             root = tree.getroot()
@@ -39,48 +52,125 @@ class OpmlRssScraper:
             print(f"未找到OPML文件: {self.opml_file_path}")
             return False
 
-    def scrape_all(self, max_items_per_feed=10):
+    def _open_article_cache(self):
+        if not self.article_cache_path:
+            return None
+        try:
+            return ArticleCache(
+                self.article_cache_path,
+                max_bytes=int(ARTICLE_CACHE_MAX_MB * 1024 * 1024),
+                ttl_seconds=int(ARTICLE_CACHE_TTL_DAYS * 24 * 3600)
+            )
+        except Exception as e:
+            print(f"打开文章缓存失败，将不使用缓存: {e}")
+            return None
+
+    def _scrape_feed(self, feed, host_limiter, rate_limiter, state_store, article_cache, max_items_per_feed):
+        """
+        抓取单个RSS源，最多交出 max_items_per_feed 篇文章（其余留到下次运行）。
+        :return: (文章列表, 该源暂存的增量抓取状态)，状态在文章交给下游后才提交
+        """
+        staged_state = StagedStateStore(state_store) if state_store else None
+        # 使用现有的 WechatRssScraper 来抓取单个RSS源，共享同一组限流器和文章缓存
+        rss_scraper = WechatRssScraper(
+            rss_url=feed['url'],
+            host_limiter=host_limiter,
+            state_store=staged_state,
+            article_cache=article_cache,
+            rate_limiter=rate_limiter
+        )
+        # 限制每个源抓取的数量，避免某个源文章过多导致整体失衡
+        return rss_scraper.scrape(max_items=max_items_per_feed) or [], staged_state
+
+    def _collect(self, future_to_index, results, on_feed_jobs):
+        """按完成顺序收集各源的文章并交给 on_feed_jobs，交出成功后才提交该源的增量抓取状态。"""
+        total = len(self.rss_feeds)
+        done_count = 0
+        for future in as_completed(future_to_index):
+            i = future_to_index[future]
+            feed = self.rss_feeds[i]
+            done_count += 1
+            # 单个源出错不影响其他源
+            try:
+                jobs_from_feed, staged_state = future.result()
+            except Exception as e:
+                print(f"[{done_count}/{total}] 抓取RSS源 '{feed['name']}' 时出错: {e}")
+                continue
+
+            results[i] = jobs_from_feed
+            if jobs_from_feed:
+                print(f"[{done_count}/{total}] 成功从 '{feed['name']}' 抓取到 {len(jobs_from_feed)} 条信息。")
+                if on_feed_jobs:
+                    on_feed_jobs(jobs_from_feed)
+            else:
+                print(f"[{done_count}/{total}] 从 '{feed['name']}' 未能抓取到任何信息。")
+            if staged_state:
+                staged_state.commit()
+
+    def scrape_all(self, max_items_per_feed=10, max_workers=None, on_feed_jobs=None):
         """
-        抓取OPML文件中所有RSS源的最新文章。
+        并发抓取OPML文件中所有RSS源的最新文章。
+        全局并发数由 max_workers（默认 RSS_MAX_CONCURRENCY）控制，
+        同一主机的请求再由 HostLimiter 做礼貌性限流，取代原先源与源之间固定的 sleep(1)。
         :param max_items_per_feed: 每个RSS源最多抓取的文章数量
-        :return: 包含所有文章的列表
+        :param max_workers: 同时抓取的RSS源数量上限
+        :param on_feed_jobs: 每抓完一个源就以该源的文章列表调用的回调（按完成顺序，流式模式下用于立即交给下游）
+        :return: 包含所有文章的列表（按OPML中的源顺序排列）
         """
         if not self._parse_opml():
             return []
 
-        all_jobs = []
-        
-        print(f"开始批量抓取 {len(self.rss_feeds)} 个RSS源...")
+        if not self.rss_feeds:
+            return []
 
-        for i, feed in enumerate(self.rss_feeds):
-            print(f"\n--- 正在抓取第 {i+1}/{len(self.rss_feeds)} 个源: {feed['name']} ---")
-            print(f"RSS链接: {feed['url']}")
-            
-            try:
-                # 使用现有的 WechatRssScraper 来抓取单个RSS源
-                rss_scraper = WechatRssScraper(rss_url=feed['url'])
-                # 假设 WechatRssScraper 的 scrape 方法可以接受一个限制数量的参数
-                # 如果不能，我们需要在 WechatRssScraper 内部或之后进行切片
-                jobs_from_feed = rss_scraper.scrape()
-                
-                if jobs_from_feed:
-                    # 限制每个源抓取的数量，避免某个源文章过多导致整体失衡
-                    jobs_from_feed = jobs_from_feed[:max_items_per_feed]
-                    all_jobs.extend(jobs_from_feed)
-                    print(f"成功从 '{feed['name']}' 抓取到 {len(jobs_from_feed)} 条信息。")
-                else:
-                    print(f"从 '{feed['name']}' 未能抓取到任何信息。")
+        max_workers = max(1, int(max_workers or RSS_MAX_CONCURRENCY))
+        host_limiter = HostLimiter(RSS_PER_HOST_CONCURRENCY, RSS_PER_HOST_INTERVAL)
+        # 文章请求的按域名令牌桶：使用进程内共享的限速器，与其他爬虫实例及多次调用共同受限
+        rate_limiter = get_default_rate_limiter()
+        if get_capture():
+            # 记录/回放时每个RSS源和文章都要完整走一遍请求，存档才齐全、回放才与记录一致
+            print("抓取存档已启用，本次不使用增量抓取状态和文章缓存。")
+            state_store = None
+            article_cache = None
+        else:
+            state_store = get_state_store(self.state_path)
+            article_cache = self._open_article_cache()
+        total = len(self.rss_feeds)
+        results = [[] for _ in range(total)]
 
-            except Exception as e:
-                print(f"抓取RSS源 '{feed['name']}' 时出错: {e}")
-                continue
-            
-            # 在抓取每个源之间稍作暂停，礼貌性爬取
-            if i < len(self.rss_feeds) - 1:
-                print("暂停1秒...")
-                time.sleep(1)
-        
-        print(f"\n批量抓取完成！总共从 {len(self.rss_feeds)} 个源中抓取到 {len(all_jobs)} 条信息。")
+        print(f"开始并发抓取 {total} 个RSS源 (并发数: {max_workers}, 每主机并发: {RSS_PER_HOST_CONCURRENCY}, 每主机间隔: {RSS_PER_HOST_INTERVAL}秒)...")
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_index = {
+                    executor.submit(
+                        self._scrape_feed, feed, host_limiter, rate_limiter, state_store, article_cache, max_items_per_feed
+                    ): i
+                    for i, feed in enumerate(self.rss_feeds)
+                }
+                try:
+                    self._collect(future_to_index, results, on_feed_jobs)
+                except BaseException:
+                    # 下游放弃了本数据源（如超时）：不再开始新的源，未交出文章的源不推进状态
+                    for future in future_to_index:
+                        future.cancel()
+                    raise
+        except BaseException:
+            if article_cache:
+                article_cache.close()
+            raise
+
+        if state_store:
+            state_store.save()
+        if article_cache:
+            removed = article_cache.prune()
+            print(f"{article_cache.stats_line()}，本次淘汰 {removed} 条过期/超额缓存。")
+            article_cache.close()
+
+        # 按OPML中的源顺序合并，保证输出稳定
+        all_jobs = [job for jobs_from_feed in results for job in jobs_from_feed]
+
+        print(f"\n批量抓取完成！总共从 {total} 个源中抓取到 {len(all_jobs)} 条信息。")
         return all_jobs
 
 if __name__ == '__main__':
@@ -0,0 +1,258 @@
+# scraping/registry.py
+import importlib
+import queue
+import threading
+import time
+
+# 已注册的数据源: 名称 -> 数据源类（BaseScraper子类）
+_SOURCES = {}
+_builtin_loaded = False
+_builtin_lock = threading.Lock()
+
+
+class SourceCancelled(Exception):
+    """数据源已超时被放弃：emit() 抛出此异常，让数据源在保存增量抓取状态之前停止。"""
+
+
+def register_source(name):
+    """
+    注册数据源的类装饰器。被注册的类应继承 BaseScraper，并通过 fetch_jobs(emit) 分批交出职位。
+    在配置 JOB_SOURCES 中写上注册名即可启用，新增招聘网站无需修改 main.py。
+    """
+    def decorator(cls):
+        cls.source_key = name
+        _SOURCES[name] = cls
+        return cls
+    return decorator
+
+
+def _load_builtin_sources():
+    """导入内置数据源模块，使其中的 @register_source 生效。"""
+    global _builtin_loaded
+    with _builtin_lock:
+        if not _builtin_loaded:
+            importlib.import_module('scraping.sources')
+            _builtin_loaded = True
+
+
+def resolve_source(spec):
+    """
+    按配置项解析数据源类。
+    :param spec: 注册名（如 "givemeoc"），或 "模块路径:类名" 形式的外部数据源（如 "my_boards.lagou:LagouScraper"）
+    :return: 数据源类
+    """
+    spec = spec.strip()
+    if ':' in spec:
+        module_name, _, class_name = spec.partition(':')
+        cls = getattr(importlib.import_module(module_name), class_name)
+        if not getattr(cls, 'source_key', None):
+            cls.source_key = spec
+        return cls
+    _load_builtin_sources()
+    if spec not in _SOURCES:
+        raise KeyError(f"未知的数据源 '{spec}'，已注册: {', '.join(sorted(_SOURCES))}")
+    return _SOURCES[spec]
+
+
+def load_sources(spec_string):
+    """
+    解析逗号分隔的数据源配置，无法解析的数据源会被跳过并打印原因。
+    :return: 数据源类列表
+    """
+    sources = []
+    for spec in (spec_string or '').split(','):
+        if not spec.strip():
+            continue
+        try:
+            sources.append(resolve_source(spec))
+        except Exception as e:
+            print(f"  跳过数据源 '{spec.strip()}': {e}")
+    return sources
+
+
+def parse_source_timeouts(value):
+    """解析 "opml=600,zhaopin=300" 形式的按数据源超时配置（秒）。"""
+    timeouts = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        name, _, seconds = item.partition('=')
+        try:
+            timeouts[name.strip()] = float(seconds)
+        except ValueError:
+            print(f"忽略无效的数据源超时配置: {item.strip()}")
+    return timeouts
+
+
+class SourceRunner:
+    """
+    并发运行所有已启用的数据源：每个数据源在独立线程中抓取，抓到的职位经有界队列交给调用方。
+    每个数据源有各自的超时，超时或出错只影响它自己，不会拖慢其他数据源。
+    因队列已满（下游处理不过来）而等待的时间不计入超时。超时的线程无法被强行终止，
+    但它下一次调用 emit() 时会收到 SourceCancelled 异常，从而不再推进水位线等增量抓取状态。
+    """
+    _DONE = object()
+
+    def __init__(self, source_classes, default_timeout=300, timeouts=None, queue_size=16):
+        """
+        :param source_classes: 数据源类列表
+        :param default_timeout: 默认的单个数据源超时（秒），<=0 表示不限制
+        :param timeouts: {注册名: 超时秒数}，覆盖默认值
+        :param queue_size: 数据源与下游之间队列的大小（按批计），队列满时数据源线程等待
+        """
+        self.source_classes = source_classes
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._states = []
+
+    @staticmethod
+    def display_name(cls):
+        return getattr(cls, 'display_name', None) or getattr(cls, 'source_key', None) or cls.__name__
+
+    def start(self):
+        """启动所有数据源线程。"""
+        for cls in self.source_classes:
+            key = getattr(cls, 'source_key', cls.__name__)
+            timeout = self.timeouts.get(key, self.default_timeout)
+            state = {
+                "name": self.display_name(cls),
+                "key": key,
+                "status": "running",
+                "jobs": 0,
+                "batches": 0,
+                "started": time.monotonic(),
+                "deadline": time.monotonic() + timeout if timeout and timeout > 0 else None,
+                "blocked_since": None,  # 因队列已满而等待的起始时刻，等待期间超时计时暂停
+                "first_batch_seconds": None,
+                "seconds": None,
+                "error": None,
+                "cancelled": threading.Event(),
+            }
+            self._states.append(state)
+            threading.Thread(
+                target=self._run, args=(cls, state), name=f"source-{key}", daemon=True
+            ).start()
+
+    def _put(self, item, state):
+        """放入队列；队列满时等待（等待期间暂停该数据源的超时计时），但数据源已超时则放弃。"""
+        if state["cancelled"].is_set():
+            return False
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        state["blocked_since"] = time.monotonic()
+        try:
+            while not state["cancelled"].is_set():
+                try:
+                    self._queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            # 先顺延期限再清除等待标记，消费端任何时刻读到的组合都不会误判超时
+            if state["deadline"] is not None:
+                state["deadline"] += time.monotonic() - state["blocked_since"]
+            state["blocked_since"] = None
+
+    @staticmethod
+    def _expired(state, now):
+        """数据源是否已超时；正在等待队列空位的数据源不算超时。"""
+        if state["blocked_since"] is not None:
+            return False
+        return state["deadline"] is not None and state["deadline"] <= now
+
+    def _run(self, cls, state):
+        def emit(jobs):
+            if not jobs:
+                return
+            if not self._put(jobs, state):
+                raise SourceCancelled(f"{state['name']} 已超时")
+            if state["first_batch_seconds"] is None:
+                state["first_batch_seconds"] = time.monotonic() - state["started"]
+            state["jobs"] += len(jobs)
+            state["batches"] += 1
+
+        print(f"  正在从 {state['name']} 获取数据...")
+        try:
+            cls().fetch_jobs(emit)
+            status = "ok" if state["jobs"] else "empty"
+        except SourceCancelled:
+            print(f"  {state['name']} 已停止，本次不保存其增量抓取状态。")
+            return
+        except Exception as e:
+            status = "error"
+            state["error"] = str(e)
+            print(f"  从 {state['name']} 获取数据时出错: {e}")
+        self._put((self._DONE, state, status), state)
+
+    def _finish(self, state, status):
+        state["status"] = status
+        state["seconds"] = time.monotonic() - state["started"]
+        if status == "ok":
+            print(f"  成功从 {state['name']} 获取 {state['jobs']} 条数据，用时 {state['seconds']:.1f} 秒。")
+        elif status == "empty":
+            print(f"  未能从 {state['name']} 获取数据。")
+        elif status == "timeout":
+            state["cancelled"].set()
+            print(f"  {state['name']} 超过时限仍未完成，已放弃（此前已交出 {state['jobs']} 条数据）。")
+
+    def iter_batches(self):
+        """
+        逐批产出各数据源抓到的职位列表（按到达顺序），所有数据源完成或超时后结束。
+        """
+        active = [state for state in self._states if state["status"] == "running"]
+        while active:
+            deadlines = [
+                state["deadline"] for state in active
+                if state["deadline"] is not None and state["blocked_since"] is None
+            ]
+            wait = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+            # 其他数据源持续有数据到达时也要检查超时
+            now = time.monotonic()
+            for state in active:
+                if state["status"] == "running" and self._expired(state, now):
+                    self._finish(state, "timeout")
+            active = [state for state in active if state["status"] == "running"]
+            if item is None:
+                continue
+
+            if isinstance(item, tuple) and item and item[0] is self._DONE:
+                _, state, status = item
+                if state["status"] == "running":
+                    self._finish(state, status)
+                active = [state for state in active if state["status"] == "running"]
+                continue
+            yield item
+
+    def report(self):
+        """各数据源的状态、用时和产出，可用于日志和运行记录。"""
+        return [
+            {
+                "source": state["name"],
+                "status": state["status"],
+                "jobs": state["jobs"],
+                "batches": state["batches"],
+                "seconds": round(state["seconds"], 3) if state["seconds"] is not None else None,
+                "first_batch_seconds": round(state["first_batch_seconds"], 3)
+                if state["first_batch_seconds"] is not None else None,
+                "error": state["error"],
+            }
+            for state in self._states
+        ]
+
+    def print_report(self):
+        status_names = {"ok": "成功", "empty": "无数据", "error": "出错", "timeout": "超时", "running": "未完成"}
+        print("\n各数据源抓取情况:")
+        for entry in self.report():
+            seconds = f"{entry['seconds']:.1f}秒" if entry['seconds'] is not None else "-"
+            first = f"，首批 {entry['first_batch_seconds']:.1f}秒" if entry['first_batch_seconds'] is not None else ""
+            print(f"  {entry['source']}: {status_names.get(entry['status'], entry['status'])}，"
+                  f"{entry['jobs']} 条职位，用时 {seconds}{first}")
@@ -0,0 +1,146 @@
+# scraping/sources.py
+"""
+内置数据源。每个数据源都是 BaseScraper 的子类，用 @register_source 注册后即可在配置 JOB_SOURCES 中启用。
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from config import (
+    OPML_FILE_PATH, ZHAOPIN_SEARCH_URL, ZHAOPIN_MAX_PAGES, ZHAOPIN_PREFETCH_PAGES, ZHAOPIN_BATCH_SCRAPE
+)
+from scraping.base_scraper import BaseScraper
+from scraping.firecrawl_scraper import FirecrawlScraper
+from scraping.opml_rss_scraper import OpmlRssScraper
+from scraping.registry import register_source
+from scraping.zhaopin_parser import parse_zhaopin_markdown
+# 以下模块在导入时通过 @register_source 注册自身
+import scraping.givemeoc_scraper
+import scraping.zhaolian_scraper
+import scraping.boss_scraper
+
+
+def _extract_firecrawl_markdown(scraped_data):
+    """从Firecrawl的响应中取出Markdown内容，没有有效数据时返回None。"""
+    if scraped_data and scraped_data.get("data") and scraped_data["data"].get("markdown"):
+        return scraped_data["data"]["markdown"]
+    return None
+
+def _prefetched_pages(firecrawl_scraper, search_url, max_pages, prefetch_pages):
+    """
+    推测式并行翻页：同时渲染接下来的 prefetch_pages 页，按页码顺序产出 (页码, Firecrawl响应)。
+    调用方停止迭代（关闭生成器）时取消尚未开始的后续页，并忽略仍在进行中的页的结果。
+    """
+    executor = ThreadPoolExecutor(max_workers=prefetch_pages)
+    pending = {}
+    next_page_to_submit = 1
+    try:
+        for page in range(1, max_pages + 1):
+            while next_page_to_submit <= max_pages and next_page_to_submit < page + prefetch_pages:
+                page_url = search_url.format(page=next_page_to_submit)
+                pending[next_page_to_submit] = executor.submit(firecrawl_scraper.scrape, page_url)
+                next_page_to_submit += 1
+            print(f"    等待智联招聘第 {page}/{max_pages} 页的渲染结果 (同时在途 {len(pending)} 页)...")
+            yield page, pending.pop(page).result()
+    finally:
+        if pending:
+            print(f"    丢弃 {len(pending)} 个已预取的后续页请求。")
+        # 取消尚未开始的请求，不等待进行中的请求完成
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _batched_pages(firecrawl_scraper, search_url, max_pages, batch_pages):
+    """
+    批量翻页：每次用Firecrawl的批量抓取接口提交 batch_pages 页并轮询到完成，按页码顺序产出 (页码, Firecrawl响应)。
+    调用方停止迭代后不再提交后续批次。
+    """
+    for first in range(1, max_pages + 1, batch_pages):
+        pages = list(range(first, min(first + batch_pages, max_pages + 1)))
+        print(f"    批量提交智联招聘第 {pages[0]}-{pages[-1]}/{max_pages} 页...")
+        results = firecrawl_scraper.batch_scrape([search_url.format(page=page) for page in pages])
+        for page, scraped_data in zip(pages, results):
+            yield page, scraped_data
+
+
+def scrape_zhaopin_pages(firecrawl_scraper, search_url, max_pages, prefetch_pages=1, on_page_jobs=None, batch=False):
+    """
+    翻页抓取智联招聘，同时向Firecrawl提交 prefetch_pages 页，但严格按页码顺序解析；
+    一旦某页解析不出职位（已到末页）或Firecrawl无有效数据，就停止抓取并丢弃多余的页。
+    :param firecrawl_scraper: FirecrawlScraper 实例
+    :param search_url: 带 {page} 占位符的搜索URL
+    :param max_pages: 最多抓取的页数
+    :param prefetch_pages: 同时在途的页数，1 表示与原先一样逐页串行抓取
+    :param on_page_jobs: 每解析完一页就以该页的职位列表调用的回调（流式模式下用于立即交给下游）
+    :param batch: 为True时每 prefetch_pages 页通过批量抓取接口一次提交，否则逐页并行请求
+    :return: 按页码顺序排列的职位列表
+    """
+    jobs = []
+    prefetch_pages = max(1, min(int(prefetch_pages), max_pages))
+    produce = _batched_pages if batch else _prefetched_pages
+    with closing(produce(firecrawl_scraper, search_url, max_pages, prefetch_pages)) as pages:
+        for page, scraped_data in pages:
+            markdown = _extract_firecrawl_markdown(scraped_data)
+            if markdown is None:
+                print("    未能从Firecrawl获取有效数据，停止抓取该渠道。")
+                break
+
+            zhaopin_jobs = parse_zhaopin_markdown(markdown)
+            if not zhaopin_jobs:
+                print("    未能从该页解析出任何职位，可能已到达末页。")
+                break
+
+            jobs.extend(zhaopin_jobs)
+            print(f"    成功从第 {page} 页解析出 {len(zhaopin_jobs)} 条数据。")
+            if on_page_jobs:
+                on_page_jobs(zhaopin_jobs)
+
+    return jobs
+
+
+@register_source('zhaopin')
+class ZhaopinFirecrawlSource(BaseScraper):
+    """智联招聘搜索结果页（通过Firecrawl渲染后解析Markdown）。"""
+    display_name = "智联招聘(Firecrawl)"
+
+    def __init__(self):
+        super().__init__(base_url=ZHAOPIN_SEARCH_URL)
+
+    def fetch_jobs(self, emit):
+        """每解析完一页就交给 emit。"""
+        if not self.base_url:
+            print("  警告: 未在.env文件中设置ZHAOPIN_SEARCH_URL，跳过智联招聘抓取。")
+            return
+        scrape_zhaopin_pages(
+            FirecrawlScraper(), self.base_url, ZHAOPIN_MAX_PAGES, ZHAOPIN_PREFETCH_PAGES,
+            on_page_jobs=emit, batch=ZHAOPIN_BATCH_SCRAPE
+        )
+
+    def scrape(self, keyword=None, max_pages=None):
+        if not self.base_url:
+            return []
+        return scrape_zhaopin_pages(
+            FirecrawlScraper(), self.base_url, max_pages or ZHAOPIN_MAX_PAGES, ZHAOPIN_PREFETCH_PAGES,
+            batch=ZHAOPIN_BATCH_SCRAPE
+        )
+
+
+@register_source('opml')
+class OpmlRssSource(BaseScraper):
+    """OPML文件中列出的所有RSS源（微信公众号等）。"""
+    display_name = "RSS源"
+
+    def __init__(self):
+        super().__init__(base_url=OPML_FILE_PATH)
+
+    def fetch_jobs(self, emit):
+        """每抓完一个RSS源就交给 emit。"""
+        if not os.path.exists(self.base_url):
+            print(f"  OPML文件未找到: {self.base_url}，跳过RSS抓取。")
+            return
+        print(f"  正在从OPML文件 '{self.base_url}' 批量抓取RSS订阅...")
+        OpmlRssScraper(opml_file_path=self.base_url).scrape_all(max_items_per_feed=10, on_feed_jobs=emit)
+
+    def scrape(self, keyword=None, max_pages=None):
+        if not os.path.exists(self.base_url):
+            return []
+        return OpmlRssScraper(opml_file_path=self.base_url).scrape_all(max_items_per_feed=10)
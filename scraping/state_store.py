@@ -0,0 +1,155 @@
+# scraping/state_store.py
+import copy
+import json
+import os
+import threading
+
+
+class ScraperStateStore:
+    """
+    爬虫的持久化状态存储（JSON文件）。
+    按命名空间保存各数据源的增量抓取状态，例如RSS源的ETag/Last-Modified、
+    最近一次见过的文章等。线程安全，可被多个并发的爬虫实例共享。
+    """
+    def __init__(self, path):
+        """
+        :param path: 状态文件路径，例如 'data/scraper_state.json'
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._load()
+        self._dirty = False
+        # hold() 时的状态快照，不为None时 save() 暂不落盘
+        self._held = None
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            print(f"读取爬虫状态文件失败，将从空状态开始: {e}")
+            return {}
+
+    def get(self, namespace, key, default=None):
+        """读取 namespace 下 key 对应的状态（返回副本）。"""
+        with self._lock:
+            value = self._data.get(namespace, {}).get(key, default)
+            return dict(value) if isinstance(value, dict) else value
+
+    def set(self, namespace, key, value):
+        """写入 namespace 下 key 对应的状态，需调用 save() 落盘。"""
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = value
+            self._dirty = True
+
+    def save(self):
+        """将状态原子地写回磁盘（先写临时文件再替换）；hold() 期间只保留在内存中，等 release() 时决定。"""
+        with self._lock:
+            if not self._dirty or not self.path or self._held is not None:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"保存爬虫状态文件失败: {e}")
+
+    def hold(self):
+        """暂缓落盘：此后的写入只保留在内存中，直到 release()。"""
+        with self._lock:
+            if self._held is None:
+                self._held = (copy.deepcopy(self._data), self._dirty)
+
+    def release(self, commit):
+        """
+        结束 hold()：commit 为True时把期间的写入落盘，否则丢弃这些写入，恢复到 hold() 时的状态。
+        """
+        with self._lock:
+            held, self._held = self._held, None
+            if held is None:
+                return
+            if not commit:
+                self._data, self._dirty = held
+                return
+        self.save()
+
+
+class StagedStateStore:
+    """
+    暂存对共享状态存储的写入，commit() 后才写入底层存储，读取时优先返回暂存的值。
+    用于在数据真正交给下游之后再推进水位线：数据源中途被放弃时，未提交的状态随之丢弃。
+    """
+    def __init__(self, store):
+        """
+        :param store: 底层的 ScraperStateStore
+        """
+        self.store = store
+        self._staged = {}
+
+    def get(self, namespace, key, default=None):
+        if (namespace, key) in self._staged:
+            value = self._staged[(namespace, key)]
+            return dict(value) if isinstance(value, dict) else value
+        return self.store.get(namespace, key, default)
+
+    def set(self, namespace, key, value):
+        self._staged[(namespace, key)] = value
+
+    def commit(self):
+        """把暂存的写入交给底层存储（仍需调用底层存储的 save() 落盘）。"""
+        for (namespace, key), value in self._staged.items():
+            self.store.set(namespace, key, value)
+        self._staged = {}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+_holding = False
+
+
+def get_state_store(path):
+    """
+    返回进程内按路径共享的状态存储。并发运行的数据源必须共用同一个实例，
+    否则各自保存时会用自己读到的旧内容覆盖其他数据源写入的状态。
+    """
+    if not path:
+        return None
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ScraperStateStore(path)
+            if _holding:
+                _stores[path].hold()
+        return _stores[path]
+
+
+def hold_state_stores():
+    """
+    流水线开始时调用：此后共享状态存储中的写入（水位线、RSS源状态等）都暂不落盘，
+    由 release_state_stores() 在流水线结束时统一提交或丢弃。
+    """
+    global _holding
+    with _stores_lock:
+        _holding = True
+        for store in _stores.values():
+            store.hold()
+
+
+def release_state_stores(commit):
+    """
+    流水线结束时调用：commit 为True（成功完成）时保存期间推进的状态；否则丢弃，
+    下次运行重新抓取这些职位，避免抓到却没有匹配成功的职位被水位线永久跳过。
+    """
+    global _holding
+    with _stores_lock:
+        _holding = False
+        stores = list(_stores.values())
+    for store in stores:
+        store.release(commit)
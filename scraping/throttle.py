@@ -0,0 +1,128 @@
+# scraping/throttle.py
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+def get_host(url):
+    """从URL中提取主机名（小写），用于按站点进行限流。"""
+    return urlparse(url).netloc.lower()
+
+
+class HostLimiter:
+    """
+    按主机名进行礼貌性限流：
+    - 同一主机同时进行中的请求数不超过 max_concurrency_per_host；
+    - 同一主机相邻两次请求的发起时间至少间隔 min_interval 秒。
+    不同主机之间互不影响，因此整体耗时取决于最慢的那个主机，而不是请求总数。
+    """
+    def __init__(self, max_concurrency_per_host=2, min_interval=0.0):
+        self.max_concurrency_per_host = max(1, int(max_concurrency_per_host))
+        self.min_interval = max(0.0, float(min_interval))
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def _semaphore_for(self, host):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_concurrency_per_host)
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    def _wait_turn(self, host):
+        # 预约下一个可用的发起时间点，锁外再睡眠，避免阻塞其他主机
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.min_interval
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+    @contextmanager
+    def slot(self, url):
+        """
+        占用目标URL所在主机的一个请求名额。
+        用法: with limiter.slot(url): requests.get(url)
+        """
+        host = get_host(url)
+        semaphore = self._semaphore_for(host)
+        semaphore.acquire()
+        try:
+            self._wait_turn(host)
+            yield
+        finally:
+            semaphore.release()
+
+
+class TokenBucket:
+    """
+    令牌桶：以 rate 个/秒的速度补充令牌，最多积累 capacity 个。
+    acquire() 会预约一个令牌，令牌不足时在锁外睡眠到轮到自己为止，
+    因此多个线程并发调用时也能保持平均速率且先到先得。
+    """
+    def __init__(self, rate, capacity=1):
+        self.rate = max(float(rate), 1e-6)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class DomainRateLimiter:
+    """
+    按域名划分的令牌桶集合。同一个实例在一次运行中被所有爬虫共享，
+    因此限速是按主机全局生效的，而不是按爬虫实例。
+    """
+    def __init__(self, default_rate=1.0, burst=1, overrides=None):
+        """
+        :param default_rate: 未单独配置的域名每秒允许的请求数
+        :param burst: 令牌桶容量，即允许的瞬时突发请求数
+        :param overrides: {域名: 每秒请求数} 的单独配置，例如 {'mp.weixin.qq.com': 1}
+        """
+        self.default_rate = default_rate
+        self.burst = burst
+        self.overrides = {k.lower(): v for k, v in (overrides or {}).items()}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket_for(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.overrides.get(host, self.default_rate), self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url):
+        """在请求 url 之前调用，必要时阻塞直到该域名有可用令牌。"""
+        self._bucket_for(get_host(url)).acquire()
+
+
+def parse_rate_overrides(spec):
+    """
+    解析形如 "mp.weixin.qq.com=1,example.com=0.5" 的按域名限速配置。
+    """
+    overrides = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        host, rate = item.split('=', 1)
+        try:
+            overrides[host.strip().lower()] = float(rate)
+        except ValueError:
+            print(f"忽略无效的限速配置项: {item}")
+    return overrides
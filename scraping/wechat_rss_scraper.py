@@ -2,30 +2,83 @@
 
 import feedparser
 import requests
+import threading
 import time
 import calendar
-from bs4 import BeautifulSoup
-from config import HEADERS
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    HEADERS, ARTICLE_FETCH_WORKERS, ARTICLE_RATE_PER_SECOND, ARTICLE_RATE_BURST, ARTICLE_RATE_OVERRIDES
+)
 from datetime import datetime, timedelta, timezone
+from scraping.throttle import DomainRateLimiter, parse_rate_overrides
+from metrics import get_metrics
+from scraping.html_extract import extract_element, element_text
+from scraping.capture import get_capture, is_replaying, capture_now, CaptureMiss
+
+_default_rate_limiter = None
+_default_rate_limiter_lock = threading.Lock()
+
+
+def get_default_rate_limiter():
+    """
+    返回进程内共享的文章请求限速器，未显式传入限速器的爬虫实例都使用它，
+    保证同一主机的限速在所有实例间全局生效。
+    """
+    global _default_rate_limiter
+    with _default_rate_limiter_lock:
+        if _default_rate_limiter is None:
+            _default_rate_limiter = DomainRateLimiter(
+                default_rate=ARTICLE_RATE_PER_SECOND,
+                burst=ARTICLE_RATE_BURST,
+                overrides=parse_rate_overrides(ARTICLE_RATE_OVERRIDES)
+            )
+        return _default_rate_limiter
+
 
 class WechatRssScraper:
     """
     通过微信公众号的RSS源，抓取指定公众号的文章内容。
     这是一个比基于搜狗网页抓取更稳定、更现代的方案。
     """
-    def __init__(self, rss_url):
+    # 在 ScraperStateStore 中保存RSS源状态所用的命名空间
+    STATE_NAMESPACE = 'rss'
+
+    def __init__(self, rss_url, host_limiter=None, state_store=None, article_cache=None, rate_limiter=None):
         """
         初始化RSS爬虫。
         :param rss_url: 公众号的RSS订阅链接。
                        例如: 'https://rss.imzhao.com/{wechat_id}.xml'
+        :param host_limiter: 可选的 HostLimiter，用于在多个爬虫实例间按主机限流
+        :param state_store: 可选的 ScraperStateStore，用于保存ETag/Last-Modified和最近见过的文章，
+                            提供后将使用条件GET并在遇到已处理过的文章时停止遍历
+        :param article_cache: 可选的 ArticleCache，命中时跳过文章下载和HTML解析
+        :param rate_limiter: 按域名限速的 DomainRateLimiter，默认使用进程内共享的限速器
         """
         self.rss_url = rss_url
+        self.host_limiter = host_limiter
+        self.state_store = state_store
+        self.article_cache = article_cache
+        self.rate_limiter = rate_limiter or get_default_rate_limiter()
 
     def scrape_article_content(self, url):
         """抓取单篇文章的HTML内容，并处理编码问题"""
+        capture = get_capture()
+        started = time.perf_counter()
         try:
-            response = requests.get(url, headers=HEADERS, timeout=10)
-            response.raise_for_status() # 如果请求失败则抛出HTTPError
+            if capture and capture.replaying:
+                # 回放模式：直接读取存档中的原始响应，不限速也不发出请求
+                response = capture.load_response('article', url, url)
+            else:
+                # 按域名令牌桶限速，取代原先每篇文章后固定的 sleep(2)
+                self.rate_limiter.acquire(url)
+                # 请求耗时不含限速等待
+                started = time.perf_counter()
+                response = requests.get(url, headers=HEADERS, timeout=10)
+                response.raise_for_status() # 如果请求失败则抛出HTTPError
+                get_metrics().record_request('wechat_article', time.perf_counter() - started, len(response.content))
+                if capture:
+                    capture.record('article', url, response.content, response.status_code,
+                                   {'Content-Type': response.headers.get('Content-Type', '')})
             
             # 显式检测并使用正确的编码解码内容
             # response.encoding 会根据headers猜测编码，但可能不准
@@ -35,7 +88,11 @@ class WechatRssScraper:
                 response.encoding = response.apparent_encoding
             
             return response.text
+        except CaptureMiss as e:
+            print(e)
+            return ""
         except requests.RequestException as e:
+            get_metrics().record_request('wechat_article', time.perf_counter() - started, ok=False)
             print(f"抓取文章失败 {url}: {e}")
             return ""
         except Exception as e:
@@ -43,9 +100,154 @@ class WechatRssScraper:
             print(f"处理文章内容时发生未知错误 {url}: {e}")
             return ""
 
-    def scrape(self, **kwargs):
+    @staticmethod
+    def extract_article_text(article_html):
+        """从微信文章HTML中提取正文纯文本。"""
+        started = time.perf_counter()
+        # 'js_content' 是微信文章正文通常所在的div的id，只解析到它闭合为止
+        content_div = extract_element(article_html, 'div', element_id='js_content')
+        text = element_text(content_div, '\n', strip=True) if content_div is not None else ""
+        get_metrics().record_timing('article_extract', time.perf_counter() - started)
+        return text
+
+    def fetch_article_text(self, url):
+        """
+        获取文章正文文本，优先读取文章缓存。
+        :return: 正文文本；下载失败时返回None
+        """
+        if self.article_cache:
+            cached_text = self.article_cache.get(url)
+            if cached_text is not None:
+                return cached_text
+
+        article_html = self.scrape_article_content(url)
+        if not article_html:
+            return None
+
+        description = self.extract_article_text(article_html)
+        # 只缓存成功提取到正文的页面，验证码页等异常页面下次仍会重新抓取
+        if self.article_cache and description:
+            self.article_cache.put(url, description)
+        return description
+
+    @staticmethod
+    def _entry_id(entry):
+        """RSS条目的唯一标识，优先使用guid，其次使用链接。"""
+        return entry.get('id') or entry.get('link')
+
+    @staticmethod
+    def _parse_entry_time(entry):
+        """
+        解析RSS条目的发布时间，返回UTC时间；没有日期时返回None，无法解析时抛出ValueError。
+        """
+        # 放弃使用 *_parsed 字段，直接解析原始日期字符串
+        date_string = entry.get('updated') or entry.get('published')
+        if not date_string:
+            return None
+        # 手动解析RFC 822/1123格式的日期字符串, e.g., "Mon, 04 Aug 2025 08:00:00"
+        # 用户指出此时间为UTC+8
+        cst_tz = timezone(timedelta(hours=8))
+        naive_dt = datetime.strptime(date_string, "%a, %d %b %Y %H:%M:%S")
+        # 将其指定为UTC+8时区，再转换为UTC时区以便比较
+        return naive_dt.replace(tzinfo=cst_tz).astimezone(timezone.utc)
+
+    def _download_feed(self, feed_state):
+        """发出条件GET请求，返回原始响应。"""
+        headers = dict(HEADERS)
+        if feed_state.get('etag'):
+            headers['If-None-Match'] = feed_state['etag']
+        if feed_state.get('last_modified'):
+            headers['If-Modified-Since'] = feed_state['last_modified']
+
+        started = time.perf_counter()
+        try:
+            response = requests.get(self.rss_url, headers=headers, timeout=30)
+        except requests.RequestException:
+            get_metrics().record_request('rss_feed', time.perf_counter() - started, ok=False)
+            raise
+        get_metrics().record_request(
+            'rss_feed', time.perf_counter() - started, len(response.content), ok=response.status_code < 400
+        )
+        return response
+
+    def _fetch_feed(self, feed_state):
+        """
+        以条件GET方式下载并解析RSS源（回放模式下读取存档中的原文）。
+        :param feed_state: 上次抓取保存的状态 (etag / last_modified)
+        :return: (feed, response)；服务器返回304（自上次以来无更新）时 feed 为 None
+        """
+        capture = get_capture()
+        if capture and capture.replaying:
+            response = capture.load_response('rss', self.rss_url, self.rss_url)
+        else:
+            response = self._download_feed(feed_state)
+            if response.status_code == 304:
+                return None, response
+            response.raise_for_status()
+            if capture:
+                capture.record('rss', self.rss_url, response.content, response.status_code,
+                               {'Content-Type': response.headers.get('Content-Type', '')})
+
+        started = time.perf_counter()
+        feed = feedparser.parse(
+            response.content,
+            response_headers={
+                'content-location': self.rss_url,
+                'content-type': response.headers.get('Content-Type', ''),
+            }
+        )
+        get_metrics().record_timing('rss_parse', time.perf_counter() - started)
+        return feed, response
+
+    def _save_feed_state(self, feed_state, response, newest_entry_id, newest_entry_time, emitted_ids=None,
+                         has_pending=False):
+        """
+        记录本次抓取的缓存验证头和最新条目，供下次条件GET与增量遍历使用。
+        :param emitted_ids: 留在水位线之上、已经交出过的文章ID，下次运行跳过它们
+        :param has_pending: 是否有未交出的文章；有时保留原来的验证头，否则下次条件GET得到304，
+                            这些文章要等RSS源再次更新才会被重新处理
+        """
+        if not self.state_store:
+            return
+        if has_pending:
+            etag, last_modified = feed_state.get('etag'), feed_state.get('last_modified')
+        else:
+            etag = response.headers.get('ETag') or feed_state.get('etag')
+            last_modified = response.headers.get('Last-Modified') or feed_state.get('last_modified')
+        new_state = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'last_entry_id': newest_entry_id or feed_state.get('last_entry_id'),
+            'last_entry_time': newest_entry_time.isoformat() if newest_entry_time else feed_state.get('last_entry_time'),
+        }
+        if emitted_ids:
+            new_state['emitted_ids'] = list(emitted_ids)
+        self.state_store.set(self.STATE_NAMESPACE, self.rss_url, new_state)
+
+    @staticmethod
+    def _watermark_position(pending_positions):
+        """水位线可以推进到的位置（visited 中的下标）：所有未交出的候选文章之后。"""
+        return max(pending_positions) + 1 if pending_positions else 0
+
+    @classmethod
+    def _watermark(cls, visited, pending_positions):
+        """
+        计算本次遍历后可以保存的水位线 (条目ID, 最新发布时间)。
+        下次运行遇到水位线即停止遍历，因此水位线只能推进到所有未交出的候选文章（下载失败或超出数量上限）之后，
+        这些文章在下次运行时会被重新处理；没有可推进的位置时返回 (None, None)，保留原水位线。
+        :param visited: 本次遍历过的 [(条目, 发布时间)]，按RSS顺序（新的在前）
+        :param pending_positions: 未交出的候选文章在 visited 中的位置
+        """
+        start = cls._watermark_position(pending_positions)
+        if start >= len(visited):
+            return None, None
+        times = [published_time for _, published_time in visited[start:] if published_time]
+        return cls._entry_id(visited[start][0]), max(times) if times else None
+
+    def scrape(self, max_items=None, **kwargs):
         """
         主刮取方法。
+        :param max_items: 最多交出的文章数（取最新的几篇），超出的文章不下载，下次运行再处理
         :return: 职位信息列表
         """
         if not self.rss_url:
@@ -59,12 +261,34 @@ class WechatRssScraper:
         keywords = ['招聘', '求职', '内推', '实习', '校招', '社招', '岗位', '职位', 'Hiring', 'hiring']
         
         # 计算24小时前的时间点 (使用UTC以正确比较)
-        twenty_four_hours_ago = datetime.now(timezone.utc) - timedelta(hours=24)
+        # 回放时以存档记录的时间为准，否则日后回放时所有文章都会落在窗口之外
+        twenty_four_hours_ago = capture_now(timezone.utc) - timedelta(hours=24)
+
+        feed_state = {}
+        if self.state_store:
+            feed_state = self.state_store.get(self.STATE_NAMESPACE, self.rss_url, {}) or {}
+        last_entry_id = feed_state.get('last_entry_id')
+        # 水位线之上已经交出过的文章（上次有文章未能交出、水位线没能越过它们），本次不再重复交出
+        emitted_ids = set(feed_state.get('emitted_ids') or [])
+        last_entry_time = None
+        if feed_state.get('last_entry_time'):
+            try:
+                last_entry_time = datetime.fromisoformat(feed_state['last_entry_time'])
+            except ValueError:
+                last_entry_time = None
 
         try:
-            # 1. 解析RSS源
-            feed = feedparser.parse(self.rss_url)
-            
+            # 1. 以条件GET下载并解析RSS源（如有限流器，则占用该主机的一个请求名额）
+            if self.host_limiter and not is_replaying():
+                with self.host_limiter.slot(self.rss_url):
+                    feed, response = self._fetch_feed(feed_state)
+            else:
+                feed, response = self._fetch_feed(feed_state)
+
+            if feed is None:
+                print("RSS源自上次抓取以来没有更新 (304 Not Modified)，跳过解析。")
+                return []
+
             if feed.bozo:
                 # bozo位为1表示RSS源可能存在格式问题，但feedparser仍会尝试解析
                 print(f"警告: RSS源可能存在格式问题。错误信息: {feed.bozo_exception}")
@@ -75,64 +299,85 @@ class WechatRssScraper:
 
             print(f"从RSS源获取到 {len(feed.entries)} 篇文章，开始根据时间和关键词进行过滤...")
 
-            # 2. 遍历文章条目
+            visited = []
+            candidates = []
+            emitted_positions = []
+
+            # 2. 遍历文章条目（RSS按时间倒序，遇到上次已处理过的文章即可停止）
             for entry in feed.entries:
+                entry_id = self._entry_id(entry)
+                if last_entry_id and entry_id == last_entry_id:
+                    print("  已到达上次处理过的文章，停止遍历。")
+                    break
 
                 # 检查文章发布时间
-                published_time = None
-                # 放弃使用 *_parsed 字段，直接解析原始日期字符串
-                date_string = entry.get('updated') or entry.get('published')
-                
-                if date_string:
-                    try:
-                        # 手动解析RFC 822/1123格式的日期字符串, e.g., "Mon, 04 Aug 2025 08:00:00"
-                        # 用户指出此时间为UTC+8
-                        cst_tz = timezone(timedelta(hours=8))
-                        naive_dt = datetime.strptime(date_string, "%a, %d %b %Y %H:%M:%S")
-                        # 将其指定为UTC+8时区
-                        aware_dt = naive_dt.replace(tzinfo=cst_tz)
-                        # 转换为UTC时区以便与 twenty_four_hours_ago (UTC) 进行比较
-                        published_time = aware_dt.astimezone(timezone.utc)
-                    except ValueError:
-                        print(f"  [警告] 无法自动解析日期字符串: {date_string}，跳过此文章。")
-                        continue
+                try:
+                    published_time = self._parse_entry_time(entry)
+                except ValueError:
+                    print(f"  [警告] 无法自动解析日期字符串: {entry.get('updated') or entry.get('published')}，跳过此文章。")
+                    continue
+
+                if published_time and last_entry_time and published_time <= last_entry_time:
+                    print("  已到达上次处理过的时间点，停止遍历。")
+                    break
+                visited.append((entry, published_time))
+                if entry_id in emitted_ids:
+                    emitted_positions.append(len(visited) - 1)
+                    continue
 
                 # 如果没有发布时间，或者时间早于24小时前，则跳过
                 if not published_time or published_time < twenty_four_hours_ago:
                     continue
 
                 title = entry.title
-                article_url = entry.link
-                
+
                 # 判断标题是否包含任何一个关键词
                 if any(keyword in title for keyword in keywords):
-                    print(f"  发现相关文章:《{title}》(发布于 {published_time.strftime('%Y-%m-%d %H:%M:%S %Z')})，正在抓取内容...")
-                    
-                    # 3. 抓取并解析文章内容
-                    article_html = self.scrape_article_content(article_url)
-                    if article_html:
-                        soup = BeautifulSoup(article_html, 'html.parser')
-                        # 'js_content' 是微信文章正文通常所在的div的id
-                        content_div = soup.find('div', id='js_content')
-                        description = content_div.get_text('\n', strip=True) if content_div else ""
-                        
-                        # 尝试从RSS条目中获取公众号名称，如果失败则使用备用值
-                        company_name = getattr(entry, 'author', 'N/A')
-                        if company_name == 'N/A' and hasattr(feed.feed, 'title'):
-                            company_name = feed.feed.title
-
-                        job_data = {
-                            'title': title,
-                            'company': company_name,
-                            'location': 'N/A', # 需要从正文解析
-                            'description': description,
-                            'url': article_url,
-                            'source': f"WeChat RSS: {company_name}"
-                        }
-                        jobs.append(job_data)
-                    
-                    time.sleep(2)
+                    print(f"  发现相关文章:《{title}》(发布于 {published_time.strftime('%Y-%m-%d %H:%M:%S %Z')})")
+                    candidates.append(len(visited) - 1)
+
+            # 超出数量上限的旧文章本次不下载，不推进到它们之后的水位线保证下次运行会重新处理
+            pending_positions = candidates[max_items:] if max_items is not None else []
+            candidates = candidates[:max_items] if max_items is not None else candidates
+
+            # 3. 并行抓取并解析文章内容（优先使用缓存，网络请求按域名令牌桶限速）
+            if candidates:
+                print(f"  正在并行抓取 {len(candidates)} 篇相关文章的内容...")
+                article_urls = [visited[position][0].link for position in candidates]
+                workers = max(1, min(ARTICLE_FETCH_WORKERS, len(article_urls)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # executor.map 按输入顺序返回结果，保证输出顺序与RSS条目顺序一致
+                    descriptions = list(executor.map(self.fetch_article_text, article_urls))
+
+                for position, description in zip(candidates, descriptions):
+                    if description is None:
+                        # 下载失败的文章下次运行重试
+                        pending_positions.append(position)
+                        continue
+                    entry = visited[position][0]
+                    # 尝试从RSS条目中获取公众号名称，如果失败则使用备用值
+                    company_name = getattr(entry, 'author', 'N/A')
+                    if company_name == 'N/A' and hasattr(feed.feed, 'title'):
+                        company_name = feed.feed.title
+
+                    job_data = {
+                        'title': entry.title,
+                        'company': company_name,
+                        'location': 'N/A', # 需要从正文解析
+                        'description': description,
+                        'url': entry.link,
+                        'source': f"WeChat RSS: {company_name}"
+                    }
+                    jobs.append(job_data)
+                    emitted_positions.append(position)
 
+            newest_entry_id, newest_entry_time = self._watermark(visited, pending_positions)
+            start = self._watermark_position(pending_positions)
+            still_emitted = [self._entry_id(visited[position][0]) for position in sorted(emitted_positions) if position < start]
+            if pending_positions:
+                print(f"  有 {len(pending_positions)} 篇相关文章本次未能交出，水位线只推进到它们之前，下次运行重新处理。")
+            self._save_feed_state(feed_state, response, newest_entry_id, newest_entry_time, still_emitted,
+                                  has_pending=bool(pending_positions))
             print(f"从RSS源抓取到 {len(jobs)} 个相关职位信息。")
             return jobs
 
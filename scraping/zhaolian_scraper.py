@@ -1,11 +1,18 @@
 # scraping/zhaolian_scraper.py
 import json
+import time
 from scraping.base_scraper import BaseScraper
+from metrics import get_metrics
+from scraping.registry import register_source
+from scraping.capture import get_capture, request_key
 
+@register_source('zhaolian')
 class ZhaolianScraper(BaseScraper):
     """
     针对智联招聘的具体爬虫实现（基于API）。
     """
+    display_name = "智联招聘API"
+
     def __init__(self):
         # 智联招聘的搜索API URL
         super().__init__(base_url="https://fe-api.zhaopin.com/c/i/search/positions")
@@ -48,11 +55,22 @@ class ZhaolianScraper(BaseScraper):
             print(f"正在抓取第 {page} 页...")
             
             # 使用POST请求并发送JSON数据和完整请求头
+            capture = get_capture()
+            capture_key = request_key(self.base_url, payload)
+            started = time.perf_counter()
             try:
-                response = self.session.post(self.base_url, headers=headers, json=payload, timeout=30)
-                response.raise_for_status()
-                response_data = response.json()
+                if capture and capture.replaying:
+                    response_data = json.loads(capture.load('api', capture_key)[2])
+                else:
+                    response = self.session.post(self.base_url, headers=headers, json=payload, timeout=30)
+                    response.raise_for_status()
+                    get_metrics().record_request(self.source_key, time.perf_counter() - started, len(response.content))
+                    response_data = response.json()
+                    if capture:
+                        capture.record('api', capture_key, response.content, response.status_code)
             except Exception as e:
+                if not (capture and capture.replaying):
+                    get_metrics().record_request(self.source_key, time.perf_counter() - started, ok=False)
                 print(f"请求API失败: {e}")
                 break
 
@@ -0,0 +1,136 @@
+# scraping/zhaopin_parser.py
+import re
+
+# 职位块之间的分隔符（每个职位卡片末尾的“收藏”按钮）
+BLOCK_SEPARATOR = "收藏"
+SOURCE_NAME = '智联招聘 (Firecrawl)'
+
+# 预编译的正则。链接文本不允许包含方括号，避免在畸形输入上逐个'['回溯扫描到块尾。
+# 链接后可能带有Markdown链接标题，如 (url "标题")。
+_JOB_LINK_RE = re.compile(r'\[([^\[\]]+)\]\((https?://www\.zhaopin\.com/jobdetail/[^\)\s]+)(?:\s+"[^"\n]*")?\)')
+_COMPANY_LINK_RE = re.compile(r'\[([^\[\]]+)\]\(https?://www\.zhaopin\.com/companydetail/[^\)\s]+(?:\s+"[^"\n]*")?\)')
+# 薪资位于一行开头: "x-y万" / "x元" / "面议"。
+# 只从空白段中的最后一个换行处开始匹配，连续空行上不会反复回溯（原写法 '\n\s*' 在长空白段上是二次复杂度）。
+_SALARY_RE = re.compile(r'\n(?![ \t\r\f\v]*\n)[ \t\r\f\v]*((?:[\d.-]+(?:万|元))|面议)')
+# location.png 之后依次是: 地点、经验、学历
+_DETAILS_MARKER = 'location.png)'
+# 常见排版（三个字段各占一行）的快速路径；只在第一个标记处匹配一次，耗时与块长度成线性关系，不匹配时再按行切分
+_DETAILS_RE = re.compile(r'location\.png\)\s*(\S[^\n]*)\n\s*(\S[^\n]*)\n\s*(\S[^\n]*)')
+
+
+def iter_blocks(markdown_content, separator=BLOCK_SEPARATOR):
+    """按分隔符惰性切分Markdown，逐个产出职位信息块，不一次性构造整个块列表。"""
+    start = 0
+    step = len(separator)
+    find = markdown_content.find
+    while True:
+        end = find(separator, start)
+        if end == -1:
+            yield markdown_content[start:]
+            return
+        yield markdown_content[start:end]
+        start = end + step
+
+
+def split_details(block):
+    """
+    取出 location.png 之后的三个字段（地点、经验、学历），字段之间可以是任意空白（通常是换行）。
+    结果与旧写法的贪婪正则（三个不跨行的字段，以任意空白分隔）一致，但按行切分，耗时与块长度成线性关系：
+    该正则在字段不足三个、字段之间夹着长空白段时会多项式回溯。只由空白组成的内容不算作字段（旧正则会得到空字段）。
+    :return: (地点, 经验, 学历)，字段不足三个时返回None
+    """
+    start = block.find(_DETAILS_MARKER)
+    if start == -1:
+        return None
+    # 只在第一个标记处尝试一次，块内有大量标记时也不会逐个重试
+    match = _DETAILS_RE.match(block, start)
+    if match:
+        return match.group(1).rstrip(), match.group(2).rstrip(), match.group(3).rstrip()
+    lines = []
+    for line in block[start + len(_DETAILS_MARKER):].split('\n'):
+        line = line.strip()
+        if line:
+            lines.append(line)
+            if len(lines) == 3:
+                return tuple(lines)
+    # 不足三行时，贪婪匹配会从靠后的一行的最后一段空白处拆出字段
+    if len(lines) == 2:
+        head, tail = lines
+        parts = tail.rsplit(None, 1)
+        if len(parts) == 2:
+            return head, parts[0], parts[1]
+        parts = head.rsplit(None, 1)
+        if len(parts) == 2:
+            return parts[0], parts[1], tail
+    elif len(lines) == 1:
+        parts = lines[0].rsplit(None, 2)
+        if len(parts) == 3:
+            return tuple(parts)
+    return None
+
+
+def parse_job_block(block):
+    """
+    解析单个职位信息块。
+    :return: 职位字典；块中没有职位链接时返回None
+    """
+    # 含有 jobdetail 的块必然不是空白块，无需再 strip() 复制一遍
+    if "jobdetail" not in block:
+        return None
+
+    title_url_match = _JOB_LINK_RE.search(block)
+    if not title_url_match:
+        return None
+    title = title_url_match.group(1).strip()
+    url = title_url_match.group(2).strip()
+
+    salary_match = _SALARY_RE.search(block)
+    salary = salary_match.group(1).strip() if salary_match else '面议'
+
+    company_match = _COMPANY_LINK_RE.search(block)
+    company = company_match.group(1).strip() if company_match else 'N/A'
+
+    location, experience, education = 'N/A', 'N/A', 'N/A'
+    details = split_details(block)
+    if details:
+        location = details[0].replace('·', ' ')
+        experience, education = details[1], details[2]
+
+    description = f"薪资: {salary} | 地点: {location} | 经验: {experience} | 学历: {education}"
+
+    return {
+        'title': title,
+        'company': company,
+        'location': location,
+        'description': description,
+        'url': url,
+        'source': SOURCE_NAME
+    }
+
+
+def iter_zhaopin_jobs(markdown_content):
+    """
+    逐个产出从Firecrawl返回的智联招聘Markdown中解析出的职位字典（生成器）。
+    """
+    if not markdown_content:
+        return
+    for block in iter_blocks(markdown_content):
+        try:
+            job = parse_job_block(block)
+        except Exception as e:
+            print(f"  解析职位块时出错: {e}\n块内容: {block[:150]}...")
+            continue
+        if job:
+            yield job
+
+
+def parse_zhaopin_markdown(markdown_content):
+    """
+    解析Firecrawl返回的智联招聘页面的Markdown内容。
+    :param markdown_content: Firecrawl返回的Markdown字符串
+    :return: 结构化的职位信息列表
+    """
+    print("  正在解析Firecrawl返回的Markdown内容...")
+    jobs = list(iter_zhaopin_jobs(markdown_content))
+    print(f"  成功从Markdown中解析出 {len(jobs)} 个结构化职位信息。")
+    return jobs
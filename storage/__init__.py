@@ -0,0 +1 @@
+# 这个文件可以是空的，它的存在是为了让Python将storage目录识别为一个包。
\ No newline at end of file
@@ -0,0 +1,226 @@
+# storage/embedding_store.py
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# 向量矩阵文件每次扩容的最小行数
+_MIN_CAPACITY = 1024
+# 清理时每次复制的行数
+_COPY_BLOCK = 65536
+_SLUG_RE = re.compile(r'[^\w.-]+')
+
+
+class EmbeddingStore:
+    """
+    按内容指纹缓存的职位向量库。
+    向量按行存放在一个内存映射的 float32 矩阵文件（<标识>.f32）中，SQLite（<标识>.sqlite3）只保存
+    内容指纹到行号的映射和向量维度；查询相似度时直接在映射的矩阵上计算，不需要把全部向量读进内存。
+    不同的向量化方式（提供方、模型、维度）各用一组文件，互不混用。
+    每个向量记录最近一次被查询或写入的时间，prune() 删除长期未再出现的职位的向量并压缩矩阵文件。
+    """
+    def __init__(self, directory, signature, dim=None):
+        """
+        :param directory: 存放向量文件的目录
+        :param signature: 向量化方式的标识，如 "hashing-512-c2000"
+        :param dim: 向量维度；为None时沿用已有文件的维度，新建的库在第一次写入时确定
+        """
+        self.signature = signature
+        self.directory = directory
+        self.slug = _SLUG_RE.sub('_', signature).strip('_') or 'embeddings'
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{self.slug}.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                content_hash TEXT PRIMARY KEY,
+                row INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_vectors_row ON vectors(row)")
+        self._conn.commit()
+
+        # 每次清理都把保留的向量写到下一代矩阵文件，行号映射与文件代号在同一个事务中切换
+        generation = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        self._generation = int(generation[0]) if generation else 0
+        self.matrix_path = self._matrix_path(self._generation)
+
+        stored = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if stored and dim and int(stored[0]) != dim:
+            raise ValueError(f"向量库 {self.path} 的维度为 {stored[0]}，与当前配置的 {dim} 不一致")
+        self.dim = int(stored[0]) if stored else dim
+        if self.dim and not stored:
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            self._conn.commit()
+        self.count = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        self._map = None
+        if self.dim:
+            self._open_matrix(self.count)
+
+    def _matrix_path(self, generation):
+        suffix = f".g{generation}" if generation else ""
+        return os.path.join(self.directory, f"{self.slug}{suffix}.f32")
+
+    def _open_matrix(self, min_rows):
+        """映射矩阵文件，容量不足 min_rows 行时按倍数扩容（文件只增不减，未写入的行为0）。"""
+        row_bytes = self.dim * 4
+        size = os.path.getsize(self.matrix_path) if os.path.exists(self.matrix_path) else 0
+        capacity = size // row_bytes
+        if capacity < max(min_rows, 1):
+            capacity = max(_MIN_CAPACITY, capacity * 2, min_rows)
+            if self._map is not None:
+                self._map.flush()
+                self._map = None
+            with open(self.matrix_path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+        if self._map is None or len(self._map) != capacity:
+            self._map = np.memmap(self.matrix_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+
+    @property
+    def matrix(self):
+        """已写入的全部向量（内存映射的只读视图，行号即 lookup 返回的行号）。"""
+        if self._map is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        view = self._map[:self.count]
+        view.flags.writeable = False
+        return view
+
+    def _select(self, column, values, batch_size=500):
+        """按 column IN (...) 分批查询，返回 {内容指纹: 行号}（调用方需持有锁）。"""
+        found = {}
+        values = list(set(values))
+        for start in range(0, len(values), batch_size):
+            batch = values[start:start + batch_size]
+            placeholders = ','.join('?' * len(batch))
+            found.update(self._conn.execute(
+                f"SELECT content_hash, row FROM vectors WHERE {column} IN ({placeholders})", batch
+            ))
+        return found
+
+    def lookup(self, content_hashes):
+        """批量查询已有向量，返回 {内容指纹: 行号}；查到的向量记为刚使用过，清理时保留。"""
+        with self._lock:
+            found = self._select('content_hash', content_hashes)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE vectors SET last_used = ? WHERE content_hash = ?", [(now, h) for h in found]
+                )
+                self._conn.commit()
+            return found
+
+    def add(self, content_hashes, vectors):
+        """
+        追加一批向量（库中已有的指纹跳过）。先写入并刷新矩阵文件，再提交行号映射，
+        中途退出时最多留下未登记的行，下次写入会覆盖它们。
+        :param content_hashes: 内容指纹列表
+        :param vectors: 形状为 (len(content_hashes), dim) 的数组
+        :return: {内容指纹: 行号}
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(content_hashes):
+            return {}
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"向量维度 {vectors.shape[1]} 与向量库的 {self.dim} 不一致")
+            existing = self._select('content_hash', content_hashes)
+            new_rows = {}
+            positions = []
+            for position, content_hash in enumerate(content_hashes):
+                if content_hash in existing or content_hash in new_rows:
+                    continue
+                new_rows[content_hash] = self.count + len(positions)
+                positions.append(position)
+            if positions:
+                self._open_matrix(self.count + len(positions))
+                self._map[self.count:self.count + len(positions)] = vectors[positions]
+                self._map.flush()
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT INTO vectors (content_hash, row, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    [(content_hash, row, now, now) for content_hash, row in new_rows.items()]
+                )
+                self.count += len(positions)
+            self._conn.commit()
+        existing.update(new_rows)
+        return existing
+
+    def get(self, rows):
+        """按行号取出向量（复制到内存），返回形状为 (len(rows), dim) 的数组。"""
+        with self._lock:
+            if self._map is None:
+                return np.zeros((len(rows), self.dim or 0), dtype=np.float32)
+            return np.array(self._map[np.asarray(rows, dtype=np.int64)])
+
+    def prune(self, retention_days):
+        """
+        删除超过 retention_days 天未被查询或写入的向量，并把其余向量按原顺序压缩到新一代矩阵文件中。
+        新文件写好后才在一个事务中切换行号映射，中途退出时仍使用原来的文件和映射。
+        :return: 删除的向量数；retention_days<=0 表示不清理
+        """
+        if retention_days <= 0:
+            return 0
+        cutoff = time.time() - retention_days * 24 * 3600
+        with self._lock:
+            if self._map is None:
+                return 0
+            kept = self._conn.execute(
+                "SELECT content_hash, row, created_at, last_used FROM vectors WHERE last_used >= ? ORDER BY row",
+                (cutoff,)
+            ).fetchall()
+            removed = self.count - len(kept)
+            if removed <= 0:
+                return 0
+
+            generation = self._generation + 1
+            new_path = self._matrix_path(generation)
+            capacity = max(_MIN_CAPACITY, len(kept))
+            with open(new_path, 'wb') as f:
+                f.truncate(capacity * self.dim * 4)
+            new_map = np.memmap(new_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+            old_rows = np.fromiter((row for _, row, _, _ in kept), dtype=np.int64, count=len(kept))
+            for start in range(0, len(old_rows), _COPY_BLOCK):
+                block = old_rows[start:start + _COPY_BLOCK]
+                new_map[start:start + len(block)] = self._map[block]
+            new_map.flush()
+
+            with self._conn:
+                self._conn.execute("DELETE FROM vectors")
+                self._conn.executemany(
+                    "INSERT INTO vectors (content_hash, row, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    [(content_hash, i, created_at, last_used)
+                     for i, (content_hash, _, created_at, last_used) in enumerate(kept)]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (str(generation),)
+                )
+
+            old_path = self.matrix_path
+            self._map = new_map
+            self._generation = generation
+            self.matrix_path = new_path
+            self.count = len(kept)
+            try:
+                os.remove(old_path)
+            except OSError as e:
+                print(f"删除旧的向量矩阵文件失败: {e}")
+        return removed
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map = None
+            self._conn.commit()
+            self._conn.close()
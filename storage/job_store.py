@@ -0,0 +1,348 @@
+# storage/job_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from storage.seen_jobs import normalize_url, job_fingerprint
+from nlp.profiles import DEFAULT_PROFILE_NAME
+
+# 单个 IN (...) 查询/删除的参数个数上限（低于SQLite的变量数限制）
+_BATCH_SIZE = 500
+
+
+def _compress(text):
+    return zlib.compress(str(text or '').encode('utf-8'), 6)
+
+
+def result_key(job):
+    """匹配结果的职位键：规范化URL，没有URL时用标题+公司的指纹。"""
+    return normalize_url(job.get('url')) or f"fp:{job_fingerprint(job.get('title'), job.get('company'), '')}"
+
+
+class JobStore:
+    """
+    职位库（SQLite），保存每次运行的元数据、原始职位、清洗后的职位和匹配结果，取代每次整体覆盖的JSON文件。
+    - runs: 运行记录（开始/结束时间、状态、市场总结、各环节数量）
+    - raw_jobs: 各数据源抓到的原始职位，按运行保存
+    - clean_jobs: 清洗去重后的职位，按职位键（规范化URL）合并，记录首次/最近出现的时间和运行
+    - match_results: 每次运行各用户画像的匹配结果（matched/other），按报告中的顺序保存
+    url、source、first_seen、run_id 和匹配状态上都建有索引，报告和历史查询只读取需要的行；
+    写入按批在单个事务中完成，清理旧运行按索引删除，无需重写整个文件。
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                status TEXT NOT NULL,
+                summary TEXT,
+                counts TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status, started_at);
+
+            CREATE TABLE IF NOT EXISTS raw_jobs (
+                id INTEGER PRIMARY KEY,
+                run_id INTEGER NOT NULL,
+                source TEXT,
+                url TEXT,
+                fetched_at REAL NOT NULL,
+                payload BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_raw_jobs_run_id ON raw_jobs(run_id);
+            CREATE INDEX IF NOT EXISTS idx_raw_jobs_url ON raw_jobs(url);
+            CREATE INDEX IF NOT EXISTS idx_raw_jobs_source ON raw_jobs(source);
+
+            CREATE TABLE IF NOT EXISTS clean_jobs (
+                job_key TEXT PRIMARY KEY,
+                url TEXT,
+                source TEXT,
+                title TEXT,
+                company TEXT,
+                location TEXT,
+                description BLOB,
+                fingerprint TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                first_run_id INTEGER,
+                last_run_id INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_clean_jobs_url ON clean_jobs(url);
+            CREATE INDEX IF NOT EXISTS idx_clean_jobs_source ON clean_jobs(source);
+            CREATE INDEX IF NOT EXISTS idx_clean_jobs_first_seen ON clean_jobs(first_seen);
+            CREATE INDEX IF NOT EXISTS idx_clean_jobs_last_run_id ON clean_jobs(last_run_id);
+
+            CREATE TABLE IF NOT EXISTS match_results (
+                run_id INTEGER NOT NULL,
+                profile TEXT NOT NULL,
+                status TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                job_key TEXT NOT NULL,
+                url TEXT,
+                source TEXT,
+                title TEXT,
+                company TEXT,
+                result TEXT NOT NULL,
+                PRIMARY KEY (run_id, profile, status, position)
+            );
+            CREATE INDEX IF NOT EXISTS idx_match_results_status ON match_results(status, run_id);
+            CREATE INDEX IF NOT EXISTS idx_match_results_job_key ON match_results(job_key);
+            CREATE INDEX IF NOT EXISTS idx_match_results_url ON match_results(url);
+        """)
+        self._conn.commit()
+
+    def _write(self, sql, rows):
+        """在单个事务中批量写入。"""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(sql, rows)
+
+    # --- 写入 ---
+
+    def start_run(self, started_at=None):
+        """登记一次新的运行，返回写入这次运行数据的 RunRecorder。"""
+        return RunRecorder(self, self.begin_run(started_at))
+
+    def begin_run(self, started_at=None):
+        """登记一次新的运行，返回 run_id。"""
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO runs (started_at, status) VALUES (?, 'running')", (started_at or time.time(),)
+                )
+        return cursor.lastrowid
+
+    def add_raw_jobs(self, run_id, jobs):
+        """保存一批原始职位（数据源交出的一批在一个事务中写入）。"""
+        if not jobs:
+            return
+        now = time.time()
+        self._write(
+            "INSERT INTO raw_jobs (run_id, source, url, fetched_at, payload) VALUES (?, ?, ?, ?, ?)",
+            [
+                (run_id, job.get('source'), job.get('url'), now, _compress(json.dumps(job, ensure_ascii=False, default=str)))
+                for job in jobs
+            ]
+        )
+
+    def save_clean_jobs(self, run_id, df_jobs):
+        """
+        保存清洗去重后的职位：新职位插入，已有职位更新内容和最近出现的时间/运行，首次出现的信息保持不变。
+        :param df_jobs: process_jobs_dataframe（及去重）之后的DataFrame
+        """
+        if df_jobs is None or df_jobs.empty:
+            return
+        now = time.time()
+        locations = df_jobs['location'] if 'location' in df_jobs.columns else [''] * len(df_jobs)
+        rows = []
+        for title, company, location, description, url, source in zip(
+            df_jobs['title'], df_jobs['company'], locations, df_jobs['clean_description'], df_jobs['url'], df_jobs['source']
+        ):
+            fingerprint = job_fingerprint(title, company, description)
+            job_key = normalize_url(url) or f"fp:{fingerprint}"
+            rows.append((
+                job_key, url, source, title, company, location, _compress(description), fingerprint,
+                now, now, run_id, run_id
+            ))
+        self._write("""
+            INSERT INTO clean_jobs (job_key, url, source, title, company, location, description, fingerprint,
+                                    first_seen, last_seen, first_run_id, last_run_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job_key) DO UPDATE SET
+                url = excluded.url,
+                source = excluded.source,
+                title = excluded.title,
+                company = excluded.company,
+                location = excluded.location,
+                description = excluded.description,
+                fingerprint = excluded.fingerprint,
+                last_seen = excluded.last_seen,
+                last_run_id = excluded.last_run_id
+        """, rows)
+
+    def save_results(self, run_id, matched_jobs, other_jobs, profile=DEFAULT_PROFILE_NAME):
+        """保存本次运行某个画像的匹配结果，按报告中的顺序记录位置。"""
+        rows = []
+        for status, jobs in (('matched', matched_jobs), ('other', other_jobs)):
+            for position, job in enumerate(jobs or []):
+                rows.append((
+                    run_id, profile, status, position, result_key(job), job.get('url'), job.get('source'),
+                    job.get('title'), job.get('company'), json.dumps(job, ensure_ascii=False, default=str)
+                ))
+        self._write("""
+            INSERT OR REPLACE INTO match_results
+                (run_id, profile, status, position, job_key, url, source, title, company, result)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    def finish_run(self, run_id, status, summary=None, counts=None):
+        """记录运行结束：状态（ok/error）、市场总结和各环节数量。"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE runs SET finished_at = ?, status = ?, summary = COALESCE(?, summary), "
+                    "counts = COALESCE(?, counts) WHERE run_id = ?",
+                    (time.time(), status, summary,
+                     json.dumps(counts, ensure_ascii=False) if counts is not None else None, run_id)
+                )
+
+    # --- 查询 ---
+
+    @staticmethod
+    def _run_from_row(row):
+        run_id, started_at, finished_at, status, summary, counts = row
+        return {
+            "run_id": run_id,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "status": status,
+            "summary": summary,
+            "counts": json.loads(counts) if counts else {},
+        }
+
+    def latest_run(self, status='ok'):
+        """最近一次指定状态的运行，没有时返回None。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, started_at, finished_at, status, summary, counts FROM runs "
+                "WHERE status = ? ORDER BY started_at DESC LIMIT 1", (status,)
+            ).fetchone()
+        return self._run_from_row(row) if row else None
+
+    def list_runs(self, limit=20):
+        """最近的若干次运行（新的在前）。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, started_at, finished_at, status, summary, counts FROM runs "
+                "ORDER BY started_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._run_from_row(row) for row in rows]
+
+    def get_results(self, run_id, status, limit=None, profile=DEFAULT_PROFILE_NAME):
+        """读取某次运行某个画像某一类（matched/other）的匹配结果，按报告顺序，可只取前 limit 个。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM match_results WHERE run_id = ? AND profile = ? AND status = ? "
+                "ORDER BY position LIMIT ?",
+                (run_id, profile, status, -1 if limit is None else limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count_results(self, run_id, profile=DEFAULT_PROFILE_NAME):
+        """某次运行某个画像各类匹配结果的数量，如 {"matched": 12, "other": 30}。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM match_results WHERE run_id = ? AND profile = ? GROUP BY status",
+                (run_id, profile)
+            ).fetchall()
+        return dict(rows)
+
+    def match_history(self, url):
+        """某个职位在历次运行中（各画像）的匹配记录（新的在前），用于查询过去的匹配。"""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT m.run_id, r.started_at, m.profile, m.status, m.result
+                FROM match_results m JOIN runs r ON r.run_id = m.run_id
+                WHERE m.job_key = ? ORDER BY r.started_at DESC
+            """, (normalize_url(url) or url,)).fetchall()
+        return [
+            {"run_id": run_id, "started_at": started_at, "profile": profile, "status": status, "job": json.loads(result)}
+            for run_id, started_at, profile, status, result in rows
+        ]
+
+    def new_jobs_since(self, since, source=None, limit=100):
+        """首次出现时间晚于 since（Unix时间）的职位，可按来源筛选，新的在前。"""
+        sql = ("SELECT job_key, url, source, title, company, location, first_seen, last_seen "
+               "FROM clean_jobs WHERE first_seen >= ?")
+        params = [since]
+        if source:
+            sql += " AND source = ?"
+            params.append(source)
+        sql += " ORDER BY first_seen DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        keys = ("job_key", "url", "source", "title", "company", "location", "first_seen", "last_seen")
+        return [dict(zip(keys, row)) for row in rows]
+
+    # --- 清理 ---
+
+    def prune(self, keep_runs):
+        """
+        只保留最近 keep_runs 次运行的数据：删除更早运行的记录、原始职位和匹配结果，
+        以及此后再未出现过的清洗后职位。keep_runs<=0 表示不清理。
+        :return: 删除的运行次数
+        """
+        if keep_runs <= 0:
+            return 0
+        with self._lock:
+            old_runs = [row[0] for row in self._conn.execute(
+                "SELECT run_id FROM runs ORDER BY started_at DESC LIMIT -1 OFFSET ?", (keep_runs,)
+            )]
+            if not old_runs:
+                return 0
+            with self._conn:
+                for start in range(0, len(old_runs), _BATCH_SIZE):
+                    batch = old_runs[start:start + _BATCH_SIZE]
+                    placeholders = ','.join('?' * len(batch))
+                    for table in ('raw_jobs', 'match_results', 'runs'):
+                        self._conn.execute(f"DELETE FROM {table} WHERE run_id IN ({placeholders})", batch)
+                # 最近一次出现在已删除运行中的职位
+                self._conn.execute(
+                    "DELETE FROM clean_jobs WHERE last_run_id < (SELECT MIN(run_id) FROM runs)"
+                )
+        return len(old_runs)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RunRecorder:
+    """
+    把一次运行的数据写入职位库。职位库只是结果的副本，写入失败只打印提示，不影响主流程。
+    """
+    def __init__(self, store, run_id):
+        self.store = store
+        self.run_id = run_id
+        self.summary = None
+        self.results_saved = False
+
+    def _safely(self, action, func, *args):
+        try:
+            func(self.run_id, *args)
+            return True
+        except Exception as e:
+            print(f"写入职位库失败（{action}）: {e}")
+            return False
+
+    def add_raw_jobs(self, jobs):
+        self._safely("原始职位", self.store.add_raw_jobs, jobs)
+
+    def save_clean_jobs(self, df_jobs):
+        self._safely("清洗后职位", self.store.save_clean_jobs, df_jobs)
+
+    def save_results(self, matched_jobs, other_jobs, summary, profile=DEFAULT_PROFILE_NAME):
+        self.summary = summary
+        saved = self._safely("匹配结果", self.store.save_results, matched_jobs, other_jobs, profile)
+        self.results_saved = self.results_saved or saved
+
+    def finish(self, status, counts=None):
+        """
+        记录运行结束。正常结束但没有产生匹配结果（如所有数据源均无数据）的运行记为 empty，
+        报告仍使用最近一次产生了结果的运行。
+        """
+        if status == 'ok' and not self.results_saved:
+            status = 'empty'
+        self._safely("运行记录", self.store.finish_run, status, self.summary, counts)
@@ -0,0 +1,166 @@
+# storage/run_lock.py
+import json
+import os
+import socket
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows等非POSIX系统
+    fcntl = None
+
+# 本进程当前持有的锁文件，用于区分"本进程持有"和"上一次运行（可能恰好是相同的进程号）遗留"的锁
+_held_paths = set()
+_held_lock = threading.Lock()
+
+
+def _pid_alive(pid):
+    """同一主机上的进程是否仍在运行（只在POSIX系统上检查，其他系统视为在运行，只按锁的时长判断）。"""
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RunLock:
+    """
+    基于锁文件的流水线运行锁，防止定时任务、手动运行或多个调度器同时运行流水线。
+    锁文件的内容为持有者的主机名、进程号和加锁时间，只用于提示是谁在运行。
+    - POSIX系统上对锁文件加操作系统的建议锁（flock）：持有进程无论以何种方式退出，锁都由内核立即释放，
+      不需要按进程号或时长猜测锁是否失效，其他主机上的进程遗留的锁也不会把流水线挡住数小时；
+    - 其他系统上退回为以独占方式创建锁文件：持有进程已退出（同一主机上）、或加锁时间超过 stale_seconds
+      的锁视为上次异常退出遗留的锁，会被直接接管。
+    """
+    def __init__(self, path, stale_seconds=6 * 3600):
+        """
+        :param path: 锁文件路径
+        :param stale_seconds: 锁的最长有效时间（秒），<=0 表示只按持有进程是否存在判断；只在没有flock的系统上使用
+        """
+        self.path = path
+        self.stale_seconds = stale_seconds
+        self.held = False
+        self._fd = None
+
+    def holder(self):
+        """当前锁文件的内容（{"host", "pid", "acquired_at"}），没有锁文件或内容无法解析时返回None。"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            return info if isinstance(info, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def describe_holder(self):
+        info = self.holder()
+        if not info:
+            return "未知持有者"
+        acquired = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info.get('acquired_at') or 0))
+        return f"{info.get('host')} 上的进程 {info.get('pid')}，加锁于 {acquired}"
+
+    def _is_stale(self, info):
+        if not info:
+            # 内容为空或损坏：可能是另一个进程刚创建、尚未写完，按文件修改时间判断
+            try:
+                return time.time() - os.path.getmtime(self.path) > 60
+            except OSError:
+                return True
+        if self.stale_seconds > 0 and time.time() - (info.get('acquired_at') or 0) > self.stale_seconds:
+            return True
+        if info.get('host') != socket.gethostname():
+            return False
+        pid = info.get('pid')
+        if pid == os.getpid():
+            # 容器重启后进程号常常相同：本进程没有持有的锁一定是上次运行遗留的
+            with _held_lock:
+                return self.path not in _held_paths
+        return not isinstance(pid, int) or not _pid_alive(pid)
+
+    @staticmethod
+    def _holder_info():
+        return json.dumps({"host": socket.gethostname(), "pid": os.getpid(), "acquired_at": time.time()})
+
+    def _make_directory(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _create(self):
+        self._make_directory()
+        fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self._holder_info())
+
+    def _acquire_flock(self):
+        """对锁文件加独占的flock（不等待），成功后写入持有者信息。锁文件在释放后保留，不会被删除。"""
+        self._make_directory()
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, self._holder_info().encode('utf-8'))
+        self._fd = fd
+        self.held = True
+        return True
+
+    def acquire(self):
+        """尝试加锁（不等待）。成功返回True；锁被其他运行持有时返回False。"""
+        if self.held:
+            return True
+        if fcntl is not None:
+            return self._acquire_flock()
+        for _ in range(2):
+            try:
+                self._create()
+            except FileExistsError:
+                info = self.holder()
+                if not self._is_stale(info):
+                    return False
+                print(f"接管失效的运行锁 {self.path}（{self.describe_holder()}）。")
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            self.held = True
+            with _held_lock:
+                _held_paths.add(self.path)
+            return True
+        return False
+
+    def release(self):
+        if not self.held:
+            return
+        self.held = False
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                # 清空持有者信息再解锁；删除文件会让正在等待的进程锁住已被删除的旧文件
+                os.ftruncate(fd, 0)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+            return
+        with _held_lock:
+            _held_paths.discard(self.path)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RuntimeError(f"流水线正在运行（{self.describe_holder()}）")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,201 @@
+# storage/seen_jobs.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 不影响职位身份的跟踪类参数，规范化URL时去掉
+_TRACKING_PARAMS = {
+    'refcode', 'srccode', 'preactionid', 'sessionid', 'spm', 'from', 'scene',
+    'chksm', 'sharer_shareinfo', 'sharer_shareinfo_first',
+}
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_url(url):
+    """
+    规范化职位URL：统一协议和域名大小写，去掉锚点、跟踪参数和末尾斜杠，查询参数按名称排序。
+    无效URL（空或'N/A'）返回空字符串。
+    """
+    if not isinstance(url, str):
+        return ''
+    url = url.strip()
+    if not url or url == 'N/A':
+        return ''
+    parts = urlsplit(url)
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith('utm_')
+    ]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ''))
+
+
+def job_fingerprint(title, company, description):
+    """职位内容指纹：标题、公司和描述（折叠空白后）的SHA-1，用于判断同一URL的职位内容是否变化。"""
+    normalized = '\x1f'.join(
+        _WHITESPACE_RE.sub(' ', str(value or '')).strip().lower()
+        for value in (title, company, description)
+    )
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+class SeenJobsStore:
+    """
+    已处理职位的持久化索引（SQLite）。
+    以规范化URL为键（没有URL时使用内容指纹），记录内容指纹和上次的匹配结果。
+    每次运行只有新出现或内容变化的职位需要送去AI匹配，其余职位直接沿用上次的结果。
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_jobs (
+                job_key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                category TEXT NOT NULL,
+                result_json TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_jobs_last_seen ON seen_jobs(last_seen)")
+        self._conn.commit()
+
+    @staticmethod
+    def annotate(df_jobs):
+        """为职位DataFrame添加 job_key 和 fingerprint 两列。"""
+        df_jobs = df_jobs.copy()
+        df_jobs['fingerprint'] = [
+            job_fingerprint(title, company, description)
+            for title, company, description in zip(df_jobs['title'], df_jobs['company'], df_jobs['clean_description'])
+        ]
+        df_jobs['job_key'] = [
+            normalize_url(url) or f"fp:{fingerprint}"
+            for url, fingerprint in zip(df_jobs['url'], df_jobs['fingerprint'])
+        ]
+        return df_jobs
+
+    def _lookup(self, job_keys, batch_size=500):
+        """批量查询已有记录，返回 {job_key: (fingerprint, category, result_json)}。"""
+        found = {}
+        keys = list(set(job_keys))
+        with self._lock:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT job_key, fingerprint, category, result_json FROM seen_jobs WHERE job_key IN ({placeholders})",
+                    batch
+                )
+                for job_key, fingerprint, category, result_json in rows:
+                    found[job_key] = (fingerprint, category, result_json)
+        return found
+
+    def partition(self, df_jobs):
+        """
+        将职位划分为需要AI匹配的新职位/已变化职位，以及可以沿用上次结果的职位。
+        :param df_jobs: 经过 annotate() 的DataFrame
+        :return: (df_pending, carried_matched_jobs, carried_other_jobs)
+        """
+        known = self._lookup(df_jobs['job_key'])
+        pending_mask = []
+        carried_matched, carried_other, unchanged_keys = [], [], []
+        for job_key, fingerprint in zip(df_jobs['job_key'], df_jobs['fingerprint']):
+            record = known.get(job_key)
+            if record is None or record[0] != fingerprint:
+                pending_mask.append(True)
+                continue
+            pending_mask.append(False)
+            unchanged_keys.append(job_key)
+            _, category, result_json = record
+            if category == 'matched' and result_json:
+                carried_matched.append(json.loads(result_json))
+            elif category == 'other' and result_json:
+                carried_other.append(json.loads(result_json))
+
+        self._touch(unchanged_keys)
+        return df_jobs[pending_mask], carried_matched, carried_other
+
+    def _touch(self, job_keys):
+        if not job_keys:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE seen_jobs SET last_seen = ? WHERE job_key = ?",
+                [(now, job_key) for job_key in job_keys]
+            )
+            self._conn.commit()
+
+    def record_results(self, df_chunk, chunk_result):
+        """
+        记录一块职位的匹配结果。未被选中的职位也会记录为 'none'，之后不再重复送去匹配；
+        但某一类的推荐名额已用完（capped）时，未被选中的职位可能只是被挤掉了，不记录，下次运行重新匹配。
+        :param df_chunk: 经过 annotate() 的职位块
+        :param chunk_result: 匹配结果 {"matched_jobs": [...], "other_jobs": [...], "selected": {...}, "capped": bool}，
+                             selected 给出每个结果在块内的位置，据此精确对应到职位
+        """
+        categories = ['none'] * len(df_chunk)
+        results = [None] * len(df_chunk)
+        selected = chunk_result.get("selected")
+        if selected:
+            for category in ('matched', 'other'):
+                for position, job in zip(selected.get(category) or [], chunk_result.get(f"{category}_jobs") or []):
+                    categories[position] = category
+                    results[position] = job
+        else:
+            # 没有位置信息的旧格式结果，按规范化URL对应
+            results_by_url = {}
+            for category in ('matched', 'other'):
+                for job in chunk_result.get(f"{category}_jobs") or []:
+                    url_key = normalize_url(job.get('url'))
+                    if url_key and url_key not in results_by_url:
+                        results_by_url[url_key] = (category, job)
+            for position, job_key in enumerate(df_chunk['job_key']):
+                categories[position], results[position] = results_by_url.get(job_key, ('none', None))
+
+        now = time.time()
+        rows = []
+        capped = bool(chunk_result.get("capped"))
+        for job_key, fingerprint, category, job in zip(df_chunk['job_key'], df_chunk['fingerprint'], categories, results):
+            if capped and category == 'none':
+                continue
+            result_json = json.dumps(job, ensure_ascii=False) if job else None
+            rows.append((job_key, fingerprint, category, result_json, now, now))
+
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO seen_jobs (job_key, fingerprint, category, result_json, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(job_key) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    category = excluded.category,
+                    result_json = excluded.result_json,
+                    last_seen = excluded.last_seen
+            """, rows)
+            self._conn.commit()
+
+    def prune(self, retention_days):
+        """删除超过 retention_days 天未再出现的职位记录，返回删除条数。"""
+        if retention_days <= 0:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM seen_jobs WHERE last_seen < ?", (time.time() - retention_days * 86400,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
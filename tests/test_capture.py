@@ -0,0 +1,39 @@
+import sqlite3
+from datetime import datetime, timezone
+
+from scraping.capture import CaptureArchive, capture_now, close_capture, open_capture
+
+RECORDED_AT = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc).timestamp()
+
+
+def test_replay_uses_recording_time_as_now(tmp_path):
+    archive = open_capture('record', 'run1', str(tmp_path))
+    archive.record('page', 'https://example.com/', '<html></html>')
+    close_capture()
+    with sqlite3.connect(str(tmp_path / 'run1.sqlite3')) as conn:
+        conn.execute("UPDATE meta SET value = ? WHERE name = 'started_at'", (repr(RECORDED_AT),))
+
+    archive = open_capture('replay', 'run1', str(tmp_path))
+    try:
+        assert archive.load('page', 'https://example.com/')[2] == b'<html></html>'
+        assert capture_now(timezone.utc) == datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+        assert capture_now() == datetime.fromtimestamp(RECORDED_AT)
+    finally:
+        close_capture()
+    assert abs((capture_now() - datetime.now()).total_seconds()) < 5
+
+
+def test_archives_without_meta_fall_back_to_first_response(tmp_path):
+    path = str(tmp_path / 'old.sqlite3')
+    archive = CaptureArchive(path, 'record')
+    archive.record('rss', 'https://example.com/feed', b'<rss/>')
+    archive.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE meta")
+        conn.execute("UPDATE responses SET captured_at = ?", (RECORDED_AT,))
+
+    replay = CaptureArchive(path, 'replay')
+    try:
+        assert replay.started_at == RECORDED_AT
+    finally:
+        replay.close()
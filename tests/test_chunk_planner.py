@@ -0,0 +1,99 @@
+import pandas as pd
+import pytest
+
+from nlp import standardize
+from nlp.chunk_planner import ChunkPlanner, HeuristicTokenizer, TRUNCATION_MARK, truncate_to_tokens
+
+
+def make_jobs(lengths):
+    return pd.DataFrame([
+        {"title": f"职位{i}", "company": f"公司{i}", "description": "描述" * (length // 2),
+         "url": f"https://example.com/{i}", "source": "测试"}
+        for i, length in enumerate(lengths)
+    ])
+
+
+def chunk_tokens(planner, df_chunk):
+    return sum(planner.job_tokens(record) for record in standardize.prompt_records(df_chunk, planner.profile_ids))
+
+
+def test_heuristic_tokenizer_counts_cjk_per_char():
+    tokenizer = HeuristicTokenizer()
+    assert tokenizer.count("") == 0
+    assert tokenizer.count("职位") == 2
+    assert tokenizer.count("abcdefgh") == 2
+    assert tokenizer.count("职位abcde") == 4
+
+
+def test_truncate_to_tokens_returns_longest_fitting_prefix():
+    tokenizer = HeuristicTokenizer()
+    assert truncate_to_tokens("短文本", 10, tokenizer) == "短文本"
+    truncated = truncate_to_tokens("字" * 100, 10, tokenizer)
+    assert truncated.endswith(TRUNCATION_MARK)
+    assert tokenizer.count(truncated) <= 10
+    assert tokenizer.count(truncated[:-1] + "字" + TRUNCATION_MARK) > 10
+
+
+def test_plan_covers_every_job_once_within_limits():
+    planner = ChunkPlanner(token_budget=400, max_job_tokens=150, max_jobs_per_chunk=4,
+                           context_window=100000, tokenizer=HeuristicTokenizer())
+    df = make_jobs([10, 300, 40, 120, 80, 60, 20, 200, 30, 90])
+    chunks, stats = planner.plan(df)
+
+    positions = [position for chunk in chunks for position in chunk.index]
+    assert sorted(positions) == list(range(len(df)))
+    assert stats["chunks"] == len(chunks)
+    # 超长的两个职位被截断
+    assert stats["truncated"] == 2
+    for chunk in chunks:
+        assert len(chunk) <= 4
+        assert list(chunk.index) == sorted(chunk.index)
+        assert chunk_tokens(planner, chunk) <= planner.token_budget
+    # 块按其中最早职位的原始顺序排列
+    assert [chunk.index[0] for chunk in chunks] == sorted(chunk.index[0] for chunk in chunks)
+
+
+def test_plan_never_exceeds_budget_with_oversized_fixed_fields():
+    planner = ChunkPlanner(token_budget=400, max_job_tokens=150, max_jobs_per_chunk=4,
+                           context_window=100000, tokenizer=HeuristicTokenizer())
+    df = make_jobs([40, 60, 1000, 20])
+    df.loc[0, 'title'] = "超长标题" * 200
+    df.loc[1, 'company'] = "Company " * 300
+    df.loc[3, 'title'] = "标题" * 100
+    df.loc[3, 'company'] = "公司" * 100
+    df['location'] = ["北京" * 100, "上海", "N/A", "深圳"]
+    chunks, stats = planner.plan(df)
+
+    assert sorted(position for chunk in chunks for position in chunk.index) == [0, 1, 2, 3]
+    assert stats["truncated"] == 4
+    for chunk in chunks:
+        for record in standardize.prompt_records(chunk):
+            assert planner.job_tokens(record) <= planner.max_job_tokens
+        assert chunk_tokens(planner, chunk) <= planner.token_budget
+    fitted = pd.concat(chunks).sort_index()
+    assert fitted.loc[0, 'title'].endswith(TRUNCATION_MARK)
+    assert fitted.loc[1, 'company'].endswith(TRUNCATION_MARK)
+    # 只有描述超长的职位不动标题和公司
+    assert fitted.loc[2, 'title'] == "职位2" and fitted.loc[2, 'company'] == "公司2"
+
+
+def test_max_job_tokens_must_fit_record_skeleton():
+    with pytest.raises(ValueError):
+        ChunkPlanner(token_budget=400, max_job_tokens=5, context_window=100000, tokenizer=HeuristicTokenizer())
+
+
+def test_plan_is_deterministic_and_handles_empty_input():
+    planner = ChunkPlanner(token_budget=300, max_job_tokens=100, max_jobs_per_chunk=5,
+                           context_window=100000, tokenizer=HeuristicTokenizer())
+    df = make_jobs([30, 50, 70, 10, 90, 20])
+    first, _ = planner.plan(df)
+    second, _ = planner.plan(df)
+    assert [list(chunk.index) for chunk in first] == [list(chunk.index) for chunk in second]
+    chunks, stats = planner.plan(df.iloc[0:0])
+    assert chunks == [] and stats["jobs"] == 0
+
+
+def test_token_budget_is_capped_by_context_window():
+    planner = ChunkPlanner(token_budget=100000, context_window=8000, output_reserve_tokens=1000,
+                           tokenizer=HeuristicTokenizer())
+    assert planner.token_budget == 8000 - 1000 - planner.overhead_tokens
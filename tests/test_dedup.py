@@ -0,0 +1,52 @@
+from nlp.dedup import NearDuplicateIndex, deduplicate_jobs, job_simhash, normalize_company
+from nlp.standardize import process_jobs_dataframe
+
+DESCRIPTION = (
+    "岗位职责：负责公司核心交易系统的后端开发与维护，参与系统架构设计，优化数据库性能。"
+    "任职要求：本科及以上学历，计算机相关专业，熟悉Python或Go，了解MySQL和Redis，有良好的沟通能力。"
+)
+
+
+def test_normalize_company_strips_region_and_suffix():
+    assert normalize_company("字节跳动科技有限公司（北京）") == "字节跳动科技"
+    assert normalize_company("N/A") == ""
+
+
+def test_simhash_is_stable_and_sensitive_to_content():
+    a = job_simhash("后端开发工程师", "字节跳动", DESCRIPTION)
+    assert a == job_simhash("后端开发工程师", "字节跳动", DESCRIPTION)
+    other = job_simhash("市场营销专员", "某消费品公司", "负责品牌推广活动策划，撰写营销文案，维护社交媒体账号。")
+    assert bin(a ^ other).count('1') > 6
+
+
+def test_index_merges_exact_and_near_duplicates():
+    index = NearDuplicateIndex(max_distance=6)
+    assert index.add("后端开发工程师", "字节跳动科技有限公司", DESCRIPTION) == (0, None)
+    assert index.add("后端开发工程师", "字节跳动科技有限公司", DESCRIPTION) == (1, 0)
+    assert index.add("后端开发工程师", "字节跳动有限公司", DESCRIPTION + "投递方式：官网。") == (2, 0)
+    assert index.add("市场营销专员", "某消费品公司", "负责品牌推广活动策划，撰写营销文案。") == (3, None)
+    assert index.clusters() == [[0, 1, 2], [3]]
+
+
+def test_index_requires_compatible_company_beyond_strict_distance():
+    index = NearDuplicateIndex(max_distance=6, strict_distance=2)
+    index.add("后端开发工程师", "字节跳动科技有限公司", DESCRIPTION)
+    _, duplicate_of = index.add("后端开发工程师", "腾讯", DESCRIPTION)
+    assert duplicate_of is None
+    assert len(index.clusters()) == 2
+
+
+def test_deduplicate_jobs_keeps_longest_description_and_merges_sources():
+    df = process_jobs_dataframe([
+        {"title": "后端开发工程师", "company": "字节跳动科技有限公司", "description": DESCRIPTION,
+         "source": "智联招聘", "url": "https://a/1"},
+        {"title": "市场营销专员", "company": "某消费品公司", "description": "负责品牌推广活动策划，撰写营销文案。",
+         "source": "GiveMeOC", "url": "https://b/2"},
+        {"title": "后端开发工程师", "company": "字节跳动有限公司", "description": DESCRIPTION + "投递方式：官网。",
+         "source": "公众号", "url": "https://c/3"},
+    ])
+    df_unique, stats = deduplicate_jobs(df)
+    assert stats["total"] == 3 and stats["unique"] == 2 and stats["removed"] == 1
+    assert df_unique['url'].tolist() == ["https://b/2", "https://c/3"]
+    assert df_unique['sources'].tolist() == [["GiveMeOC"], ["智联招聘", "公众号"]]
+    assert df_unique['source'].tolist() == ["GiveMeOC", "智联招聘 / 公众号"]
@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+
+from nlp.embeddings import HashingEmbeddingProvider, JobEmbedder, cosine_top_k
+from nlp.profiles import ProfileSet, UserProfile
+from nlp.standardize import process_jobs_dataframe
+from storage.embedding_store import EmbeddingStore
+
+
+def normalized(rng, rows, dim):
+    vectors = rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_cosine_top_k_matches_full_sort_across_blocks():
+    rng = np.random.default_rng(7)
+    matrix = normalized(rng, 1000, 16)
+    queries = normalized(rng, 3, 16)
+    rows, scores = cosine_top_k(queries, matrix, 10, block_size=64)
+
+    expected = queries @ matrix.T
+    expected_rows = np.argsort(-expected, axis=1, kind='stable')[:, :10]
+    assert rows.shape == scores.shape == (3, 10)
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_allclose(scores, np.take_along_axis(expected, expected_rows, axis=1), atol=1e-6)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+def test_cosine_top_k_with_k_larger_than_matrix_and_empty_matrix():
+    rng = np.random.default_rng(1)
+    matrix = normalized(rng, 5, 8)
+    queries = normalized(rng, 2, 8)
+    rows, scores = cosine_top_k(queries, matrix, 50, block_size=2)
+    assert rows.shape == (2, 5)
+    assert sorted(rows[0].tolist()) == list(range(5))
+
+    rows, scores = cosine_top_k(queries, np.zeros((0, 8), dtype=np.float32), 3)
+    assert rows.shape == scores.shape == (2, 0)
+
+
+def test_hashing_provider_is_normalized_and_deterministic():
+    provider = HashingEmbeddingProvider(64)
+    vectors = provider.embed(["Python 后端开发", "Python 后端开发", ""])
+    assert vectors.shape == (3, 64)
+    np.testing.assert_allclose(np.linalg.norm(vectors[0]), 1.0, atol=1e-6)
+    np.testing.assert_array_equal(vectors[0], vectors[1])
+    assert not vectors[2].any()
+
+
+def test_store_prune_drops_unused_vectors_and_compacts(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "test-4", 4)
+    vectors = np.eye(4, dtype=np.float32)
+    store.add(["a", "b", "c", "d"], vectors)
+    with store._conn:
+        store._conn.execute("UPDATE vectors SET last_used = ? WHERE content_hash IN ('a', 'c')", (time.time() - 40 * 86400,))
+
+    assert store.prune(30) == 2
+    rows = store.lookup(["a", "b", "c", "d"])
+    assert sorted(rows) == ["b", "d"]
+    np.testing.assert_array_equal(store.get([rows["b"], rows["d"]]), vectors[[1, 3]])
+    assert store.count == 2 and store.prune(30) == 0
+    store.close()
+
+    reopened = EmbeddingStore(str(tmp_path), "test-4", 4)
+    np.testing.assert_array_equal(reopened.matrix, vectors[[1, 3]])
+    assert [path.name for path in tmp_path.glob("*.f32")] == ["test-4.g1.f32"]
+    reopened.close()
+
+
+def test_profile_set_uses_embedding_threshold_for_embedding_scores(tmp_path):
+    df = process_jobs_dataframe([
+        {"title": "Python后端开发工程师", "company": "甲公司", "description": "负责后端开发", "url": "https://a/1", "source": "测试"},
+        {"title": "行政助理", "company": "乙公司", "description": "负责前台接待", "url": "https://b/2", "source": "测试"},
+    ])
+    embedder = JobEmbedder(HashingEmbeddingProvider(256), EmbeddingStore(str(tmp_path), "test-256", 256))
+    profile_set = ProfileSet([UserProfile("默认", "本科", "后端开发", ["Python"])],
+                             embedder=embedder, embedding_min_score=0.05)
+    try:
+        scored = profile_set.score(df)
+        # BM25量纲的阈值（如 5）不会作用在 0~1 的相似度上
+        kept, removed = profile_set.select(scored, 0, 5.0)
+    finally:
+        embedder.close()
+    assert kept['title'].tolist() == ["Python后端开发工程师"]
+    assert removed == 1
@@ -0,0 +1,54 @@
+import functools
+
+import pytest
+
+from benchmarks.stub_services import StubServer
+from scraping.firecrawl_scraper import FirecrawlScraper
+from scraping.sources import scrape_zhaopin_pages
+
+SIZE = 400  # 智联招聘 200 个职位，共4页
+
+
+@pytest.fixture
+def server():
+    server = StubServer(llm_latency=0).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_scraper(server):
+    scraper = FirecrawlScraper(api_key='test', api_url=f"{server.base_url}/firecrawl/v1", max_retries=0)
+    scraper.batch_scrape = functools.partial(scraper.batch_scrape, poll_interval=0.01)
+    return scraper
+
+
+def search_url(server):
+    return f"{server.base_url}/n/{SIZE}/zhaopin?p={{page}}"
+
+
+def test_batch_scrape_polls_and_aligns_paged_results(server):
+    scraper = make_scraper(server)
+    urls = [search_url(server).format(page=page) for page in (1, 2, 3)]
+    results = scraper.batch_scrape(urls)
+
+    # 替身服务先报告进行中，再倒序、每次2条地分页返回结果
+    assert server.batch_submissions == [urls]
+    assert [result['data']['metadata']['sourceURL'] for result in results] == urls
+    assert [result['data']['markdown'] for result in results] == \
+        [scraper.scrape(url)['data']['markdown'] for url in urls]
+
+
+def test_zhaopin_batch_mode_submits_a_window_at_a_time_and_stops_at_last_page(server):
+    jobs = scrape_zhaopin_pages(make_scraper(server), search_url(server), max_pages=8, prefetch_pages=3, batch=True)
+
+    assert len(jobs) == SIZE // 2
+    assert len(server.batch_submissions) == 2
+    assert [len(urls) for urls in server.batch_submissions] == [3, 3]
+
+
+def test_zhaopin_batch_mode_matches_per_page_mode(server):
+    scraper = make_scraper(server)
+    batched = scrape_zhaopin_pages(scraper, search_url(server), max_pages=5, prefetch_pages=2, batch=True)
+    paged = scrape_zhaopin_pages(scraper, search_url(server), max_pages=5, prefetch_pages=2)
+    assert batched == paged
@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+import pytest
+
+from scraping import givemeoc_scraper
+from scraping.givemeoc_scraper import GiveMeOcScraper
+from scraping.state_store import ScraperStateStore
+
+TODAY = date.today()
+
+
+def page_html(rows):
+    cells = ''.join(
+        f'<tr data-id="{data_id}"><td class="crt-col-company">公司{data_id}</td>'
+        f'<td class="crt-col-location">北京</td><td class="crt-col-update-time">{day.isoformat()}</td></tr>'
+        for data_id, day in rows
+    )
+    return f'<html><body><div class="crt-container"><table><tbody>{cells}</tbody></table></div></body></html>'
+
+
+class Page:
+    def __init__(self, text):
+        self.text = text
+
+
+class PagedScraper(GiveMeOcScraper):
+    """按页码返回预设页面的爬虫，None 表示该页请求失败。"""
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+
+    def fetch_page(self, url, params=None):
+        page = int(url.rsplit('=', 1)[1])
+        html = self.pages.get(page)
+        return Page(html) if html is not None else None
+
+
+@pytest.fixture
+def state(monkeypatch, tmp_path):
+    store = ScraperStateStore(str(tmp_path / 'scraper_state.json'))
+    monkeypatch.setattr(givemeoc_scraper, 'GIVE_ME_OC_PAGE_URL', 'https://example.com/list?page={page}')
+    monkeypatch.setattr(givemeoc_scraper, 'GIVE_ME_OC_LOOKBACK_DAYS', 30)
+    monkeypatch.setattr(givemeoc_scraper, 'get_state_store', lambda path: store)
+    return store
+
+
+def crawl(pages, max_pages=5):
+    scraper = PagedScraper(pages)
+    jobs = []
+    scraper.crawl_pages(max_pages, jobs.extend)
+    return scraper, jobs
+
+
+def test_watermark_advances_after_reaching_lookback_cutoff(state):
+    scraper, jobs = crawl({
+        1: page_html([("a", TODAY), ("b", TODAY - timedelta(days=1))]),
+        2: page_html([("c", TODAY - timedelta(days=2)), ("d", TODAY - timedelta(days=60))]),
+    })
+    assert len(jobs) == 3
+    assert state.get(scraper.STATE_NAMESPACE, scraper.base_url) == {'update_date': TODAY.isoformat(), 'ids': ['a']}
+
+
+def test_watermark_kept_when_crawl_stops_early(state):
+    old_mark = {'update_date': (TODAY - timedelta(days=5)).isoformat(), 'ids': ['old']}
+    state.set(GiveMeOcScraper.STATE_NAMESPACE, GiveMeOcScraper().base_url, old_mark)
+
+    # 第2页请求失败，第3页起的更早职位尚未看到
+    scraper, jobs = crawl({1: page_html([("a", TODAY), ("b", TODAY - timedelta(days=1))])})
+    assert len(jobs) == 2
+    assert state.get(scraper.STATE_NAMESPACE, scraper.base_url) == old_mark
+
+    # 达到页数上限也不推进
+    scraper, _ = crawl({page: page_html([(f"p{page}", TODAY)]) for page in range(1, 4)}, max_pages=2)
+    assert state.get(scraper.STATE_NAMESPACE, scraper.base_url) == old_mark
+
+
+def test_watermark_advances_at_end_of_list(state):
+    scraper, jobs = crawl({1: page_html([("a", TODAY)]), 2: page_html([])})
+    assert len(jobs) == 1
+    assert state.get(scraper.STATE_NAMESPACE, scraper.base_url)['ids'] == ['a']
+
+
+def test_watermark_waits_for_the_pipeline_to_succeed(state):
+    pages = {1: page_html([("a", TODAY)]), 2: page_html([])}
+    state.hold()
+    scraper, _ = crawl(pages)
+    assert state.get(scraper.STATE_NAMESPACE, scraper.base_url)['ids'] == ['a']
+    state.release(commit=False)
+    assert state.get(scraper.STATE_NAMESPACE, scraper.base_url) is None
+    assert ScraperStateStore(state.path).get(scraper.STATE_NAMESPACE, scraper.base_url) is None
+
+    state.hold()
+    crawl(pages)
+    state.release(commit=True)
+    assert ScraperStateStore(state.path).get(scraper.STATE_NAMESPACE, scraper.base_url)['ids'] == ['a']
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from nlp.prefilter import _term_frequencies, bm25_scores, expand_query, select_relevant
+
+
+def scored(scores):
+    return pd.DataFrame({"title": [f"职位{i}" for i in range(len(scores))], "relevance_score": scores})
+
+
+def test_select_relevant_filters_by_min_score():
+    df = scored([0.0, 2.5, 0.4, 1.0])
+    kept, removed = select_relevant(df, top_n=0, min_score=0.5)
+    assert kept['title'].tolist() == ["职位1", "职位3"]
+    assert removed == 2
+
+
+def test_select_relevant_keeps_top_n_in_original_order():
+    df = scored([1.0, 3.0, 2.0, 5.0, 4.0])
+    kept, removed = select_relevant(df, top_n=3)
+    assert kept['title'].tolist() == ["职位1", "职位3", "职位4"]
+    assert removed == 2
+
+
+def test_select_relevant_breaks_ties_by_position():
+    df = scored([1.0, 2.0, 2.0, 2.0, 0.5])
+    kept, _ = select_relevant(df, top_n=2, min_score=1.0)
+    assert kept['title'].tolist() == ["职位1", "职位2"]
+
+
+def test_select_relevant_combines_threshold_and_top_n():
+    df = scored([0.1, 0.2, 3.0, 0.3])
+    kept, removed = select_relevant(df, top_n=3, min_score=0.25)
+    assert kept['title'].tolist() == ["职位2", "职位3"]
+    assert removed == 2
+
+
+def test_select_relevant_empty_input():
+    kept, removed = select_relevant(scored([]), top_n=5)
+    assert kept.empty and removed == 0
+
+
+def test_ascii_terms_match_whole_words_only():
+    texts = ["熟悉JavaScript和email营销", "Java开发，熟悉C++与AI算法", "PYTHON / python 后端"]
+    counts, lengths = _term_frequencies(texts, ["java", "ai", "c++", "python"])
+    assert counts.tolist() == [[0, 0, 0, 0], [1, 1, 1, 0], [0, 0, 0, 2]]
+    assert lengths.tolist() == [len(text) for text in texts]
+
+
+def test_cjk_terms_count_overlapping_occurrences_across_documents():
+    texts = ["计算机计算机", "", None, "软件与计算"]
+    counts, _ = _term_frequencies(texts, ["计算", "计算机", "算机计", "😀"])
+    assert counts.tolist() == [[2, 2, 1, 0], [0, 0, 0, 0], [0, 0, 0, 0], [1, 0, 0, 0]]
+
+
+def test_bm25_prefers_title_hits_and_ignores_substring_false_positives():
+    query = expand_query(["Java", "后端"])
+    scores = bm25_scores(
+        ["Java后端工程师", "JavaScript前端工程师", "市场专员"],
+        ["负责服务端开发", "负责页面开发", "负责Java培训课程的推广"],
+        query,
+    )
+    assert scores[0] > scores[2] > 0
+    assert scores[1] == 0
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from nlp.profiles import ProfileSet, UserProfile
+from storage.seen_jobs import SeenJobsStore
+
+
+def jobs(names):
+    return pd.DataFrame({
+        "title": names,
+        "company": ["公司"] * len(names),
+        "clean_description": [f"{name}的职位描述" for name in names],
+        "url": [f"https://example.com/{name}" for name in names],
+    })
+
+
+@pytest.mark.parametrize("profile_names", [["默认"], ["张三", "李四"]])
+def test_unchanged_counts_every_skipped_job(tmp_path, profile_names):
+    profiles = [UserProfile(name, "本科", "计算机") for name in profile_names]
+    stores = {name: SeenJobsStore(str(tmp_path / f"{name}.sqlite3")) for name in profile_names}
+    try:
+        # 上次运行: a 被选为核心匹配，b 没有被选中
+        seen = SeenJobsStore.annotate(jobs(["a", "b"]))
+        for store in stores.values():
+            store.record_results(seen, {"matched_jobs": [{"url": "https://example.com/a"}], "other_jobs": [],
+                                        "selected": {"matched": [0]}})
+
+        profile_set = ProfileSet(profiles, stores)
+        pending = profile_set.partition(jobs(["a", "b", "c"]))
+        assert list(pending["title"]) == ["c"]
+        assert profile_set.unchanged == 2
+        assert profile_set.carried == {"matched": len(profiles), "other": 0}
+    finally:
+        for store in stores.values():
+            store.close()
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from storage import run_lock
+from storage.run_lock import RunLock
+
+posix_only = pytest.mark.skipif(run_lock.fcntl is None, reason="需要 fcntl.flock")
+
+
+def test_acquire_release_and_holder(tmp_path):
+    path = str(tmp_path / 'locks' / 'pipeline.lock')
+    lock = RunLock(path)
+    assert lock.acquire()
+    assert lock.holder()['pid'] == os.getpid()
+    assert not RunLock(path).acquire()
+    lock.release()
+    assert RunLock(path).acquire()
+
+
+def test_context_manager_refuses_when_held(tmp_path):
+    path = str(tmp_path / 'pipeline.lock')
+    with RunLock(path):
+        with pytest.raises(RuntimeError):
+            with RunLock(path):
+                pass
+    with RunLock(path) as lock:
+        assert lock.held
+
+
+@posix_only
+def test_leftover_lock_file_from_another_host_does_not_block(tmp_path):
+    path = tmp_path / 'pipeline.lock'
+    path.write_text(json.dumps({"host": "另一台主机", "pid": 1, "acquired_at": time.time()}), encoding='utf-8')
+    lock = RunLock(str(path), stale_seconds=6 * 3600)
+    assert lock.acquire()
+    assert lock.holder()['pid'] == os.getpid()
+    lock.release()
+    assert os.path.exists(str(path)) and lock.holder() is None
+
+
+@posix_only
+def test_lock_is_released_when_holder_process_dies(tmp_path):
+    path = str(tmp_path / 'pipeline.lock')
+    code = (
+        "import sys, time\n"
+        "from storage.run_lock import RunLock\n"
+        f"assert RunLock({path!r}).acquire()\n"
+        "print('locked', flush=True)\n"
+        "time.sleep(60)\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    child = subprocess.Popen([sys.executable, '-c', code], cwd=root, stdout=subprocess.PIPE, text=True)
+    try:
+        assert child.stdout.readline().strip() == 'locked'
+        lock = RunLock(path)
+        assert not lock.acquire()
+        assert lock.holder()['pid'] == child.pid
+    finally:
+        child.kill()
+        child.wait()
+    assert lock.acquire()
+    lock.release()
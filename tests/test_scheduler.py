@@ -0,0 +1,137 @@
+import threading
+from datetime import date, datetime
+
+import pytest
+
+import scheduler
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setattr(scheduler, 'JOB_STORE_PATH', '')
+    monkeypatch.setattr(scheduler, 'SCHEDULE_DEFAULT_LEAD_MINUTES', 60)
+    monkeypatch.setattr(scheduler, 'SCHEDULE_SAFETY_FACTOR', 1.5)
+    monkeypatch.setattr(scheduler, 'SCHEDULE_MIN_LEAD_MINUTES', 10)
+    monkeypatch.setattr(scheduler, 'SCHEDULE_MAX_LEAD_MINUTES', 240)
+    monkeypatch.setattr(scheduler, 'SCHEDULE_MAX_WAIT_MINUTES', 30)
+    monkeypatch.setattr(scheduler, 'SCHEDULE_CATCHUP_HOURS', 6)
+
+
+class FakeWorker:
+    started = []
+
+    def __init__(self, day):
+        self.day = day
+        self.status = None
+        self.duration = None
+        self.done = threading.Event()
+
+    def start(self):
+        FakeWorker.started.append(self)
+        return self
+
+    def finish(self, status, duration):
+        self.status = status
+        self.duration = duration
+        self.done.set()
+
+
+@pytest.fixture
+def deadline_scheduler(settings, monkeypatch, tmp_path):
+    FakeWorker.started = []
+    sent = []
+    monkeypatch.setattr(scheduler, 'PipelineWorker', FakeWorker)
+    monkeypatch.setattr(scheduler, 'send_all_reports', lambda: sent.append(True))
+    instance = scheduler.DeadlineScheduler("08:00", str(tmp_path / 'scheduler_state.json'))
+    instance.sent = sent
+    return instance
+
+
+def at(hour, minute=0, day=2):
+    return datetime(2026, 3, day, hour, minute)
+
+
+def test_estimate_lead_seconds_uses_p90_with_safety_factor(settings):
+    assert scheduler.estimate_lead_seconds([]) == 60 * 60
+    durations = [600] * 9 + [1200]
+    assert scheduler.estimate_lead_seconds(durations) == 600 * 1.5
+    assert scheduler.estimate_lead_seconds([60]) == 10 * 60
+    assert scheduler.estimate_lead_seconds([100000]) == 240 * 60
+
+
+def test_parse_send_time_accepts_seconds_and_rejects_garbage():
+    assert scheduler.parse_send_time("08:30").strftime('%H:%M:%S') == "08:30:00"
+    assert scheduler.parse_send_time(" 08:30:15 ").second == 15
+    with pytest.raises(ValueError):
+        scheduler.parse_send_time("8点")
+
+
+def test_tick_starts_early_and_sends_at_deadline(deadline_scheduler):
+    deadline_scheduler.tick(at(6, 0))
+    assert FakeWorker.started == []
+
+    # 没有历史耗时时按默认提前量（60分钟）启动
+    deadline_scheduler.tick(at(7, 0))
+    assert len(FakeWorker.started) == 1 and FakeWorker.started[0].day == date(2026, 3, 2)
+
+    FakeWorker.started[0].finish("ok", 1200)
+    deadline_scheduler.tick(at(7, 30))
+    assert deadline_scheduler.sent == []
+    assert deadline_scheduler.recent_durations() == [1200]
+
+    deadline_scheduler.tick(at(8, 0))
+    assert deadline_scheduler.sent == [True]
+    deadline_scheduler.tick(at(8, 1))
+    assert deadline_scheduler.sent == [True]
+    assert len(FakeWorker.started) == 1
+
+
+def test_tick_skips_report_when_pipeline_failed(deadline_scheduler):
+    deadline_scheduler.tick(at(7, 0))
+    FakeWorker.started[0].finish("error", 30)
+    deadline_scheduler.tick(at(8, 0))
+    assert deadline_scheduler.sent == []
+    assert deadline_scheduler.target_day(at(8, 1)) == date(2026, 3, 3)
+
+
+def test_tick_waits_then_sends_previous_results(deadline_scheduler):
+    deadline_scheduler.tick(at(7, 0))
+    deadline_scheduler.tick(at(8, 0))
+    deadline_scheduler.tick(at(8, 29))
+    assert deadline_scheduler.sent == []
+    deadline_scheduler.tick(at(8, 31))
+    assert deadline_scheduler.sent == [True]
+
+
+def test_tick_catches_up_missed_report_within_window(deadline_scheduler):
+    deadline_scheduler.tick(at(10, 0))
+    assert len(FakeWorker.started) == 1
+    FakeWorker.started[0].finish("ok", 600)
+    deadline_scheduler.tick(at(10, 10))
+    assert deadline_scheduler.sent == [True]
+
+
+def test_tick_waits_for_catchup_run_from_its_start(deadline_scheduler):
+    deadline_scheduler.tick(at(10, 0))
+    deadline_scheduler.tick(datetime(2026, 3, 2, 10, 0, 1))
+    deadline_scheduler.tick(at(10, 29))
+    assert len(FakeWorker.started) == 1
+    assert deadline_scheduler.sent == []
+
+    FakeWorker.started[0].finish("ok", 1800)
+    deadline_scheduler.tick(at(10, 30))
+    assert deadline_scheduler.sent == [True]
+
+
+def test_tick_sends_previous_results_when_catchup_run_overruns(deadline_scheduler):
+    deadline_scheduler.tick(at(10, 0))
+    deadline_scheduler.tick(at(10, 29))
+    assert deadline_scheduler.sent == []
+    deadline_scheduler.tick(at(10, 31))
+    assert deadline_scheduler.sent == [True]
+
+
+def test_tick_gives_up_after_catchup_window(deadline_scheduler):
+    deadline_scheduler.tick(at(15, 0))
+    assert FakeWorker.started == []
+    assert deadline_scheduler.sent == []
@@ -0,0 +1,68 @@
+import pandas as pd
+
+from nlp.standardize import MAX_PICKS_PER_CATEGORY, join_match_response
+from storage.seen_jobs import SeenJobsStore, job_fingerprint, normalize_url
+
+
+def test_normalize_url_drops_tracking_params_fragment_and_trailing_slash():
+    url = "HTTPS://WWW.Zhaopin.com/jobdetail/CC123/?utm_source=mail&refcode=4019&b=2&a=1#apply"
+    assert normalize_url(url) == "https://www.zhaopin.com/jobdetail/CC123?a=1&b=2"
+
+
+def test_normalize_url_keeps_identity_params_and_blank_values():
+    url = "https://mp.weixin.qq.com/s?__biz=MzA&mid=1&idx=2&sn=abc&chksm=zz&scene=21&empty="
+    assert normalize_url(url) == "https://mp.weixin.qq.com/s?__biz=MzA&empty=&idx=2&mid=1&sn=abc"
+
+
+def test_normalize_url_same_job_different_tracking_is_equal():
+    a = normalize_url("https://www.givemeoc.com/job/42?spm=a.b.c&from=timeline")
+    b = normalize_url("https://www.givemeoc.com/job/42/")
+    assert a == b == "https://www.givemeoc.com/job/42"
+
+
+def test_normalize_url_root_path_and_invalid_values():
+    assert normalize_url("https://example.com") == "https://example.com/"
+    assert normalize_url("  ") == ""
+    assert normalize_url("N/A") == ""
+    assert normalize_url(None) == ""
+    assert normalize_url(float('nan')) == ""
+
+
+def test_job_fingerprint_ignores_whitespace_and_case():
+    assert job_fingerprint("Python 工程师", "ACME", "负责  后端\n开发") == \
+        job_fingerprint(" python 工程师 ", "acme", "负责 后端 开发")
+    assert job_fingerprint("Python 工程师", "ACME", "负责后端开发") != \
+        job_fingerprint("Python 工程师", "ACME", "负责前端开发")
+
+
+def chunk(count, prefix="https://example.com"):
+    return SeenJobsStore.annotate(pd.DataFrame({
+        "title": [f"职位{i}" for i in range(count)],
+        "company": ["公司"] * count,
+        "clean_description": [f"职位{i}的描述" for i in range(count)],
+        "url": [f"{prefix}/{i}" for i in range(count)],
+    }))
+
+
+def pending_titles(store, df_chunk):
+    return list(store.partition(df_chunk)[0]["title"])
+
+
+def test_unselected_jobs_are_recorded_only_when_picks_are_not_capped(tmp_path):
+    store = SeenJobsStore(str(tmp_path / "seen.sqlite3"))
+    try:
+        df_chunk = chunk(MAX_PICKS_PER_CATEGORY + 2)
+        result = join_match_response(df_chunk, {"matched": [{"id": "J1"}], "other": []})
+        assert not result["capped"]
+        store.record_results(df_chunk, result)
+        assert pending_titles(store, df_chunk) == []
+
+        # 核心匹配名额用完：未被选中的职位可能只是被挤掉了，下次运行仍要匹配
+        df_chunk = chunk(MAX_PICKS_PER_CATEGORY + 2, prefix="https://example.com/capped")
+        picks = [{"id": f"J{i + 1}"} for i in range(MAX_PICKS_PER_CATEGORY + 1)]
+        result = join_match_response(df_chunk, {"matched": picks, "other": []})
+        assert result["capped"]
+        store.record_results(df_chunk, result)
+        assert pending_titles(store, df_chunk) == [f"职位{MAX_PICKS_PER_CATEGORY}", f"职位{MAX_PICKS_PER_CATEGORY + 1}"]
+    finally:
+        store.close()
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from scraping.registry import SourceRunner
+
+
+def make_source(key, fetch):
+    return type(f"{key}Source", (), {"source_key": key, "fetch_jobs": lambda self, emit: fetch(emit)})
+
+
+def run(runner, delay=0.0):
+    runner.start()
+    batches = []
+    for batch in runner.iter_batches():
+        batches.append(batch)
+        time.sleep(delay)
+    return batches, {entry["source"]: entry for entry in runner.report()}
+
+
+def test_waiting_for_queue_space_does_not_count_towards_timeout():
+    def fetch(emit):
+        for i in range(4):
+            emit([{"title": f"职位{i}"}])
+
+    runner = SourceRunner([make_source("slow_consumer", fetch)], default_timeout=0.5, queue_size=1)
+    batches, report = run(runner, delay=0.3)
+    assert len(batches) == 4
+    assert report["slow_consumer"]["status"] == "ok"
+
+
+def test_cancelled_source_stops_before_saving_state():
+    saved = threading.Event()
+    stopped = threading.Event()
+
+    def fetch(emit):
+        try:
+            emit([{"title": "职位0"}])
+            time.sleep(0.6)
+            emit([{"title": "职位1"}])
+            saved.set()
+        finally:
+            stopped.set()
+
+    runner = SourceRunner([make_source("stalled", fetch)], default_timeout=0.3)
+    batches, report = run(runner)
+    assert batches == [[{"title": "职位0"}]]
+    assert report["stalled"]["status"] == "timeout"
+    assert stopped.wait(2)
+    assert not saved.is_set()
+
+
+def test_timeout_is_detected_while_other_sources_keep_producing():
+    def busy(emit):
+        for i in range(30):
+            emit([{"title": f"职位{i}"}])
+            time.sleep(0.05)
+
+    runner = SourceRunner(
+        [make_source("busy", busy), make_source("hung", lambda emit: time.sleep(3))],
+        default_timeout=0, timeouts={"hung": 0.3}
+    )
+    _, report = run(runner)
+    assert report["busy"]["status"] == "ok"
+    assert report["hung"]["status"] == "timeout"
+    assert report["hung"]["seconds"] < 1.0
@@ -0,0 +1,63 @@
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from nlp import standardize
+from nlp.llm_cache import LLMResponseCache
+from nlp.profiles import UserProfile
+
+
+class FakeClient:
+    """按顺序返回预设内容的模型客户端。"""
+    def __init__(self, *contents):
+        self.contents = list(contents)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        self.calls += 1
+        message = SimpleNamespace(content=self.contents.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = LLMResponseCache(str(tmp_path / 'llm_cache.sqlite3'))
+    monkeypatch.setattr(standardize, 'get_llm_cache', lambda: cache)
+    return cache
+
+
+def make_chunk():
+    return pd.DataFrame([
+        {"title": "后端开发", "company": "甲公司", "description": "Python", "source": "测试", "url": "https://example.com/1"},
+        {"title": "测试开发", "company": "乙公司", "description": "自动化", "source": "测试", "url": "https://example.com/2"},
+    ])
+
+
+def test_malformed_chunk_response_is_not_cached(cache):
+    valid = {"matched": [{"id": "J1", "reason": "专业对口"}], "other": []}
+    client = FakeClient('[]', json.dumps(valid))
+    profile = UserProfile("默认", "本科", "计算机")
+
+    with pytest.raises(ValueError):
+        standardize.request_chunk_match(make_chunk(), client, profile)
+    # 格式错误的响应没有进缓存，重试时重新调用模型，成功后才缓存
+    result = standardize.request_chunk_match(make_chunk(), client, profile)
+    assert [job['title'] for job in result['matched_jobs']] == ["后端开发"]
+    assert standardize.request_chunk_match(make_chunk(), client, profile) == result
+    assert client.calls == 2
+
+
+def test_malformed_profiles_response_is_not_cached(cache):
+    profiles = [UserProfile("甲", "本科", "计算机"), UserProfile("乙", "硕士", "软件工程")]
+    valid = {"P1": {"matched": [{"id": "J2", "reason": "方向一致"}], "other": []}, "P2": {"matched": [], "other": []}}
+    client = FakeClient('"无法解析"', json.dumps(valid))
+
+    with pytest.raises(ValueError):
+        standardize.request_profiles_match(make_chunk(), client, profiles)
+    result = standardize.request_profiles_match(make_chunk(), client, profiles)
+    assert [job['title'] for job in result["甲"]['matched_jobs']] == ["测试开发"]
+    assert standardize.request_profiles_match(make_chunk(), client, profiles) == result
+    assert client.calls == 2
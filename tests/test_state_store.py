@@ -0,0 +1,29 @@
+from scraping.state_store import ScraperStateStore, get_state_store, hold_state_stores, release_state_stores
+
+
+def test_held_stores_save_only_on_commit(tmp_path):
+    before = get_state_store(str(tmp_path / 'before.json'))
+    hold_state_stores()
+    try:
+        # 暂缓期间才打开的存储同样暂缓落盘
+        during = get_state_store(str(tmp_path / 'during.json'))
+        for store in (before, during):
+            store.set('ns', 'key', 1)
+            store.save()
+            assert not (tmp_path / 'before.json').exists() and not (tmp_path / 'during.json').exists()
+    finally:
+        release_state_stores(commit=False)
+    assert before.get('ns', 'key') is None and during.get('ns', 'key') is None
+
+    hold_state_stores()
+    try:
+        before.set('ns', 'key', 2)
+        before.save()
+    finally:
+        release_state_stores(commit=True)
+    assert ScraperStateStore(before.path).get('ns', 'key') == 2
+
+    # 不在暂缓期间时照常立即落盘
+    before.set('ns', 'key', 3)
+    before.save()
+    assert ScraperStateStore(before.path).get('ns', 'key') == 3
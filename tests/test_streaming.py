@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from nlp.chunk_planner import ChunkPlanner, HeuristicTokenizer
+from nlp.profiles import ProfileSet, UserProfile
+from nlp.streaming import StreamingMatchStage
+
+
+class RecordingMatcher:
+    max_concurrency = 2
+
+    def __init__(self):
+        self.chunks = []
+
+    def match_one(self, df_chunk):
+        self.chunks.append(df_chunk)
+        return {"matched_jobs": [], "other_jobs": [], "selected": {}}
+
+
+def raw_jobs(titles, start=0):
+    return [
+        {"title": title, "company": f"公司{start + i}", "description": f"{title}，负责相关工作。",
+         "url": f"https://example.com/{start + i}", "source": "测试"}
+        for i, title in enumerate(titles)
+    ]
+
+
+def make_stage(matcher, min_score, max_jobs):
+    profile_set = ProfileSet([UserProfile("默认", "本科", "后端开发", ["Python"])], streaming=True)
+    planner = ChunkPlanner(token_budget=2000, max_job_tokens=200, max_jobs_per_chunk=3,
+                           context_window=100000, tokenizer=HeuristicTokenizer())
+    return StreamingMatchStage(matcher, planner, profile_set, prefilter=True,
+                               min_score=min_score, max_jobs=max_jobs)
+
+
+def test_stage_sends_at_most_max_jobs_preferring_higher_scores_within_batch():
+    matcher = RecordingMatcher()
+    stage = make_stage(matcher, min_score=0.1, max_jobs=3)
+    stage.feed(raw_jobs(["市场专员", "Python后端开发", "后端开发", "行政助理"]))
+    stage.feed(raw_jobs(["Python后端开发工程师", "后端开发实习生"], start=10))
+    stage.finish()
+
+    sent = [title for chunk in matcher.chunks for title in chunk['title']]
+    assert sent == ["Python后端开发", "后端开发", "Python后端开发工程师"]
+    assert stage.stats["sent"] == 3
+    assert stage.stats["filtered"] == 3
+
+
+def test_stage_without_budget_keeps_every_job_above_threshold():
+    matcher = RecordingMatcher()
+    stage = make_stage(matcher, min_score=0.0, max_jobs=0)
+    stage.feed(raw_jobs(["市场专员", "Python后端开发", "行政助理"]))
+    stage.finish()
+    assert stage.stats["sent"] == 3 and stage.stats["filtered"] == 0
+
+
+class BlockingMatcher(RecordingMatcher):
+    max_concurrency = 1
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def match_one(self, df_chunk):
+        self.release.wait(5)
+        return super().match_one(df_chunk)
+
+
+def test_close_cancels_queued_chunks_and_shuts_down_executor():
+    matcher = BlockingMatcher()
+    stage = make_stage(matcher, min_score=0.0, max_jobs=0)
+    stage.feed(raw_jobs([f"后端开发{i}" for i in range(7)]))
+    assert stage.stats["chunks"] == 2
+
+    # 上游出错、不再调用 finish()：第二块还在排队，关闭时取消，正在匹配的第一块结束后线程池退出
+    timer = threading.Timer(0.1, matcher.release.set)
+    timer.start()
+    stage.close()
+    assert len(matcher.chunks) == 1
+    assert stage._dispatched[1][1].cancelled()
+    with pytest.raises(RuntimeError):
+        stage._executor.submit(matcher.match_one, None)
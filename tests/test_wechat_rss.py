@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scraping import wechat_rss_scraper
+from scraping.state_store import ScraperStateStore, StagedStateStore
+from scraping.wechat_rss_scraper import WechatRssScraper
+
+FEED_URL = "https://rss.example.com/account.xml"
+ETAG = '"v1"'
+CST = timezone(timedelta(hours=8))
+
+
+def rss(entries):
+    items = ''.join(
+        f"<item><title>{title}</title><link>https://mp.example.com/{guid}</link><guid>{guid}</guid>"
+        f"<pubDate>{published.astimezone(CST).strftime('%a, %d %b %Y %H:%M:%S')}</pubDate></item>"
+        for guid, title, published in entries
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>公众号</title>{items}</channel></rss>'.encode()
+
+
+class Response:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FeedServer:
+    """内容不变的RSS源：带着当前ETag的条件GET得到304。"""
+    def __init__(self, content):
+        self.content = content
+        self.statuses = []
+
+    def get(self, url, headers=None, timeout=None):
+        status = 304 if (headers or {}).get('If-None-Match') == ETAG else 200
+        self.statuses.append(status)
+        return Response(status, b'' if status == 304 else self.content, {'ETag': ETAG})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    now = datetime.now(timezone.utc)
+    server = FeedServer(rss([
+        ("n3", "校招 第三篇", now - timedelta(hours=1)),
+        ("n2", "招聘 第二篇", now - timedelta(hours=2)),
+        ("n1", "内推 第一篇", now - timedelta(hours=3)),
+    ]))
+    monkeypatch.setattr(wechat_rss_scraper.requests, 'get', server.get)
+    return server
+
+
+def scrape(state_store, max_items=None):
+    scraper = WechatRssScraper(FEED_URL, state_store=state_store)
+    scraper.fetch_article_text = lambda url: f"{url} 的正文"
+    return [job['url'].rsplit('/', 1)[1] for job in scraper.scrape(max_items=max_items)]
+
+
+def test_pending_articles_are_not_hidden_behind_304(server, tmp_path):
+    store = ScraperStateStore(str(tmp_path / 'state.json'))
+    assert scrape(store, max_items=2) == ["n3", "n2"]
+    # 还有文章没交出，不保存新的ETag，下次仍然拿到完整的RSS
+    assert store.get(WechatRssScraper.STATE_NAMESPACE, FEED_URL)['etag'] is None
+
+    assert scrape(store, max_items=2) == ["n1"]
+    assert store.get(WechatRssScraper.STATE_NAMESPACE, FEED_URL)['etag'] == ETAG
+
+    assert scrape(store, max_items=2) == []
+    assert server.statuses == [200, 200, 304]
+
+
+def test_feed_state_is_discarded_with_the_failed_run(server, tmp_path):
+    store = ScraperStateStore(str(tmp_path / 'state.json'))
+    store.hold()
+    staged = StagedStateStore(store)
+    assert scrape(staged) == ["n3", "n2", "n1"]
+    staged.commit()
+    store.release(commit=False)
+
+    # 上次运行失败：状态回到运行前，文章重新交出
+    assert store.get(WechatRssScraper.STATE_NAMESPACE, FEED_URL) is None
+    assert scrape(store) == ["n3", "n2", "n1"]
+    assert server.statuses == [200, 200]